@@ -0,0 +1,80 @@
+"""Images shared by all the objects that draw them.
+
+Each image is loaded and converted at most once per process, the first time
+something draws it, and the converted surface is shared by every object that
+uses the image. Object sizes are read from the PNG header instead, so objects
+can be placed without loading their images.
+"""
+
+import os
+import pygame
+import struct
+from typing import Dict, Tuple
+
+from common import img
+
+_IMG_DIR = os.path.join(os.path.dirname(__file__), 'img')
+# The PNG signature, then the IHDR chunk's length and type, width and height.
+_PNG_SIZE = struct.Struct('>16x2I')
+
+
+class Cache:
+    """Images keyed by name, with counters for diagnostics."""
+
+    def __init__(self, img_dir=_IMG_DIR):
+        self._img_dir = img_dir
+        self._images: Dict[str, pygame.Surface] = {}
+        self._sizes: Dict[str, Tuple[int, int]] = {}
+        self.loads = 0
+
+    def _path(self, name):
+        return os.path.join(self._img_dir, f'{name}.png')
+
+    def size(self, name) -> Tuple[int, int]:
+        """Returns an image's size without loading it."""
+        if name not in self._sizes:
+            with open(self._path(name), 'rb') as f:
+                self._sizes[name] = _PNG_SIZE.unpack(f.read(_PNG_SIZE.size))
+        return self._sizes[name]
+
+    def get(self, name) -> pygame.Surface:
+        if name not in self._images:
+            self._images[name] = pygame.image.load(
+                self._path(name)).convert_alpha()
+            self.loads += 1
+        return self._images[name]
+
+    def memory(self):
+        """Returns the number of bytes of pixel data in the cache."""
+        return sum(image.get_pitch() * image.get_height()
+                   for image in self._images.values())
+
+    def stats(self) -> Dict[str, int]:
+        return {'images': len(self._images), 'loads': self.loads,
+                'bytes': self.memory()}
+
+    def clear(self):
+        self._images.clear()
+        self._sizes.clear()
+        self.loads = 0
+
+
+CACHE = Cache()
+
+
+class PngFactory(img.RectFactory):
+    """Like img.PngFactory, but with a shared image that is loaded lazily."""
+
+    def __init__(self, name, screen, position=(0, 0), shift=(0, 0)):
+        super().__init__(screen)
+        self._name = name
+        w, h = CACHE.size(name)
+        self.RECT = pygame.Rect(
+            (position[0] + w * shift[0], position[1] + h * shift[1]), (w, h))
+
+    @property
+    def _img(self):
+        return CACHE.get(self._name)
+
+    def draw(self):
+        self._screen.blit(self._img, self.RECT.topleft)
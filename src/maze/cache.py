@@ -0,0 +1,44 @@
+"""Caching utilities."""
+
+import collections
+from typing import Generic, Hashable, Iterator, Optional, TypeVar
+
+_K = TypeVar('_K', bound=Hashable)
+_V = TypeVar('_V')
+
+
+class LruCache(Generic[_K, _V]):
+    """A mapping that evicts its least recently used entries when full."""
+
+    def __init__(self, max_size):
+        assert max_size > 0
+        self._max_size = max_size
+        self._entries: collections.OrderedDict[_K, _V] = (
+            collections.OrderedDict())
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[_K]:
+        return iter(list(self._entries))
+
+    def get(self, key) -> Optional[_V]:
+        if key not in self._entries:
+            return None
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def __setitem__(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def discard(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,70 @@
+"""Sources of timer events."""
+
+import abc
+import pygame
+from typing import Dict, List
+
+
+class Clock(abc.ABC):
+    """Fires events of a given type at regular intervals."""
+
+    @abc.abstractmethod
+    def set_timer(self, event_type, interval_ms):
+        """Starts firing events, or stops if interval_ms is 0."""
+
+    def advance(self, ms) -> List[pygame.event.Event]:
+        """Moves time forward and returns the timer events that fired."""
+        return []
+
+    def progress(self, event_type) -> float:
+        """Returns the fraction of a timer's interval that has passed."""
+        return 1.0
+
+
+class RealClock(Clock):
+    """Posts timer events to the pygame event queue.
+
+    Since pygame keeps time, advance() and progress() don't know anything.
+    """
+
+    def set_timer(self, event_type, interval_ms):
+        pygame.time.set_timer(event_type, interval_ms)
+
+
+class ManualClock(Clock):
+    """A clock that only advances when told to.
+
+    Instead of posting events, advance() returns the events that would have
+    fired, so callers can feed them to a game as fast as they like.
+    """
+
+    def __init__(self):
+        self.time_ms = 0
+        # Maps event types to (interval, next firing time).
+        self._timers: Dict[int, List[int]] = {}
+
+    def set_timer(self, event_type, interval_ms):
+        if interval_ms:
+            self._timers[event_type] = [interval_ms,
+                                        self.time_ms + interval_ms]
+        else:
+            self._timers.pop(event_type, None)
+
+    def advance(self, ms) -> List[pygame.event.Event]:
+        end_ms = self.time_ms + ms
+        fired = []
+        for event_type, timer in self._timers.items():
+            interval_ms, next_ms = timer
+            while next_ms <= end_ms:
+                fired.append((next_ms, event_type))
+                next_ms += interval_ms
+            timer[1] = next_ms
+        self.time_ms = end_ms
+        return [pygame.event.Event(event_type)
+                for _, event_type in sorted(fired)]
+
+    def progress(self, event_type) -> float:
+        if event_type not in self._timers:
+            return 1.0
+        interval_ms, next_ms = self._timers[event_type]
+        return 1 - (next_ms - self.time_ms) / interval_ms
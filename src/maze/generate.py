@@ -0,0 +1,103 @@
+"""Random mazes.
+
+A generated maze is a grid of squares with the start, square (0, 0), in its
+top-left corner. Its walls are a walls.Grid, two bits per square, so even a
+maze of a million squares takes a quarter of a megabyte. Mazes are carved by
+a randomized depth-first search, so there is exactly one way between any two
+squares, and the end is the square farthest from the start. A maze is
+written out as a compiled map file with a wall grid:
+
+    python -m maze.generate 200 200 maze.map --seed 1
+"""
+
+import argparse
+import random
+from typing import Tuple
+
+from . import map_file
+from . import walls
+
+Square = Tuple[int, int]
+
+
+class Maze(walls.Grid):
+    """A grid of squares and the walls between them.
+
+    The grid has a ring of squares around the maze, so that the walls on the
+    maze's left and top edges are stored like any other.
+    """
+
+    def __init__(self, width, height):
+        super().__init__((-1, -1), (width + 1, height + 1), walled=True)
+        # Of the ring, only the walls along the edges of the maze stay up.
+        self.remove_wall((-1, -1), walls.Side.RIGHT)
+        self.remove_wall((-1, -1), walls.Side.BOTTOM)
+        for x in range(width):
+            self.remove_wall((x, -1), walls.Side.RIGHT)
+        for y in range(height):
+            self.remove_wall((-1, y), walls.Side.BOTTOM)
+        self.end: Square = (0, 0)
+
+    def map_data(self) -> map_file.MapData:
+        """Returns a map of the maze, with its walls as a wall grid."""
+        return map_file.MapData({}, (), (), self.end, self.packed())
+
+
+def generate(width, height, seed=None) -> Maze:
+    """Generates a maze.
+
+    Args:
+      width: The number of squares across.
+      height: The number of squares down.
+      seed: The random seed. The same seed always gives the same maze.
+    """
+    randrange = random.Random(seed).randrange
+    maze = Maze(width, height)
+    size = width * height
+    visited = bytearray(size)
+    visited[0] = 1
+    # The path from the start to the square being carved from. Since there is
+    # only one way to each square, a square's distance from the start is how
+    # deep in the path it was reached.
+    path = [0]
+    end = 0
+    candidates = []
+    while path:
+        index = path[-1]
+        x = index % width
+        candidates.clear()
+        if x + 1 < width and not visited[index + 1]:
+            candidates.append((index + 1, walls.Side.RIGHT))
+        if x and not visited[index - 1]:
+            candidates.append((index - 1, walls.Side.LEFT))
+        if index + width < size and not visited[index + width]:
+            candidates.append((index + width, walls.Side.BOTTOM))
+        if index >= width and not visited[index - width]:
+            candidates.append((index - width, walls.Side.TOP))
+        if not candidates:
+            path.pop()
+            continue
+        neighbor, side = candidates[randrange(len(candidates))]
+        maze.remove_wall((x, index // width), side)
+        visited[neighbor] = 1
+        path.append(neighbor)
+        if len(path) > end:
+            end = len(path)
+            maze.end = (neighbor % width, neighbor // width)
+    return maze
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a random maze.')
+    parser.add_argument('width', type=int, help='number of squares across')
+    parser.add_argument('height', type=int, help='number of squares down')
+    parser.add_argument('target', help='compiled map to write')
+    parser.add_argument('--seed', type=int, default=None, help='random seed')
+    args = parser.parse_args()
+    maze = generate(args.width, args.height, args.seed)
+    with open(args.target, 'wb') as f:
+        f.write(map_file.compile_map(maze.map_data()))
+
+
+if __name__ == '__main__':
+    main()
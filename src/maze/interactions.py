@@ -2,9 +2,10 @@
 
 import dataclasses
 import enum
-import itertools
-from typing import ClassVar, Optional, Sequence, Set, Tuple, Union
+from typing import ClassVar, Iterable, Optional, Sequence, Set, Tuple, Union
+from . import map_file
 from . import play_objects
+from . import registry
 from . import walls
 
 Speed = Tuple[int, int]
@@ -109,72 +110,61 @@ class _Config:
 _Config.DEFAULT = _Config()
 
 
+def _registry(exact, prefixes) -> registry.Registry:
+    rules: registry.Registry = registry.Registry()
+    for name, value in exact.items():
+        rules.add(name, value)
+    for prefix, value in prefixes.items():
+        rules.add_prefix(prefix, value)
+    return rules
+
+
+_COLLISIONS = _registry({
+    'house': "You don't want to go back in the house.",
+    'key': "It's some sort of key.",
+    'gate': "There's a gate here, but it's locked.",
+    'billboard_2': 'It\'s a billboard. It says, "Go up."',
+    'billboard_3': '"Seriously, go up."',
+    'billboard_4': ('"Roses are red, violets are blue. My billboards are lies, '
+                    'did I fool you?"'),
+    'bunny_prints': 'What are these tracks?',
+    'bunny': 'A bunny! Your heart melts.',
+    'eggplant': 'An eggplant. Ew.',
+    'trash_can': 'Do you have the eggplant?',
+    'fishing_rod': 'Who left a fishing rod here?',
+    'lake': 'What a lovely calm lake.',
+    'angry_cat': 'Your way is blocked by an angry cat.',
+    'happy_cat': 'The well-fed cat purrs when you pet it.',
+    'cake': 'A huge chocolate cake!',
+    'invisible_wall': (
+        'Thinking of the cake, you suddenly crave something sweet.',
+        (Effect.remove_state('pre_crave'),)),
+    'bucket': 'You wonder why random stuff is scattered all over the place.',
+    'matches': 'Ooh, matches.',
+    'doll': "It's a worn cloth doll with button eyes and yarn hair.",
+    'shrubbery': 'Your way is blocked by a shrubbery.',
+    'fire': 'Your way is blocked by a flaming shrubbery.',
+    'hole': "It's a hole in the ground.",
+    'billboard_16': '"Go down."',
+    'billboard_10': ('"Roses are red, violets are blue. Believe it or not, I '
+                     'sometimes tell the truth =P"'),
+}, {
+    walls.PREFIX: "That's a wall...",
+    walls.PARTIAL_PREFIX: "That's a wall...",
+    'flowers_': 'The sweet scent of wildflowers makes your nose itch.',
+    'tree_': 'The tree leaves rustle gently in the breeze.',
+    'open_gate_': 'You walk into the gate. Ouch.',
+    'block_': 'An oversized alphabet block. How curious.',
+    'puzzle_': 'This wall looks unusual.',
+    'slotted_block_': 'This wall looks unusual.',
+})
+
+
 def _collision(name) -> Union[str, Tuple[str, Sequence[Effect]]]:
-    if walls.match(name) or walls.partial_match(name):
-        return "That's a wall..."
-    elif name == 'house':
-        return "You don't want to go back in the house."
-    elif name.startswith('flowers_'):
-        return 'The sweet scent of wildflowers makes your nose itch.'
-    elif name.startswith('tree_'):
-        return 'The tree leaves rustle gently in the breeze.'
-    elif name == 'key':
-        return "It's some sort of key."
-    elif name == 'gate':
-        return "There's a gate here, but it's locked."
-    elif name.startswith('open_gate_'):
-        return 'You walk into the gate. Ouch.'
-    elif name.startswith('block_'):
-        return 'An oversized alphabet block. How curious.'
-    elif name == 'billboard_2':
-        return 'It\'s a billboard. It says, "Go up."'
-    elif name == 'billboard_3':
-        return '"Seriously, go up."'
-    elif name == 'billboard_4':
-        return ('"Roses are red, violets are blue. My billboards are lies, '
-                'did I fool you?"')
-    elif name == 'bunny_prints':
-        return 'What are these tracks?'
-    elif name == 'bunny':
-        return 'A bunny! Your heart melts.'
-    elif name == 'eggplant':
-        return 'An eggplant. Ew.'
-    elif name == 'trash_can':
-        return 'Do you have the eggplant?'
-    elif name == 'fishing_rod':
-        return 'Who left a fishing rod here?'
-    elif name == 'lake':
-        return 'What a lovely calm lake.'
-    elif name == 'angry_cat':
-        return 'Your way is blocked by an angry cat.'
-    elif name == 'happy_cat':
-        return 'The well-fed cat purrs when you pet it.'
-    elif name == 'cake':
-        return 'A huge chocolate cake!'
-    elif name == 'invisible_wall':
-        return ('Thinking of the cake, you suddenly crave something sweet.',
-                (Effect.remove_state('pre_crave'),))
-    elif name == 'bucket':
-        return 'You wonder why random stuff is scattered all over the place.'
-    elif name == 'matches':
-        return 'Ooh, matches.'
-    elif name == 'doll':
-        return "It's a worn cloth doll with button eyes and yarn hair."
-    elif name == 'shrubbery':
-        return 'Your way is blocked by a shrubbery.'
-    elif name == 'fire':
-        return 'Your way is blocked by a flaming shrubbery.'
-    elif name == 'hole':
-        return "It's a hole in the ground."
-    elif name == 'billboard_16':
-        return '"Go down."'
-    elif name == 'billboard_10':
-        return ('"Roses are red, violets are blue. Believe it or not, I '
-                'sometimes tell the truth =P"')
-    elif name.startswith('puzzle_') or name.startswith('slotted_block_'):
-        return 'This wall looks unusual.'
-    else:
+    result = _COLLISIONS.get(name)
+    if result is None:
         raise NotImplementedError(f'Collided with {name}')
+    return result
 
 
 def collide(name, speed) -> Collision:
@@ -190,41 +180,47 @@ def _simple_obtain_effects(name):
     return [(Effect.add_item(name),), (Effect.remove_object(name),)]
 
 
+def _simple_obtain(reason):
+    return lambda name: Item(reason, *_simple_obtain_effects(name))
+
+
+def _obtain_fruit(name):
+    fruit = name[len('tree_'):]
+    return Item(f'You pick a ripe {fruit}.', (Effect.add_item(fruit),))
+
+
+def _obtain_slotted_block(name):
+    block_char = name[len('slotted_block_')]
+    slot_char = name[-1]
+    return Item('You pry the block back out of the wall slot.',
+                (Effect.add_item(f'block_{block_char}'),),
+                (Effect.hide_object(name),
+                 Effect.add_object(f'puzzle_slot_{slot_char}')))
+
+
+_OBTAIN = _registry({
+    **{f'tree_{fruit}': _obtain_fruit for fruit in play_objects.FRUITS},
+    'key': _simple_obtain('You pick up the key.'),
+    'eggplant': _simple_obtain(
+        'You gingerly pick up the disgusting vegetable.'),
+    'fishing_rod': _simple_obtain("You steal someone's fishing rod."),
+    'cake': lambda name: Item(
+        'On closer inspection, the cake is made of styrofoam.'),
+    'bucket': _simple_obtain('Finders keepers, right?'),
+    'matches': _simple_obtain(
+        'You never know what you may want to set on fire.'),
+    'hole': lambda name: Item(
+        'You fall into the hole and climb back out. You feel foolish.'),
+}, {
+    'block_': _simple_obtain(
+        'You decide to carry the giant wooden block around with you.'),
+    'slotted_block_': _obtain_slotted_block,
+})
+
+
 def obtain(name) -> Optional[Item]:
-    if name in (f'tree_{fruit}' for fruit in play_objects.FRUITS):
-        fruit = name[len('tree_'):]
-        return Item(f'You pick a ripe {fruit}.', (Effect.add_item(fruit),))
-    elif name == 'key':
-        return Item('You pick up the key.', *_simple_obtain_effects(name))
-    elif name.startswith('block_'):
-        return Item(
-            'You decide to carry the giant wooden block around with you.',
-            *_simple_obtain_effects(name))
-    elif name == 'eggplant':
-        return Item('You gingerly pick up the disgusting vegetable.',
-                    *_simple_obtain_effects(name))
-    elif name == 'fishing_rod':
-        return Item("You steal someone's fishing rod.",
-                    *_simple_obtain_effects(name))
-    elif name == 'cake':
-        return Item('On closer inspection, the cake is made of styrofoam.')
-    elif name == 'bucket':
-        return Item('Finders keepers, right?', *_simple_obtain_effects(name))
-    elif name == 'matches':
-        return Item('You never know what you may want to set on fire.',
-                    *_simple_obtain_effects(name))
-    elif name == 'hole':
-        return Item(
-            'You fall into the hole and climb back out. You feel foolish.')
-    elif name.startswith('slotted_block_'):
-        block_char = name[len('slotted_block_')]
-        slot_char = name[-1]
-        return Item('You pry the block back out of the wall slot.',
-                    (Effect.add_item(f'block_{block_char}'),),
-                    (Effect.hide_object(name),
-                     Effect.add_object(f'puzzle_slot_{slot_char}')))
-    else:
-        return None
+    rule = _OBTAIN.get(name)
+    return rule(name) if rule else None
 
 
 def _use_block(block_char, slot_char):
@@ -247,86 +243,120 @@ def _use_block(block_char, slot_char):
               item_effects, play_area_effects)
 
 
+def _use_fruit(name):
+    item_effects = (Effect.remove_item(name),)
+    reason = f'You eat the {name}. '
+    return [Use(reason + 'Yum.', ('pre_crave',), item_effects),
+            Use(reason + 'Your sweet craving is satisfied.',
+                ('invisible_wall',), item_effects,
+                (Effect.remove_object('invisible_wall'),)),
+            Use(reason + 'You feel bloated.', (), item_effects)]
+
+
+def _use_key(name):
+    play_area_effects = (Effect.remove_object('gate'),
+                         Effect.add_object('open_gate_left'),
+                         Effect.add_object('open_gate_right'))
+    return [Use('You unlock the gate.', ('gate',),
+                (Effect.remove_item('key'),), play_area_effects)]
+
+
+def _use_block_item(name):
+    block_char = name[len('block_'):]
+    uses = []
+    for slot_char in 'LOVE':
+        uses.extend(_use_block(block_char, slot_char))
+    return uses
+
+
+def _use_eggplant(name):
+    return [
+        Use('You feed the cat the eggplant. The cat is even angrier now.',
+            ('angry_cat',), (Effect.remove_item('eggplant'),)),
+        Use("Yeah, you don't need that.", ('trash_can',),
+            (Effect.remove_item('eggplant'),))]
+
+
+def _use_fishing_rod(name):
+    item_effects = (Effect.remove_item('fishing_rod'),
+                    Effect.add_item('fish'))
+    return [Use("You catch a tasty-looking fish.", ('lake',), item_effects)]
+
+
+def _use_fish(name):
+    play_area_effects = (Effect.remove_object('angry_cat'),
+                         Effect.add_object('happy_cat'))
+    return [
+        Use('You feed the cat the fish. The cat is happy.', ('angry_cat',),
+            (Effect.remove_item('fish'),), play_area_effects)]
+
+
+def _use_bucket(name):
+    item_effects = (Effect.remove_item('bucket'),
+                    Effect.add_item('filled_bucket'))
+    return [Use('You fill the bucket with lake water.', ('lake',),
+                item_effects)]
+
+
+def _use_filled_bucket(name):
+    play_area_effects = (Effect.remove_object('shrubbery'),
+                         Effect.remove_object('fire'))
+    return [Use('You put out the fire. The shrubbery has been burned down.',
+                ('fire',), (Effect.remove_item('filled_bucket'),),
+                play_area_effects)]
+
+
+def _use_matches(name):
+    return [
+        Use('You burn the well-loved doll to ashes. You monster.',
+            ('doll',), play_area_effects=(Effect.remove_object('doll'),)),
+        Use('Your way is now blocked by a flaming shrubbery.',
+            ('shrubbery',), (Effect.remove_item('matches'),),
+            (Effect.add_object('fire'),))]
+
+
+_USES = _registry({
+    **{fruit: _use_fruit for fruit in play_objects.FRUITS},
+    'key': _use_key,
+    'eggplant': _use_eggplant,
+    'fishing_rod': _use_fishing_rod,
+    'fish': _use_fish,
+    'bucket': _use_bucket,
+    'filled_bucket': _use_filled_bucket,
+    'matches': _use_matches,
+}, {
+    'block_': _use_block_item,
+})
+
+# Every item the player can carry.
+ITEMS = (*play_objects.FRUITS, 'key', 'eggplant', 'fishing_rod', 'fish',
+         'bucket', 'filled_bucket', 'matches',
+         *(f'block_{char}' for char in 'LOVE'))
+
+
 def use(name) -> Sequence[Use]:
-    if name in play_objects.FRUITS:
-        item_effects = (Effect.remove_item(name),)
-        reason = f'You eat the {name}. '
-        return [Use(reason + 'Yum.', ('pre_crave',), item_effects),
-                Use(reason + 'Your sweet craving is satisfied.',
-                    ('invisible_wall',), item_effects,
-                    (Effect.remove_object('invisible_wall'),)),
-                Use(reason + 'You feel bloated.', (), item_effects)]
-    elif name == 'key':
-        play_area_effects = (Effect.remove_object('gate'),
-                             Effect.add_object('open_gate_left'),
-                             Effect.add_object('open_gate_right'))
-        return [Use('You unlock the gate.', ('gate',),
-                    (Effect.remove_item('key'),), play_area_effects)]
-    elif name.startswith('block_'):
-        block_char = name[len('block_'):]
-        uses = []
-        for slot_char in 'LOVE':
-            uses.extend(_use_block(block_char, slot_char))
-        return uses
-    elif name == 'eggplant':
-        return [
-            Use('You feed the cat the eggplant. The cat is even angrier now.',
-                ('angry_cat',), (Effect.remove_item('eggplant'),)),
-            Use("Yeah, you don't need that.", ('trash_can',),
-                (Effect.remove_item('eggplant'),))]
-    elif name == 'fishing_rod':
-        item_effects = (Effect.remove_item('fishing_rod'),
-                        Effect.add_item('fish'))
-        return [Use("You catch a tasty-looking fish.", ('lake',), item_effects)]
-    elif name == 'fish':
-        play_area_effects = (Effect.remove_object('angry_cat'),
-                             Effect.add_object('happy_cat'))
-        return [
-            Use('You feed the cat the fish. The cat is happy.', ('angry_cat',),
-                (Effect.remove_item('fish'),), play_area_effects)]
-    elif name == 'bucket':
-        item_effects = (Effect.remove_item('bucket'),
-                        Effect.add_item('filled_bucket'))
-        return [Use('You fill the bucket with lake water.', ('lake',),
-                    item_effects)]
-    elif name == 'filled_bucket':
-        play_area_effects = (Effect.remove_object('shrubbery'),
-                             Effect.remove_object('fire'))
-        return [Use('You put out the fire. The shrubbery has been burned down.',
-                    ('fire',), (Effect.remove_item('filled_bucket'),),
-                    play_area_effects)]
-    elif name == 'matches':
-        return [
-            Use('You burn the well-loved doll to ashes. You monster.',
-                ('doll',), play_area_effects=(Effect.remove_object('doll'),)),
-            Use('Your way is now blocked by a flaming shrubbery.',
-                ('shrubbery',), (Effect.remove_item('matches'),),
-                (Effect.add_object('fire'),))]
-    else:
+    rule = _USES.get(name)
+    if rule is None:
         raise NotImplementedError(f'Used {name}')
+    return rule(name)
 
 
-_CUSTOM_CONFIG = {
-    'tree_peach': _Config(squares={(0, 0), (-1, 0), (-1, 1)}),
-    'fishing_rod': _Config(squares={(1, 2), (1, 3)}),
-    'cake': _Config(squares={(2, 1), (3, 1)}),
-    'invisible_wall': _Config(squares=Squares.ALL),
-    'shrubbery': _Config(squares={(3, 1), (4, 1)}),
-    'fire': _Config(squares={(3, 1), (4, 1)}),
-    'puzzle_door': _Config(squares={(2, 3), (2, 4)}, inflation=(360, 175)),
-    'puzzle_slot_L': _Config(squares={(2, 3), (2, 4)}, inflation=(-40, 100)),
-    'puzzle_slot_O': _Config(squares={(2, 3), (2, 4)}, inflation=(-40, 100)),
-    'puzzle_slot_V': _Config(squares={(2, 3), (2, 4)}, inflation=(-40, 100)),
-    'puzzle_slot_E': _Config(squares={(2, 3), (2, 4)}, inflation=(-40, 100)),
-}
+def _config(entry) -> _Config:
+    config = _Config()
+    if entry.all_squares:
+        config.squares = Squares.ALL
+    elif entry.squares is not None:
+        config.squares = set(entry.squares)
+    if entry.inflation is not None:
+        config.inflation = entry.inflation
+    return config
 
 
-for block_char, slot_char in itertools.product('LOVE', repeat=2):
-    inflate_x = 840 if slot_char in 'LE' else 600
-    _CUSTOM_CONFIG[f'slotted_block_{block_char}_in_{slot_char}'] = _Config(
-        squares={(2, 3), (2, 4)}, inflation=(inflate_x, 100))
-del block_char, slot_char, inflate_x  # pyrefly: ignore[unbound-name]
+class Config:
+    """The custom interaction config of a map's objects."""
 
+    def __init__(self, entries: Iterable[map_file.ConfigEntry] = ()):
+        self._configs = {entry.name: _config(entry) for entry in entries}
 
-def config(name, attr):
-    return getattr(_CUSTOM_CONFIG.get(name, _Config.DEFAULT), attr)
+    def get(self, name, attr):
+        return getattr(self._configs.get(name, _Config.DEFAULT), attr)
@@ -5,6 +5,11 @@ import os
 import pygame
 
 from common import state as common_state
+from . import play_objects
+from . import profiling
+from . import replay
+from . import simulation
+from . import snapshot
 from . import state
 
 
@@ -20,24 +25,80 @@ def parse_args():
     parser = argparse.ArgumentParser(description='kitty maze game')
     parser.add_argument('-s', '--skip-title', action='store_true',
                         default=False, help='skip the title card')
+    parser.add_argument('--fps', action='store', default=state.DEFAULT_FPS,
+                        type=int, help='maximum frame rate')
+    # A recording replays from the start of the game, so it can't start from
+    # a saved game.
+    start = parser.add_mutually_exclusive_group()
+    start.add_argument('--record', action='store', default=None,
+                       metavar='LOG', help='record the session to a file')
+    parser.add_argument('--replay', action='store', default=None,
+                        metavar='LOG',
+                        help='replay a recorded session, with the same --map')
+    parser.add_argument('--no-render', action='store_true', default=False,
+                        help='replay without rendering')
+    parser.add_argument('--map', action='store', default=None,
+                        metavar='FILE',
+                        help='play a map file, either JSON or compiled, '
+                        'instead of the built-in maze')
+    start.add_argument('--state', action='store', default=None,
+                       metavar='FILE',
+                       help='resume the game saved in a file, if it exists, '
+                       'and save the game to it on exit')
     if _IS_SOURCE_INSTALL:
         parser.add_argument('--debug', action='store_true')
+        parser.add_argument('--profile', action='store', default=None,
+                            metavar='FILE',
+                            help='time each frame and write percentiles to a '
+                            'JSON or CSV file on exit')
         parser.add_argument('--cheat', action='store', default=None,
                             type=_parse_cheat)
     return parser.parse_args()
 
 
+def _replay(args, debug, game_map):
+    with open(args.replay, 'rb') as f:
+        cheat = replay.read_header(f)
+        if args.no_render:
+            game = simulation.Simulation(debug, cheat, game_map=game_map).game
+        else:
+            pygame.init()
+            screen = pygame.display.set_mode(common_state.RECT.size)
+            pygame.display.set_caption('Kitty Maze (replay)')
+            # The default clock only fires ticks when run() advances it.
+            game = state.Game(screen, debug, cheat, game_map=game_map)
+        replay.replay(game, f)
+
+
 def main():
     args = parse_args()
+    debug = getattr(args, 'debug', False)
+    game_map = play_objects.load(args.map) if args.map else None
+    if args.replay:
+        _replay(args, debug, game_map)
+        return
     pygame.init()
     screen = pygame.display.set_mode(common_state.RECT.size)
     pygame.display.set_caption('Kitty Maze')
     if not args.skip_title:
         common_state.TitleCard(screen).run()
         state.ShortEscapeEnding(screen).run()
-    debug = getattr(args, 'debug', False)
     cheat = getattr(args, 'cheat', None)
-    state.Game(screen, debug, cheat).run()
+    recorder = (replay.Recorder(open(args.record, 'wb'), cheat)
+                if args.record else None)
+    profile = getattr(args, 'profile', None)
+    profiler = profiling.Profiler() if profile else None
+    game = state.Game(screen, debug, cheat, recorder=recorder, fps=args.fps,
+                      profiler=profiler, game_map=game_map)
+    if args.state and os.path.exists(args.state):
+        with open(args.state, 'rb') as f:
+            snapshot.restore(game, snapshot.Snapshot.from_bytes(f.read()))
+    game.run()
+    if args.state:
+        with open(args.state, 'wb') as f:
+            f.write(snapshot.capture(game).to_bytes())
+    if profiler:
+        profiler.dump(profile)
 
 
 if __name__ == '__main__':
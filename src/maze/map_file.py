@@ -0,0 +1,438 @@
+"""Map files.
+
+A map is a list of object entries, split into named groups, plus the custom
+interaction config of some objects. Maps are written as JSON:
+
+    {
+      "version": 1,
+      "static": ["walls"],
+      "groups": {
+        "walls": [
+          {"name": "wall_sright", "kind": "wall", "square": [0, 0],
+           "side": "right"}
+        ],
+        "scenery": [
+          {"name": "house", "kind": "class", "class": "House"},
+          {"name": "tree_3", "kind": "tree", "square": [1, -1],
+           "offset": [350, 25]},
+          {"name": "gate", "kind": "image", "image": "gate", "square": [0, 0],
+           "offset": [400, 15], "shift": [-0.5, -1]}
+        ]
+      },
+      "config": {"gate": {"squares": [[0, 0], [0, 1]], "inflation": [50, 50]}},
+      "end": [2, 4]
+    }
+
+Squares are map squares as in play_map, and offsets are pixel offsets into a
+square. "static" lists the groups whose objects never move or change, and
+"end" is the square to reach, if not play_map.END_SQUARE.
+
+A JSON map can be compiled to a binary form that is memory-mapped when loaded.
+Loading a compiled map only reads its header and group table; entries are
+decoded when they are accessed, so even very large maps load in milliseconds.
+An entry takes 24 bytes, plus 16 for each of its offset and shift that isn't
+the default, and walls named by wall_name() don't store their names.
+
+A compiled map can also have a wall grid, packed two bits per square as in
+walls.Grid, for maps such as generated mazes that are mostly walls on a grid.
+The grid's walls are static and named by wall_name().
+
+The built-in map is edited as maps/maze.json and ships compiled:
+
+    python -m maze.map_file src/maze/maps/maze.json src/maze/maps/maze.map
+"""
+
+import argparse
+import dataclasses
+import enum
+import functools
+import json
+import mmap
+import os
+import struct
+from typing import (Dict, Iterator, List, Optional, Sequence, Tuple, Union,
+                    overload)
+
+_MAPS_DIR = os.path.join(os.path.dirname(__file__), 'maps')
+# The built-in map, and the JSON map that it is compiled from.
+DEFAULT_PATH = os.path.join(_MAPS_DIR, 'maze.map')
+SOURCE_PATH = os.path.join(_MAPS_DIR, 'maze.json')
+
+_VERSION = 1
+_BINARY_VERSION = 4
+_MAGIC = b'MZMP'
+# Magic, version, flags, then the number of strings, groups, entries, pairs,
+# config entries and config squares, then the end square, then the origin and
+# size of the wall grid.
+_HEADER = struct.Struct('<4sHBx6I2i2i2I')
+# Name, first entry, number of entries, static flag.
+_GROUP = struct.Struct('<3IB3x')
+# Name, image or class name, kind, side, flags, square, first pair.
+_ENTRY = struct.Struct('<2I3Bx2iI')
+# An entry's offset or shift.
+_PAIR = struct.Struct('<2d')
+# Name, flags, inflation, first square, number of squares.
+_CONFIG = struct.Struct('<IB3x2i2I')
+_SQUARE = struct.Struct('<2i')
+_OFFSET = struct.Struct('<I')
+# Marks a missing string.
+_NO_STRING = 0xFFFFFFFF
+_SIDES = (None, 'left', 'right', 'top', 'bottom')
+
+_HAS_END = 1
+_HAS_WALL_GRID = 2
+_HAS_OFFSET = 1
+_HAS_SHIFT = 2
+_HAS_SQUARES = 1
+_ALL_SQUARES = 2
+_HAS_INFLATION = 4
+
+Square = Tuple[int, int]
+
+
+def wall_name(square, side) -> str:
+    """Returns the name of a wall that a compiled map doesn't need to store."""
+    x, y = square
+    return f'wall_{x}_{y}_{side}'
+
+
+class Kind(enum.IntEnum):
+    WALL = 0
+    IMAGE = 1
+    TREE = 2
+    CLASS = 3
+
+
+@dataclasses.dataclass(frozen=True)
+class Entry:
+    name: str
+    kind: Kind
+    square: Square = (0, 0)
+    # Pixel offset into the square, if the object isn't at its top-left corner.
+    offset: Optional[Tuple[float, float]] = None
+    # Shift by a fraction of the object's size, as in img.PngFactory.
+    shift: Tuple[float, float] = (0, 0)
+    # The wall side, for walls.
+    side: Optional[str] = None
+    # The image name for images, or the play_objects class name for classes.
+    ref: Optional[str] = None
+
+
+@dataclasses.dataclass(frozen=True)
+class WallGrid:
+    origin: Square
+    # The number of squares across and down.
+    size: Tuple[int, int]
+    # The bytes of a walls.Grid.
+    data: bytes
+
+
+@dataclasses.dataclass(frozen=True)
+class ConfigEntry:
+    name: str
+    squares: Optional[Tuple[Square, ...]] = None
+    all_squares: bool = False
+    inflation: Optional[Tuple[int, int]] = None
+
+
+class MapData:
+    """The entries and config of a map."""
+
+    def __init__(self, groups: Dict[str, Sequence[Entry]],
+                 static: Sequence[str], config: Sequence[ConfigEntry],
+                 end: Optional[Square] = None,
+                 wall_grid: Optional[WallGrid] = None):
+        self._groups = groups
+        self.static = tuple(static)
+        self.config = config
+        self.end = end
+        self.wall_grid = wall_grid
+
+    @property
+    def group_names(self) -> Tuple[str, ...]:
+        return tuple(self._groups)
+
+    def group(self, name) -> Sequence[Entry]:
+        return self._groups.get(name, ())
+
+    def entries(self) -> Iterator[Entry]:
+        for entries in self._groups.values():
+            yield from entries
+
+
+def _number(value):
+    return int(value) if float(value).is_integer() else value
+
+
+def _pair(value) -> Tuple:
+    x, y = value
+    return (_number(x), _number(y))
+
+
+def _entry_from_json(data) -> Entry:
+    kind = Kind[data['kind'].upper()]
+    offset = data.get('offset')
+    return Entry(
+        name=data['name'], kind=kind, square=_pair(data.get('square', (0, 0))),
+        offset=None if offset is None else _pair(offset),
+        shift=_pair(data.get('shift', (0, 0))), side=data.get('side'),
+        ref=data.get('image', data.get('class')))
+
+
+def _config_from_json(name, data) -> ConfigEntry:
+    squares = data.get('squares')
+    inflation = data.get('inflation')
+    return ConfigEntry(
+        name=name,
+        squares=(None if squares in (None, 'all') else
+                 tuple(_pair(square) for square in squares)),
+        all_squares=squares == 'all',
+        inflation=None if inflation is None else _pair(inflation))
+
+
+def from_json(data) -> MapData:
+    if data.get('version') != _VERSION:
+        raise ValueError(f'Unsupported map version {data.get("version")}')
+    groups: Dict[str, Sequence[Entry]] = {
+        name: [_entry_from_json(entry) for entry in entries]
+        for name, entries in data['groups'].items()}
+    config = [_config_from_json(name, entry)
+              for name, entry in data.get('config', {}).items()]
+    end = data.get('end')
+    return MapData(groups, data.get('static', ()), config,
+                   None if end is None else _pair(end))
+
+
+class _Strings:
+    """Interns the strings of a map being compiled."""
+
+    def __init__(self):
+        self._indices: Dict[str, int] = {}
+
+    def add(self, value):
+        if value is None:
+            return _NO_STRING
+        return self._indices.setdefault(value, len(self._indices))
+
+    def pack(self) -> Tuple[bytes, bytes]:
+        offsets = bytearray()
+        blob = bytearray()
+        for value in self._indices:
+            offsets += _OFFSET.pack(len(blob))
+            blob += value.encode()
+        offsets += _OFFSET.pack(len(blob))
+        return bytes(offsets), bytes(blob)
+
+
+def compile_map(map_data: MapData) -> bytes:
+    """Returns the binary form of a map."""
+    strings = _Strings()
+    groups = bytearray()
+    entries = bytearray()
+    pairs = bytearray()
+    entry_count = 0
+    pair_count = 0
+    pack_entry = _ENTRY.pack
+    sides = {side: i for i, side in enumerate(_SIDES)}
+    for name in map_data.group_names:
+        group = map_data.group(name)
+        groups += _GROUP.pack(strings.add(name), entry_count, len(group),
+                              name in map_data.static)
+        for entry in group:
+            flags = 0
+            first_pair = pair_count
+            if entry.offset is not None:
+                flags |= _HAS_OFFSET
+                pairs += _PAIR.pack(*entry.offset)
+                pair_count += 1
+            if entry.shift != (0, 0):
+                flags |= _HAS_SHIFT
+                pairs += _PAIR.pack(*entry.shift)
+                pair_count += 1
+            if (entry.kind is Kind.WALL and
+                    entry.name == wall_name(entry.square, entry.side)):
+                name_index = _NO_STRING
+            else:
+                name_index = strings.add(entry.name)
+            entries += pack_entry(
+                name_index, strings.add(entry.ref), entry.kind,
+                sides[entry.side], flags, *entry.square, first_pair)
+        entry_count += len(group)
+    configs = bytearray()
+    squares = bytearray()
+    square_count = 0
+    for config in map_data.config:
+        flags = ((_HAS_SQUARES if config.squares is not None else 0) |
+                 (_ALL_SQUARES if config.all_squares else 0) |
+                 (_HAS_INFLATION if config.inflation is not None else 0))
+        config_squares = config.squares or ()
+        configs += _CONFIG.pack(
+            strings.add(config.name), flags, *(config.inflation or (0, 0)),
+            square_count, len(config_squares))
+        for square in config_squares:
+            squares += _SQUARE.pack(*square)
+        square_count += len(config_squares)
+    offsets, blob = strings.pack()
+    wall_grid = map_data.wall_grid or WallGrid((0, 0), (0, 0), b'')
+    header = _HEADER.pack(
+        _MAGIC, _BINARY_VERSION,
+        ((_HAS_END if map_data.end else 0) |
+         (_HAS_WALL_GRID if map_data.wall_grid else 0)),
+        len(offsets) // _OFFSET.size - 1, len(map_data.group_names),
+        entry_count, pair_count, len(map_data.config), square_count,
+        *(map_data.end or (0, 0)), *wall_grid.origin, *wall_grid.size)
+    return b''.join((header, groups, entries, pairs, configs, squares, offsets,
+                     blob, wall_grid.data))
+
+
+class _Binary:
+    """Decodes the sections of a compiled map in a buffer."""
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        (magic, version, flags, string_count, group_count, entry_count,
+         pair_count, config_count, square_count, end_x, end_y, grid_x, grid_y,
+         grid_width, grid_height) = _HEADER.unpack_from(buffer)
+        if magic != _MAGIC:
+            raise ValueError('Not a compiled map')
+        if version != _BINARY_VERSION:
+            raise ValueError(f'Unsupported map version {version}')
+        self.group_count = group_count
+        self.config_count = config_count
+        self.end = (end_x, end_y) if flags & _HAS_END else None
+        self._groups_start = _HEADER.size
+        self._entries_start = self._groups_start + group_count * _GROUP.size
+        self._pairs_start = self._entries_start + entry_count * _ENTRY.size
+        self._configs_start = self._pairs_start + pair_count * _PAIR.size
+        self._squares_start = self._configs_start + config_count * _CONFIG.size
+        self._offsets_start = self._squares_start + square_count * _SQUARE.size
+        self._blob_start = self._offsets_start + (
+            string_count + 1) * _OFFSET.size
+        self.wall_grid: Optional[WallGrid] = None
+        if flags & _HAS_WALL_GRID:
+            blob_size, = _OFFSET.unpack_from(
+                buffer, self._blob_start - _OFFSET.size)
+            grid_start = self._blob_start + blob_size
+            # Four squares per byte.
+            grid_end = grid_start + (grid_width * grid_height + 3) // 4
+            self.wall_grid = WallGrid((grid_x, grid_y),
+                                      (grid_width, grid_height),
+                                      bytes(buffer[grid_start:grid_end]))
+        self._string = functools.lru_cache(maxsize=None)(self._decode_string)
+
+    def _decode_string(self, index):
+        if index == _NO_STRING:
+            return None
+        start, end = struct.unpack_from(
+            '<2I', self._buffer, self._offsets_start + index * _OFFSET.size)
+        return str(self._buffer[
+            self._blob_start + start:self._blob_start + end], 'utf-8')
+
+    def group(self, index) -> Tuple[str, int, int, bool]:
+        name, start, count, static = _GROUP.unpack_from(
+            self._buffer, self._groups_start + index * _GROUP.size)
+        return self._string(name), start, count, bool(static)
+
+    def _pair(self, index) -> Tuple:
+        return _pair(_PAIR.unpack_from(
+            self._buffer, self._pairs_start + index * _PAIR.size))
+
+    def entry(self, index) -> Entry:
+        name, ref, kind, side, flags, square_x, square_y, pair = (
+            _ENTRY.unpack_from(
+                self._buffer, self._entries_start + index * _ENTRY.size))
+        square = (square_x, square_y)
+        offset = None
+        if flags & _HAS_OFFSET:
+            offset = self._pair(pair)
+            pair += 1
+        return Entry(
+            name=(wall_name(square, _SIDES[side]) if name == _NO_STRING else
+                  self._string(name)),
+            kind=Kind(kind), square=square, offset=offset,
+            shift=self._pair(pair) if flags & _HAS_SHIFT else (0, 0),
+            side=_SIDES[side], ref=self._string(ref))
+
+    def config(self, index) -> ConfigEntry:
+        name, flags, inflation_x, inflation_y, start, count = (
+            _CONFIG.unpack_from(
+                self._buffer, self._configs_start + index * _CONFIG.size))
+        squares = tuple(_SQUARE.unpack_from(
+            self._buffer, self._squares_start + i * _SQUARE.size)
+            for i in range(start, start + count))
+        return ConfigEntry(
+            name=self._string(name),
+            squares=squares if flags & _HAS_SQUARES else None,
+            all_squares=bool(flags & _ALL_SQUARES),
+            inflation=((inflation_x, inflation_y) if flags & _HAS_INFLATION
+                       else None))
+
+
+class _LazyEntries(Sequence[Entry]):
+    """A group of entries in a compiled map, decoded on access."""
+
+    def __init__(self, binary: _Binary, start, count):
+        self._binary = binary
+        self._start = start
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    @overload
+    def __getitem__(self, index: int) -> Entry: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> Sequence[Entry]: ...
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        return self._binary.entry(self._start + index)
+
+
+def from_binary(buffer) -> MapData:
+    """Reads a compiled map from a buffer, such as an mmap."""
+    binary = _Binary(buffer)
+    groups: Dict[str, Sequence[Entry]] = {}
+    static: List[str] = []
+    for i in range(binary.group_count):
+        name, start, count, is_static = binary.group(i)
+        groups[name] = _LazyEntries(binary, start, count)
+        if is_static:
+            static.append(name)
+    config = [binary.config(i) for i in range(binary.config_count)]
+    return MapData(groups, static, config, binary.end, binary.wall_grid)
+
+
+def load(path) -> MapData:
+    """Loads a map from a JSON file or a compiled map file."""
+    with open(path, 'rb') as f:
+        if f.read(len(_MAGIC)) != _MAGIC:
+            f.seek(0)
+            return from_json(json.load(f))
+        return from_binary(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+@functools.cache
+def default() -> MapData:
+    """Returns the built-in map."""
+    return load(DEFAULT_PATH)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile a JSON map.')
+    parser.add_argument('source', help='JSON map')
+    parser.add_argument('target', help='compiled map to write')
+    args = parser.parse_args()
+    compiled = compile_map(load(args.source))
+    with open(args.target, 'wb') as f:
+        f.write(compiled)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,7 @@
 """Base classes for game objects."""
 
 import pygame
-from typing import Callable, Mapping, Tuple
+from typing import Callable, Dict, List, Mapping, MutableMapping, Tuple
 
 from common import img
 
@@ -12,9 +12,56 @@ class Rect(img.RectFactory):
     """A colored, drawable rectangle."""
 
     COLOR: Tuple[int, int, int]
+    # Whether the rect needs to be redrawn. Subclasses set this whenever their
+    # appearance changes.
+    dirty = True
 
     def draw(self):
         pygame.draw.rect(self._screen, self.COLOR, self.RECT)
+        self.dirty = False
+
+
+class LazyObjects(MutableMapping[str, img.RectFactory]):
+    """Objects that are only created from their factories when first accessed.
+
+    This is for objects that often go unused, such as hidden objects that most
+    players never reveal.
+    """
+
+    def __init__(self, screen, factories: ObjectsType):
+        self._screen = screen
+        self._factories = dict(factories)
+        self._objects: Dict[str, img.RectFactory] = {}
+
+    @property
+    def created(self):
+        """The names of the objects that have been created."""
+        return self._objects.keys()
+
+    def __getitem__(self, name):
+        if name not in self._objects:
+            self._objects[name] = self._factories.pop(name)(self._screen)
+        return self._objects[name]
+
+    def __setitem__(self, name, obj):
+        self._factories.pop(name, None)
+        self._objects[name] = obj
+
+    def __delitem__(self, name):
+        if name in self._objects:
+            del self._objects[name]
+        else:
+            del self._factories[name]
+
+    def __contains__(self, name):
+        return name in self._objects or name in self._factories
+
+    def __iter__(self):
+        yield from self._objects
+        yield from self._factories
+
+    def __len__(self):
+        return len(self._objects) + len(self._factories)
 
 
 class Surface(img.RectFactory):
@@ -40,3 +87,23 @@ class Surface(img.RectFactory):
         for obj in self._objects.values():
             if self._visible(obj):
                 obj.draw()
+
+    def mark_dirty(self):
+        for obj in self._objects.values():
+            if isinstance(obj, Rect):
+                obj.dirty = True
+
+    def draw_dirty(self) -> List[pygame.Rect]:
+        """Redraws only the objects that have changed.
+
+        Objects that don't track changes are always redrawn.
+
+        Returns:
+          The redrawn areas in screen coordinates.
+        """
+        rects = []
+        for obj in self._objects.values():
+            if (not isinstance(obj, Rect) or obj.dirty) and self._visible(obj):
+                obj.draw()
+                rects.append(obj.RECT.move(self.RECT.topleft))
+        return rects
@@ -1,17 +1,24 @@
 """Gameplay area."""
 
-import itertools
+import collections
+import dataclasses
+import math
 import pygame
 from pygame.locals import *
-from typing import Iterable, Optional, Sequence, Union, cast
+from typing import (AbstractSet, Dict, Iterable, List, Optional, Sequence,
+                    Tuple, Type, Union, cast)
 
 from common import color
 from common import img
 from common import state
+from . import assets
+from . import clocks
 from . import interactions
 from . import objects
 from . import play_map
 from . import play_objects
+from . import spatial_index
+from . import static_layer
 from . import walls
 
 _TICK = pygame.USEREVENT
@@ -29,15 +36,76 @@ def _shift_speed(speed, direction):
                  for s in speed)
 
 
-def _decelerate(speed) -> Optional[interactions.Speed]:
-    speed = _shift_speed(speed, -1)
-    return None if speed == (0, 0) else speed
+def _decelerate(speed, steps=1) -> Optional[interactions.Speed]:
+    # A speed component that would drop past zero stops instead.
+    delta = steps * _PLAYER_SPEED_INTERVAL
+    x, y = (s - delta * s / abs(s) if abs(s) > delta else 0 for s in speed)
+    return None if (x, y) == (0, 0) else (x, y)
 
 
 def _accelerate(speed):
     return _shift_speed(speed, 1)
 
 
+def _axis_steps_to_clear(feet_span, rect_span, speed):
+    feet_lo, feet_hi = feet_span
+    rect_lo, rect_hi = rect_span
+    if not speed:
+        return 0 if feet_lo >= rect_hi or rect_lo >= feet_hi else math.inf
+    if speed < 0:
+        # The player walks towards increasing coordinates.
+        if feet_lo >= rect_hi:
+            return 0
+        gap = rect_lo - feet_hi
+    else:
+        if rect_lo >= feet_hi:
+            return 0
+        gap = feet_lo - rect_hi
+    if gap < 0:
+        return math.inf
+    return max(0, math.ceil((int(abs(speed)) - gap) / _PLAYER_SPEED_INTERVAL))
+
+
+def _steps_to_clear(feet_rect, rect, speed):
+    """Returns how many times to decelerate for the player to miss the rect.
+
+    The player's path is the union of his feet and his feet moved against the
+    scroll speed. Each deceleration pulls the leading edge of the path back by
+    _PLAYER_SPEED_INTERVAL, and the path misses the rect as soon as it misses
+    along either axis, so the answer can be computed directly. Returns
+    math.inf if the feet already overlap the rect.
+    """
+    if isinstance(rect, play_objects._MultiRect):
+        # A composite shape is missed if its bounding rect or every one of its
+        # parts is missed.
+        return min(_steps_to_clear(feet_rect, pygame.Rect(rect), speed),
+                   max((_steps_to_clear(feet_rect, part, speed)
+                        for part in rect._get_rects()), default=0))
+    if rect.w < 0 or rect.h < 0:
+        # Like colliderect, treat rects with negative sizes as normalized.
+        rect = pygame.Rect(rect)
+        rect.normalize()
+    if not rect.w or not rect.h:
+        return 0
+    return min(
+        _axis_steps_to_clear((feet_rect.topleft[i], feet_rect.bottomright[i]),
+                             (rect.topleft[i], rect.bottomright[i]), speed[i])
+        for i in range(2))
+
+
+@dataclasses.dataclass(frozen=True)
+class Snapshot:
+    """The parts of a play area that change as the game is played."""
+
+    camera_offset: Tuple[int, int]
+    # The names of the objects in the play area, in drawing order.
+    visible: Tuple[str, ...]
+    # The names of the hidden objects.
+    hidden: Tuple[str, ...]
+    # The state flags that are still set.
+    state: Tuple[str, ...]
+
+
 class Surface(objects.Surface):
     """A subsurface with movable objects on it."""
 
@@ -46,69 +114,181 @@ class Surface(objects.Surface):
     OBJECTS = play_objects.VISIBLE
     _HIDDEN_OBJECTS: objects.ObjectsType = play_objects.HIDDEN
     _STATE: Sequence[str] = play_objects.STATE
+    _STATIC: AbstractSet[str] = play_objects.STATIC
+    _CONFIG = interactions.Config(play_objects.DEFAULT.config)
+    # The kind of spatial index, or None to choose one for the objects.
+    _INDEX: Optional[Type[spatial_index.Index]] = None
+
+    def __init__(self, screen, clock: Optional[clocks.Clock] = None,
+                 game_map: Optional[play_objects.Map] = None):
+        """Initializer.
 
-    def __init__(self, screen):
+        Args:
+          screen: The surface to draw on.
+          clock: The source of timer events.
+          game_map: The map to play. Defaults to the built-in one.
+        """
+        if game_map:
+            self.OBJECTS = game_map.visible
+            self._HIDDEN_OBJECTS = game_map.hidden
+            self._STATIC = game_map.static
+            self._STATE = game_map.state
+            self._CONFIG = interactions.Config(game_map.config)
         super().__init__(screen)
-        self._hidden_objects = {name: cls(self._surface)
-                                for name, cls in self._HIDDEN_OBJECTS.items()}
+        # Hidden objects are created when they are first added to the play area.
+        self._hidden_objects = objects.LazyObjects(
+            self._surface, self._HIDDEN_OBJECTS)
         self._state = {name: object() for name in self._STATE}
-        self.player = img.load('player', self._surface,
-                               (state.RECT.h / 2, state.RECT.h / 2),
-                               (-0.5, -0.5))
+        # The interaction config of the objects.
+        self.config = self._CONFIG
+        self._index_cls = self._INDEX or spatial_index.choose(
+            obj.RECT for obj in self._objects.values())
+        self._index = self._index_cls()
+        # Maps each square to the walls along its edges.
+        self._walls_by_square: Dict[Tuple[int, int], List[str]] = (
+            collections.defaultdict(list))
+        for name, obj in self._objects.items():
+            self._index.add(name, obj.RECT)
+            if walls.match(name):
+                for square in cast(walls.Wall, obj).adjacent_squares:
+                    self._walls_by_square[square].append(name)
+        # The square whose walls were last looked up, and the walls.
+        self._walls_square: Optional[Tuple[int, int]] = None
+        self._square_walls: Sequence[str] = ()
+        self.player = assets.PngFactory(
+            'player', self._surface, (state.RECT.h / 2, state.RECT.h / 2),
+            (-0.5, -0.5))
+        # Static objects are pre-rendered in chunks rather than drawn
+        # individually each frame.
+        self._static_layer = static_layer.StaticLayer(self._render_chunk)
         self._scroll_speed: Optional[interactions.Speed] = None
+        # Objects keep their map positions; instead of moving all of them when
+        # the background scrolls, we track how far the view has scrolled and
+        # apply that offset when drawing and hit-testing.
+        self._camera_offset: tuple[int, ...] = (0, 0)
+        # Between ticks, the view is drawn part of the way from where it was at
+        # the start of the last tick to where it is now; see interpolate().
+        self._tick_start_offset: tuple[int, ...] = self._camera_offset
+        self._render_offset: tuple[int, ...] = self._camera_offset
+        # Whether the play area needs to be redrawn.
+        self.dirty = True
         self._player_feet_rect = pygame.Rect(
             self.player.RECT.x, self.player.RECT.bottom - _PLAYER_FEET_HEIGHT,
             self.player.RECT.w, _PLAYER_FEET_HEIGHT)
-        pygame.time.set_timer(_TICK, _TICK_INTERVAL_MS)
+        (clock or clocks.RealClock()).set_timer(_TICK, _TICK_INTERVAL_MS)
+
+    def scroll(self, speed, smooth=True):
+        """Scrolls the view.
+
+        Args:
+          speed: How far to scroll.
+          smooth: Whether interpolate() should show the view moving. If not,
+            the view jumps to its new position.
+        """
+        # Like pygame.Rect.move, truncate fractional speeds.
+        offset = tuple(self._camera_offset[i] + int(speed[i]) for i in range(2))
+        if offset != self._camera_offset:
+            self._camera_offset = self._render_offset = offset
+            if not smooth:
+                self._tick_start_offset = offset
+            self.dirty = True
+
+    def interpolate(self, alpha):
+        """Sets how far through the current tick to draw the view.
+
+        Args:
+          alpha: The fraction of the tick interval that has passed since the
+            last tick, from 0 to 1.
+        """
+        offset = tuple(
+            round(self._tick_start_offset[i] + alpha * (
+                self._camera_offset[i] - self._tick_start_offset[i]))
+            for i in range(2))
+        if offset != self._render_offset:
+            self._render_offset = offset
+            self.dirty = True
 
     def _effective_rect(self, rect):
-        return rect.move(
-            tuple(play_map.HOUSE_POS[i] - self.house.RECT.topleft[i]
-                  for i in range(2)))
+        """Converts a rect on the play area surface to map coordinates."""
+        return rect.move(tuple(-offset for offset in self._camera_offset))
 
-    def _square(self, rect):
-        return play_map.pos_to_square(self._effective_rect(rect).midbottom)
+    def _to_screen(self, rect):
+        """Converts a rect in map coordinates to the play area surface."""
+        return rect.move(self._camera_offset)
+
+    def _effective_pos(self, pos):
+        """Converts a position on the play area, as last drawn, to the map."""
+        return tuple(pos[i] - self._render_offset[i] for i in range(2))
 
     @property
     def current_square(self):
-        return self._square(self._player_feet_rect)
+        return play_map.pos_to_square(
+            self._effective_rect(self._player_feet_rect).midbottom)
+
+    def _view_rect(self, offset=None):
+        offset = offset or self._camera_offset
+        return self._surface.get_rect().move(tuple(-o for o in offset))
+
+    def _visible_objects(
+            self, offset=None) -> Iterable[tuple[str, img.RectFactory]]:
+        for name in self._index.collide(self._view_rect(offset)):
+            yield name, self._objects[name]
 
     @property
     def visible_walls(self):
-        items = cast(
-            Iterable[tuple[str, walls.WallBase]], self._objects.items())
-        return {wall for name, wall in items
-                if walls.match(name) and self._visible(wall) and
-                self.current_square in wall.adjacent_squares}
+        """The walls of the current square that are in view."""
+        square = self.current_square
+        if square != self._walls_square:
+            self._walls_square = square
+            self._square_walls = self._walls_by_square.get(square, ())
+        view_rect = self._view_rect()
+        visible = set()
+        for name in self._square_walls:
+            wall = self._objects.get(name)
+            if wall and wall.RECT.colliderect(view_rect):
+                visible.add(wall)
+        return visible
+
+    def _draw_object(self, obj, screen, offset):
+        map_rect, map_screen = obj.RECT, obj._screen
+        obj.RECT, obj._screen = map_rect.move(offset), screen
+        obj.draw()
+        obj.RECT, obj._screen = map_rect, map_screen
+
+    def _render_chunk(self, chunk, rect):
+        offset = (-rect.x, -rect.y)
+        for name in self._index.query(rect):
+            if name in self._STATIC:
+                self._draw_object(self._objects[name], chunk, offset)
 
     def draw(self):
+        offset = self._render_offset
         self._surface.fill(color.BLUE)
-        super().draw()
+        self._static_layer.draw(self._surface, self._view_rect(offset), offset)
+        for name, obj in self._visible_objects(offset):
+            if name not in self._STATIC:
+                self._draw_object(obj, self._surface, offset)
         self.player.draw()
+        self.dirty = False
 
     def _check_player_collision(self) -> Optional[interactions.Collision]:
         # Check if the player's feet would hit anything if he took a step
         # against the background scroll direction.
-
-        def _get_player_path_rect(speed):
-            next_feet_rect = self._player_feet_rect.move(
-                tuple(-s for s in speed))
-            return self._player_feet_rect.union(next_feet_rect)
-
-        player_path_rect = _get_player_path_rect(self._scroll_speed)
+        scroll_speed = self._scroll_speed
+        assert scroll_speed is not None
+        feet_rect = self._effective_rect(self._player_feet_rect)
+        player_path_rect = feet_rect.union(
+            feet_rect.move(tuple(-s for s in scroll_speed)))
         closest_collision: Optional[interactions.Collision] = None
-        for name, obj in self._objects.items():
-            if obj.RECT.colliderect(player_path_rect):
-                # Find the maximum speed at which the player won't collide.
-                speed: Optional[interactions.Speed] = _decelerate(
-                    self._scroll_speed)
-                while speed:
-                    if not obj.RECT.colliderect(_get_player_path_rect(speed)):
-                        break
-                    speed = _decelerate(speed)
-                if closest_collision and closest_collision.closer_than(speed):
-                    continue
-                closest_collision = interactions.collide(name, speed)
+        for name in self._index.collide(player_path_rect):
+            # Find the maximum speed at which the player won't collide.
+            steps = _steps_to_clear(
+                feet_rect, self._objects[name].RECT, scroll_speed)
+            speed: Optional[interactions.Speed] = _decelerate(
+                scroll_speed, max(steps, 1))
+            if closest_collision and closest_collision.closer_than(speed):
+                continue
+            closest_collision = interactions.collide(name, speed)
         return closest_collision
 
     def handle_player_movement(self, event) -> Union[bool, str]:
@@ -118,6 +298,7 @@ class Surface(objects.Surface):
         elif event.type == KEYDOWN and event.key in _PLAYER_MOVES:
             self._scroll_speed = _PLAYER_MOVES[event.key]
         elif event.type == _TICK:
+            self._tick_start_offset = self._camera_offset
             if not self._scroll_speed:
                 # The player has been stopped by an obstacle.
                 return True
@@ -136,35 +317,124 @@ class Surface(objects.Surface):
             speed = self._scroll_speed
             move_result = True
         if speed:
-            for obj in itertools.chain(self._objects.values(),
-                                       self._hidden_objects.values()):
-                obj.move(speed)
+            self.scroll(speed)
         return move_result
 
+    @property
+    def names(self) -> List[str]:
+        """The names of all the objects that can be in the play area."""
+        return [*self.OBJECTS, *self._HIDDEN_OBJECTS]
+
+    @property
+    def state_names(self) -> Tuple[str, ...]:
+        """The names of all the state flags."""
+        return tuple(self._STATE)
+
+    def names_of(self, objs) -> List[str]:
+        """Returns the names of those of the objects in the play area."""
+        names = {id(obj): name for name, obj in self._objects.items()}
+        return [names[id(obj)] for obj in objs if id(obj) in names]
+
+    def objects_named(self, names) -> List[img.RectFactory]:
+        """Returns those of the named objects that are in the play area."""
+        return [self._objects[name] for name in names if name in self._objects]
+
+    def snapshot(self) -> Snapshot:
+        camera_x, camera_y = self._camera_offset
+        return Snapshot((camera_x, camera_y), tuple(self._objects),
+                        tuple(self._hidden_objects), tuple(self._state))
+
+    def restore(self, snapshot: Snapshot):
+        """Restores the play area to a saved state.
+
+        Only the objects whose membership or drawing order differ from the
+        saved state are moved in and out of the spatial index, and only the
+        static layer chunks under them are redrawn.
+        """
+        visible = snapshot.visible
+        in_view = set(visible)
+        hidden = set(snapshot.hidden)
+        # Objects are drawn in the order they were added to the index, so the
+        # objects from the first one out of place onward are re-added in the
+        # saved order.
+        kept = [name for name in self._objects if name in in_view]
+        start = 0
+        while start < len(kept) and kept[start] == visible[start]:
+            start += 1
+        out_of_place = set(kept[start:])
+        taken_out = {}
+        for name in [name for name in self._objects
+                     if name not in in_view or name in out_of_place]:
+            obj = taken_out[name] = self._objects.pop(name)
+            self._index.remove(name)
+            if name in self._STATIC:
+                self._static_layer.invalidate(obj.RECT)
+        for name in visible[start:]:
+            if name in taken_out:
+                obj = taken_out.pop(name)
+            elif name in self._hidden_objects:
+                obj = self._hidden_objects.pop(name)
+            else:
+                obj = self._make_object(name)
+            self._objects[name] = obj
+            self._index.add(name, obj.RECT)
+            if name in self._STATIC and name not in out_of_place:
+                self._static_layer.invalidate(obj.RECT)
+        for name in [name for name in self._hidden_objects
+                     if name not in hidden]:
+            del self._hidden_objects[name]
+        for name in hidden:
+            if name not in self._hidden_objects:
+                self._hidden_objects[name] = taken_out.get(
+                    name) or self._make_object(name)
+        self._state = {name: object() for name in snapshot.state}
+        self._camera_offset = self._tick_start_offset = self._render_offset = (
+            tuple(snapshot.camera_offset))
+        self._scroll_speed = None
+        self.dirty = True
+
+    def _make_object(self, name):
+        if name in self.OBJECTS:
+            return self.OBJECTS[name](self._surface)
+        return self._HIDDEN_OBJECTS[name](self._surface)
+
+    def _get_object(self, name):
+        if name in self._objects:
+            return self._objects[name]
+        return self._hidden_objects[name]
+
     def _player_close_to(self, name):
         rect = self._objects[name].RECT
-        close_enough_squares: interactions.SquaresType = interactions.config(
+        close_enough_squares: interactions.SquaresType = self.config.get(
             name, 'squares')
         if close_enough_squares is interactions.Squares.ALL:
             return True
         if close_enough_squares is interactions.Squares.DEFAULT:
-            close_enough_squares = {self._square(rect)}
+            close_enough_squares = {play_map.pos_to_square(rect.midbottom)}
         if self.current_square not in close_enough_squares:
             return False
-        inflation: tuple[int, int] = interactions.config(name, 'inflation')
-        return rect.inflate(*inflation).colliderect(self.player.RECT)
+        inflation: tuple[int, int] = self.config.get(name, 'inflation')
+        return rect.inflate(*inflation).colliderect(
+            self._effective_rect(self.player.RECT))
 
     def apply_effects(self, effects):
         for effect in effects:
             target = effect.target
+            if isinstance(effect.type, interactions.ObjectEffectType):
+                self.dirty = True
+                if target in self._STATIC:
+                    self._static_layer.invalidate(
+                        self._get_object(target).RECT)
             if effect.type is interactions.ObjectEffectType.REMOVE:
                 del self._objects[target]
+                self._index.remove(target)
             elif effect.type is interactions.ObjectEffectType.ADD:
-                self._objects[target] = self._hidden_objects[target]
-                del self._hidden_objects[target]
+                self._objects[target] = self._hidden_objects.pop(target)
+                self._index.add(target, self._objects[target].RECT)
             elif effect.type is interactions.ObjectEffectType.HIDE:
                 self._hidden_objects[target] = self._objects[target]
                 del self._objects[target]
+                self._index.remove(target)
             else:
                 assert effect.type is interactions.StateEffectType.REMOVE
                 if target in self._state:
@@ -173,8 +443,10 @@ class Surface(objects.Surface):
     def handle_click(self, pos) -> Union[bool, interactions.Item]:
         if not self.collidepoint(pos):
             return False
-        for name, obj in self._objects.items():
-            if obj.collidepoint(pos) and self._player_close_to(name):
+        map_pos = self._effective_pos(pos)
+        for name in self._index.query_point(map_pos):
+            if (self._objects[name].collidepoint(map_pos) and
+                    self._player_close_to(name)):
                 item: Optional[interactions.Item] = interactions.obtain(name)
                 if item:
                     break
@@ -1,35 +1,91 @@
 """Objects in the play area."""
 
 import abc
-import itertools
+import array
+import dataclasses
+import functools
 import math
 import pygame
-from typing import Type
+from typing import AbstractSet, Sequence, Tuple, Type
 
 from common import color
 from common import img
+from . import assets
+from . import map_file
 from . import objects
 from . import play_map
 from . import walls
 
 FRUITS = ('peach', 'apple')
+# The state flags, which all start out set.
+STATE = ('pre_crave',)
 _OPEN_GATE_SIZE = (5, 82)
 
 
 class _MultiRect(pygame.Rect, metaclass=abc.ABCMeta):
 
+    # The (x, y, w, h) of the shape when its layout was computed, and the
+    # (x, y, w, h) of each of its parts relative to the shape's top-left
+    # corner, flattened into one array. Parts are computed where the shape
+    # is, since fractional edges are truncated after the position is added,
+    # and recomputed only once the shape moves or is resized.
+    _cached_layout: Tuple[Tuple[int, int, int, int], array.array]
+
     @abc.abstractmethod
-    def _get_rects(self):
+    def _compute_rects(self):
         pass
 
+    def _layout(self):
+        key = (self.x, self.y, self.w, self.h)
+        cached = self.__dict__.get('_cached_layout')
+        if cached is None or cached[0] != key:
+            layout = array.array('i')
+            for part in self._compute_rects():
+                rect = pygame.Rect(part)
+                rect.normalize()
+                layout.extend(
+                    (rect.x - self.x, rect.y - self.y, rect.w, rect.h))
+            self._cached_layout = cached = (key, layout)
+        return cached[1]
+
+    def _get_rects(self):
+        layout = self._layout()
+        return [pygame.Rect(self.x + layout[i], self.y + layout[i + 1],
+                            layout[i + 2], layout[i + 3])
+                for i in range(0, len(layout), 4)]
+
     def colliderect(self, rect):  # pyrefly: ignore[bad-param-name-override]
         if not super().colliderect(rect):
             return False
-        return any(
-            self_rect.colliderect(rect) for self_rect in self._get_rects())
-
-
-class _CustomShapePngFactory(img.PngFactory):
+        # Compare against each part without allocating a rect for it.
+        left = rect[0] - self.x
+        top = rect[1] - self.y
+        right = left + rect[2]
+        bottom = top + rect[3]
+        layout = self._layout()
+        for i in range(0, len(layout), 4):
+            x = layout[i]
+            y = layout[i + 1]
+            w = layout[i + 2]
+            h = layout[i + 3]
+            if (w and h and x < right and left < x + w and y < bottom and
+                    top < y + h):
+                return True
+        return False
+
+    def _collidepoint_parts(self, pos):
+        px = pos[0] - self.x
+        py = pos[1] - self.y
+        layout = self._layout()
+        for i in range(0, len(layout), 4):
+            x = layout[i]
+            y = layout[i + 1]
+            if x <= px < x + layout[i + 2] and y <= py < y + layout[i + 3]:
+                return True
+        return False
+
+
+class _CustomShapePngFactory(assets.PngFactory):
 
     _ShapeFactory: Type[_MultiRect]
 
@@ -45,7 +101,7 @@ class _HouseRect(_MultiRect):
     _BODY_INDENT = 60
     _BODY_WIDTH = 440
 
-    def _get_rects(self):
+    def _compute_rects(self):
         rects = []
         for width in self._ROOF_WIDTHS:
             y = rects[-1].bottom if rects else self.y
@@ -67,7 +123,7 @@ class House(_CustomShapePngFactory):
 
 class _TreeRect(_MultiRect):
 
-    def _get_rects(self):
+    def _compute_rects(self):
         rect1 = pygame.Rect(self.x, self.y, self.w, 3 * self.h / 5)
         rect2 = pygame.Rect(
             self.x + self.w / 4 - 20, rect1.bottom, self.w / 2, 2 * self.h / 5)
@@ -76,8 +132,7 @@ class _TreeRect(_MultiRect):
     def collidepoint(self, x):
         if not super().collidepoint(x):
             return False
-        return any(
-            self_rect.collidepoint(x) for self_rect in self._get_rects())
+        return self._collidepoint_parts(x)
 
 
 class TreePeach(_CustomShapePngFactory):
@@ -112,17 +167,17 @@ class OpenGateRight(_OpenGateHalf):
         _OPEN_GATE_SIZE)
 
 
-def Tree(square, square_shift):
-    pos = play_map.shifted_square_to_pos(square, square_shift)
+class _Tree(_CustomShapePngFactory):
 
-    class Tree(_CustomShapePngFactory):
+    _ShapeFactory = _TreeRect
 
-        _ShapeFactory = _TreeRect
+    def __init__(self, pos, screen):
+        super().__init__('tree', screen, pos)
 
-        def __init__(self, screen):
-            return super().__init__('tree', screen, pos)
 
-    return Tree
+def Tree(square, square_shift):
+    return functools.partial(
+        _Tree, play_map.shifted_square_to_pos(square, square_shift))
 
 
 class TreeApple(_CustomShapePngFactory):
@@ -137,7 +192,7 @@ class TreeApple(_CustomShapePngFactory):
 
 class _BunnyPrintsRect(_MultiRect):
 
-    def _get_rects(self):
+    def _compute_rects(self):
         return (pygame.Rect(self.left, self.bottom - 50, 40, 50),
                 pygame.Rect(self.left + 20, self.bottom - 115, 50, 50),
                 pygame.Rect(self.left + 70, self.top + 35, 45, 40),
@@ -155,7 +210,7 @@ class BunnyPrints(_CustomShapePngFactory):
 
 class _FishingRodRect(_MultiRect):
 
-    def _get_rects(self):
+    def _compute_rects(self):
         w = self.w * 0.2
         rects = [pygame.Rect(self.right - w, self.top, w, w)]
         for i in range(8):
@@ -168,8 +223,7 @@ class _FishingRodRect(_MultiRect):
     def collidepoint(self, x):
         if not super().collidepoint(x):
             return False
-        return any(
-            self_rect.collidepoint(x) for self_rect in self._get_rects())
+        return self._collidepoint_parts(x)
 
 
 class FishingRod(_CustomShapePngFactory):
@@ -198,7 +252,7 @@ class _LakeRect(_MultiRect):
         (30, 170, None),
     ]
 
-    def _get_rects(self):
+    def _compute_rects(self):
         height_unit = self.h / 20
         rects = []
         for left_indent, width_decrement, height_factor in self._MEASUREMENTS:
@@ -238,7 +292,7 @@ class _HoleRect(_MultiRect):
     def radius(self):
         return self.w // 2
 
-    def _get_rects(self):
+    def _compute_rects(self):
         rects = []
         for width in self._WIDTHS:
             y = self.top if not rects else rects[-1].bottom
@@ -273,7 +327,7 @@ _PUZZLE_SLOT_SHIFT = {'L': 140, 'O': 260, 'V': 460, 'E': 580}
 
 class _PuzzleWallRect(_MultiRect):
 
-    def _get_rects(self):
+    def _compute_rects(self):
         rects = tuple(pygame.Rect(self.x + shift, self.y, 79, 80)
                       for shift in _PUZZLE_SLOT_SHIFT.values())
         rects += (pygame.Rect(self.x, self.y + 37.5, 140, 5),
@@ -331,6 +385,13 @@ class PuzzleSlotE(_PuzzleSlot):
         (2, 4), (_PUZZLE_SLOT_SHIFT['E'], -40)), (79, 80))
 
 
+# The classes that map entries can name.
+_CLASSES = {cls.__name__: cls for cls in (
+    House, TreePeach, OpenGateLeft, OpenGateRight, TreeApple, BunnyPrints,
+    FishingRod, Lake, InvisibleWall, Hole, PuzzleWall, PuzzleDoor,
+    PuzzleSlotL, PuzzleSlotO, PuzzleSlotV, PuzzleSlotE)}
+
+
 def _load(name, pos_info, shift=(0, 0)):
     assert len(pos_info) == 2
     if isinstance(pos_info[0], int):
@@ -339,105 +400,100 @@ def _load(name, pos_info, shift=(0, 0)):
     else:
         square, square_shift = pos_info
         position = play_map.shifted_square_to_pos(square, square_shift)
-    return lambda screen: img.PngFactory(name, screen, position, shift)
-
-
-_SCENERY = {
-    'house': House,
-    'flowers_7': _load('flowers', ((-1, 1), (500, 200))),
-    'tree_3': Tree((1, -1), (350, 25)),
-    'flowers_4': _load('flowers', ((1, 0), (450, 600))),
-    'flowers_5_1': _load('flowers', ((1, 1), (575, 150))),
-    'flowers_5_2': _load('flowers', ((1, 1), (225, 450))),
-    'tree_6': Tree((0, 1), (100, 300)),
-    'tree_11': Tree((1, 2), (0, 200)),
-    'flowers_12': _load('flowers', ((0, 2), (550, 500))),
-    'flowers_19': _load('flowers', ((1, 3), (400, 400))),
-    'tree_13': Tree((3, -1), (250, 300)),
-    'flowers_14_1': _load('flowers', ((3, 0), (150, 375))),
-    'flowers_14_2': _load('flowers', ((3, 0), (700, 500))),
-    'flowers_21': _load('flowers', ((4, 0), (150, 300))),
-    'tree_24': Tree((5, 0), (375, 400)),
-    'flowers_25': _load('flowers', ((5, 1), (400, 525))),
-    'flowers_15': _load('flowers', ((3, 1), (450, 325))),
-    'tree_22': Tree((4, 1), (250, 100)),
-    'tree_17': Tree((3, 3), (300, 225)),
-    'tree_10': Tree((2, 2), (50, 275)),
-    'flowers_18': _load('flowers', ((2, 3), (175, 425))),
-    'flowers_e1': _load('flowers', ((2, 4), (275, 200))),
-    'flowers_e2': _load('flowers', ((2, 4), (400, 200))),
-    'flowers_e3': _load('flowers', ((2, 4), (252, 275))),
-    'flowers_e4': _load('flowers', ((2, 4), (337, 275))),
-    'flowers_e5': _load('flowers', ((2, 4), (422, 275))),
-    'flowers_e6': _load('flowers', ((2, 4), (295, 350))),
-    'flowers_e7': _load('flowers', ((2, 4), (380, 350))),
-    'flowers_e8': _load('flowers', ((2, 4), (337, 425))),
-}
-
-
-_RED_HERRINGS = {
-    'billboard_2': _load('billboard_down', ((0, -1), (200, 400))),
-    'billboard_3': _load('billboard_left', ((1, -1), (50, 400))),
-    'billboard_4': _load('billboard_down', ((1, 0), (300, 50))),
-    'bunny_prints': BunnyPrints,
-    'bunny': _load('bunny', ((5, 0), (200, 125))),
-    'hole': Hole,
-    'billboard_16': _load('billboard_right', ((3, 2), (485, 400)), (0, -0.5)),
-    'billboard_10': _load('billboard_right', ((2, 2), (625, 400)), (0, -0.5)),
-}
-
-
-_GATE = {
-    'key': _load('key', ((-1, 1), (150, 600))),
-    'partial_wall_gateleft': _load(
-        'partial_wall_horizontal', (0, 0), (0, -0.5)),
-    'partial_wall_gateright': _load(
-        'partial_wall_horizontal', (1, 0), (-1, -0.5)),
-    'gate': _load(
-        'gate', ((0, 0), (play_map.SQUARE_LENGTH / 2, 15)), (-0.5, -1)),
-}
-
-
-_ANGRY_CAT = {
-    'eggplant': _load('eggplant', ((1, 1), (300, 200))),
-    'trash_can': _load('trash_can', ((2, 1), (400, 100))),
-    'fishing_rod': FishingRod,
-    'lake': Lake,
-    'partial_wall_catabove': _load('partial_wall_vertical', (2, 1), (-0.5, 0)),
-    'partial_wall_catbelow': _load('partial_wall_vertical', (2, 2), (-0.5, -1)),
-    'angry_cat': _load('angry_cat', ((2, 1), (0, 400)), (-0.75, -0.5)),
-}
-
-
-_INVISIBLE_WALL = {
-    'tree_peach': TreePeach,
-    'tree_apple': TreeApple,
-    'partial_wall_cakeabove': _load('partial_wall_vertical', (3, 1), (-0.5, 0)),
-    'cake': _load('cake', ((3, 1), (50, 400))),
-    'invisible_wall': InvisibleWall,
-}
-
-
-_SHRUBBERY = {
-    'bucket': _load('bucket', ((0, 2), (400, 400))),
-    'matches': _load('matches', ((3, -1), (100, 150))),
-    'doll': _load('doll', ((3, 0), (250, 475))),
-    'shrubbery': _load('shrubbery', ((4, 2), (-5, -50))),
-}
-
-
-_BLOCK_PUZZLE = {
-    'block_V': _load('block_V', ((0, -1), (50, 700))),
-    'block_O': _load('block_O', ((1, 3), (25, 50))),
-    'block_E': _load('block_E', ((5, 1), (625, 150))),
-    'block_L': _load('block_L', ((3, 3), (600, 700))),
-    'puzzle_wall': PuzzleWall,
-    'puzzle_door': PuzzleDoor,
-    'puzzle_slot_L': PuzzleSlotL,
-    'puzzle_slot_O': PuzzleSlotO,
-    'puzzle_slot_V': PuzzleSlotV,
-    'puzzle_slot_E': PuzzleSlotE,
-}
+    return functools.partial(assets.PngFactory, name, position=position,
+                             shift=shift)
+
+
+def _factory(entry, wall_table):
+    if entry.kind is map_file.Kind.WALL:
+        return walls.from_entry(entry, wall_table)
+    elif entry.kind is map_file.Kind.IMAGE:
+        pos_info = entry.square if entry.offset is None else (
+            entry.square, entry.offset)
+        return _load(entry.ref, pos_info, entry.shift)
+    elif entry.kind is map_file.Kind.TREE:
+        return Tree(entry.square, entry.offset or (0, 0))
+    else:
+        assert entry.kind is map_file.Kind.CLASS
+        if entry.ref not in _CLASSES:
+            raise ValueError(f'Unknown class {entry.ref!r} for {entry.name}')
+        return _CLASSES[entry.ref]
+
+
+def _factories(entries, wall_table=None) -> objects.ObjectsType:
+    return {entry.name: _factory(entry, wall_table) for entry in entries}
+
+
+@dataclasses.dataclass
+class Map:
+    visible: objects.ObjectsType
+    hidden: objects.ObjectsType
+    static: AbstractSet[str]
+    end: Tuple[int, int] = play_map.END_SQUARE
+    # The custom interaction config of the map's objects; see
+    # interactions.Config.
+    config: Sequence[map_file.ConfigEntry] = ()
+    state: Tuple[str, ...] = STATE
+
+
+class _WithGridWalls(objects.ObjectsType):
+    """Objects plus the walls of a wall grid, which are made on access."""
+
+    def __init__(self, objs: objects.ObjectsType, grid_walls: walls.GridWalls):
+        self._objs = objs
+        self._grid_walls = grid_walls
+
+    def __getitem__(self, name):
+        if name in self._objs:
+            return self._objs[name]
+        return self._grid_walls[name]
+
+    def __iter__(self):
+        yield from self._grid_walls
+        yield from self._objs
+
+    def __len__(self):
+        return len(self._grid_walls) + len(self._objs)
+
+
+def load(path) -> Map:
+    """Loads the objects in a map file.
+
+    Objects in the "hidden" group start out hidden, and the others visible.
+    Walls on the map's wall grid are visible and static, and are made on
+    access.
+    """
+    map_data = map_file.load(path)
+    wall_table = walls.Table()
+    visible = {}
+    static = set()
+    for group in map_data.group_names:
+        if group == 'hidden':
+            continue
+        factories = _factories(map_data.group(group), wall_table)
+        visible.update(factories)
+        if group in map_data.static:
+            static.update(factories)
+    objs: objects.ObjectsType = visible
+    static_names: AbstractSet[str] = frozenset(static)
+    if map_data.wall_grid:
+        grid_walls = walls.GridWalls(
+            walls.Grid.from_packed(map_data.wall_grid))
+        objs = _WithGridWalls(visible, grid_walls)
+        static_names = _WithGridWalls(
+            {name: visible[name] for name in static}, grid_walls).keys()
+    return Map(objs, _factories(map_data.group('hidden')), static_names,
+               map_data.end or play_map.END_SQUARE, tuple(map_data.config))
+
+
+_MAP = map_file.default()
+_SCENERY = _factories(_MAP.group('scenery'))
+_RED_HERRINGS = _factories(_MAP.group('red_herrings'))
+_GATE = _factories(_MAP.group('gate'))
+_ANGRY_CAT = _factories(_MAP.group('angry_cat'))
+_INVISIBLE_WALL = _factories(_MAP.group('invisible_wall'))
+_SHRUBBERY = _factories(_MAP.group('shrubbery'))
+_BLOCK_PUZZLE = _factories(_MAP.group('block_puzzle'))
 
 
 VISIBLE = {
@@ -452,19 +508,12 @@ VISIBLE = {
 }
 
 
-HIDDEN = {
-    'open_gate_left': OpenGateLeft,
-    'open_gate_right': OpenGateRight,
-    'happy_cat': _load('happy_cat', ((2, 1), (25, 25))),
-    'fire': _load('fire', ((4, 2), (-5, -50))),
-}
+# Objects that never move or change appearance. Removing one from the play
+# area is still allowed.
+STATIC = frozenset({**walls.ALL, **_SCENERY, **_RED_HERRINGS})
 
 
-for block_char, slot_char in itertools.product('LOVE', repeat=2):
-    HIDDEN[f'slotted_block_{block_char}_in_{slot_char}'] = _load(
-        f'slotted_block_{block_char}',
-        ((2, 4), (_PUZZLE_SLOT_SHIFT[slot_char], -40)))
-del block_char, slot_char
+HIDDEN = _factories(_MAP.group('hidden'))
 
-
-STATE = ('pre_crave',)
+# The built-in map.
+DEFAULT = Map(VISIBLE, HIDDEN, STATIC, play_map.END_SQUARE, tuple(_MAP.config))
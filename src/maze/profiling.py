@@ -0,0 +1,132 @@
+"""Per-frame timing of game subsystems."""
+
+import collections
+import contextlib
+import csv
+import functools
+import json
+import math
+import pygame
+import time
+from typing import Callable, Deque, Dict, List, Optional
+
+from common import color
+
+PERCENTILES = (50, 95, 99)
+_WINDOW = 300  # frames
+_FONT_SIZE = 14
+
+
+def percentile(sorted_values, p):
+    """Returns the p-th percentile of a sorted list, by nearest rank."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(p / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+class Profiler:
+    """Collects how long each section of code takes per frame.
+
+    Times are summed over a frame and kept for the last few hundred frames in
+    which the section ran, so percentiles reflect recent behavior.
+    """
+
+    def __init__(self, window=_WINDOW):
+        self._window = window
+        self._frame: Dict[str, float] = collections.defaultdict(float)
+        self._times: Dict[str, Deque[float]] = {}
+        self._counters: Dict[str, Callable[[], Dict[str, int]]] = {}
+        self._font: Optional[pygame.font.Font] = None
+
+    @contextlib.contextmanager
+    def section(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._frame[name] += time.perf_counter() - start
+
+    def wrap(self, name, func: Callable) -> Callable:
+        """Returns a version of func that is timed as the given section."""
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            with self.section(name):
+                return func(*args, **kwargs)
+        return timed
+
+    def instrument(self, obj, method, name=None):
+        """Times an object's method by replacing it with a wrapped version."""
+        setattr(obj, method, self.wrap(name or method, getattr(obj, method)))
+
+    def watch(self, name, counters: Callable[[], Dict[str, int]]):
+        """Reports the counters that a function returns along with the times."""
+        self._counters[name] = counters
+
+    def counters(self) -> Dict[str, int]:
+        return {f'{name}.{key}': value
+                for name, counters in self._counters.items()
+                for key, value in counters().items()}
+
+    def end_frame(self):
+        for name, seconds in self._frame.items():
+            if name not in self._times:
+                self._times[name] = collections.deque(maxlen=self._window)
+            self._times[name].append(seconds * 1000)
+        self._frame.clear()
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Returns the percentiles of each section's time, in milliseconds."""
+        stats = {}
+        for name, times in self._times.items():
+            sorted_times = sorted(times)
+            stats[name] = {f'p{p}': percentile(sorted_times, p)
+                           for p in PERCENTILES}
+            stats[name]['frames'] = len(times)
+        return stats
+
+    def _lines(self) -> List[str]:
+        header = f'{"ms":<22}' + ''.join(f'{"p" + str(p):>7}'
+                                         for p in PERCENTILES)
+        lines = [header]
+        for name, stat in sorted(self.stats().items()):
+            lines.append(f'{name:<22}' + ''.join(
+                f'{stat[f"p{p}"]:>7.2f}' for p in PERCENTILES))
+        for name, value in sorted(self.counters().items()):
+            lines.append(f'{name:<22}{value:>7}')
+        return lines
+
+    def draw(self, screen):
+        """Draws the percentiles in the top-left corner of the screen."""
+        if not self._font:
+            self._font = pygame.font.SysFont('couriernew', _FONT_SIZE)
+        font = self._font
+        for i, line in enumerate(self._lines()):
+            screen.blit(
+                font.render(line, 0, color.BRIGHT_GREEN, color.BLACK),
+                (0, i * _FONT_SIZE))
+
+    def dump(self, path):
+        """Writes the percentiles to a JSON file, or CSV for other suffixes.
+
+        Counters are written under "counters" in JSON, and as a second table
+        after the percentiles in CSV.
+        """
+        stats = self.stats()
+        counters = self.counters()
+        with open(path, 'w', newline='') as f:
+            if path.endswith('.json'):
+                if counters:
+                    stats = {**stats, 'counters': counters}
+                json.dump(stats, f, indent=2, sort_keys=True)
+                return
+            writer = csv.writer(f)
+            writer.writerow(
+                ['section', *(f'p{p}' for p in PERCENTILES), 'frames'])
+            for name, stat in sorted(stats.items()):
+                writer.writerow([name, *(stat[f'p{p}'] for p in PERCENTILES),
+                                 stat['frames']])
+            if counters:
+                writer.writerow([])
+                writer.writerow(['counter', 'value'])
+                writer.writerows(sorted(counters.items()))
@@ -0,0 +1,61 @@
+"""Lookup tables keyed by object name."""
+
+from typing import Any, Dict, Generic, Optional, Tuple, TypeVar
+
+_V = TypeVar('_V')
+# Marks the end of a prefix in a trie node.
+_END = ''
+
+
+class Registry(Generic[_V]):
+    """Maps object names to values, either by exact name or by name prefix.
+
+    An exact name takes precedence over prefixes, and a longer prefix over a
+    shorter one. Prefixes are kept in a trie, so resolving a name takes time
+    proportional to its length rather than to the number of prefixes, and
+    resolved names are memoized so that repeated lookups are single hash
+    lookups.
+    """
+
+    def __init__(self):
+        self._exact: Dict[str, _V] = {}
+        # Each node maps characters to child nodes, and _END to a match.
+        self._trie: Dict[str, Any] = {}
+        self._resolved: Dict[str, Optional[Tuple[str, _V]]] = {}
+
+    def add(self, name, value):
+        self._exact[name] = value
+        self._resolved.clear()
+
+    def add_prefix(self, prefix, value):
+        assert prefix, 'empty prefixes would match everything'
+        node: Dict[str, Any] = self._trie
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node[_END] = (prefix, value)
+        self._resolved.clear()
+
+    def _resolve(self, name) -> Optional[Tuple[str, _V]]:
+        if name in self._exact:
+            return (name, self._exact[name])
+        match = None
+        node = self._trie
+        for char in name:
+            node = node.get(char)
+            if node is None:
+                break
+            match = node.get(_END, match)
+        return match
+
+    def match(self, name) -> Optional[Tuple[str, _V]]:
+        """Returns the matching exact name or prefix and its value, if any."""
+        if name not in self._resolved:
+            self._resolved[name] = self._resolve(name)
+        return self._resolved[name]
+
+    def get(self, name, default=None):
+        match = self.match(name)
+        return default if match is None else match[1]
+
+    def __contains__(self, name):
+        return self.match(name) is not None
@@ -0,0 +1,125 @@
+"""Recording and replaying play sessions.
+
+A session log is a header followed by fixed-size records, one per event that
+the game handled. Movement ticks aren't stored individually: each record holds
+the number of ticks that came before it, and a final record holds the total, so
+a replay can regenerate the ticks in between.
+"""
+
+import dataclasses
+import enum
+import math
+import pygame
+from pygame.locals import *
+import struct
+from typing import BinaryIO, Callable, Iterator, Optional, Tuple
+
+from . import play_area
+
+_MAGIC = b'MAZE'
+_VERSION = 1
+# Magic, version, cheat square (NaN if none).
+_HEADER = struct.Struct('<4sBdd')
+# Tick number, kind, key or mouse button, x, y.
+_RECORD = struct.Struct('<IBIhh')
+
+
+class Kind(enum.IntEnum):
+    KEYDOWN = 0
+    KEYUP = 1
+    CLICK = 2
+    END = 3
+
+
+_KINDS = {KEYDOWN: Kind.KEYDOWN, KEYUP: Kind.KEYUP,
+          MOUSEBUTTONDOWN: Kind.CLICK}
+
+
+@dataclasses.dataclass
+class Record:
+    tick: int
+    kind: Kind
+    code: int = 0
+    pos: Tuple[int, int] = (0, 0)
+
+    def to_event(self) -> pygame.event.Event:
+        if self.kind is Kind.CLICK:
+            return pygame.event.Event(
+                MOUSEBUTTONDOWN, button=self.code, pos=self.pos)
+        event_type = KEYDOWN if self.kind is Kind.KEYDOWN else KEYUP
+        return pygame.event.Event(event_type, key=self.code, mod=0)
+
+
+class Recorder:
+    """Writes the events that a game handles to a session log."""
+
+    def __init__(self, file: BinaryIO, cheat=None):
+        self._file = file
+        self._ticks = 0
+        x, y = cheat or (math.nan, math.nan)
+        file.write(_HEADER.pack(_MAGIC, _VERSION, x, y))
+
+    def record(self, event):
+        if event.type == play_area._TICK:
+            self._ticks += 1
+            return
+        kind = _KINDS.get(event.type)
+        if kind is None:
+            return
+        if kind is Kind.CLICK:
+            record = Record(self._ticks, kind, event.button, event.pos)
+        else:
+            record = Record(self._ticks, kind, event.key)
+        self._write(record)
+
+    def wrap(self, handle: Callable) -> Callable:
+        """Returns an event handler that records the events it consumes."""
+        def recorded_handle(event):
+            consumed = handle(event)
+            if consumed:
+                self.record(event)
+            return consumed
+        return recorded_handle
+
+    def _write(self, record):
+        self._file.write(_RECORD.pack(
+            record.tick, record.kind, record.code, *record.pos))
+
+    def close(self):
+        self._write(Record(self._ticks, Kind.END))
+        self._file.close()
+
+
+def read_header(file: BinaryIO) -> Optional[Tuple[float, float]]:
+    """Reads the header of a session log and returns the cheat square."""
+    magic, version, x, y = _HEADER.unpack(file.read(_HEADER.size))
+    if magic != _MAGIC or version != _VERSION:
+        raise ValueError('Not a session log')
+    return None if math.isnan(x) else (x, y)
+
+
+def read_records(file: BinaryIO) -> Iterator[Record]:
+    """Reads the records of a session log, after the header."""
+    for tick, kind, code, x, y in _RECORD.iter_unpack(file.read()):
+        yield Record(tick, Kind(kind), code, (x, y))
+
+
+def events(records) -> Iterator[pygame.event.Event]:
+    """Converts records back to events, regenerating the ticks in between."""
+    ticks = 0
+    for record in records:
+        while ticks < record.tick:
+            yield pygame.event.Event(play_area._TICK)
+            ticks += 1
+        if record.kind is not Kind.END:
+            yield record.to_event()
+
+
+def replay(game, file: BinaryIO):
+    """Feeds a recorded session to a game as fast as it can handle it.
+
+    The game should have been created with the log's cheat square and with a
+    clock that doesn't fire ticks of its own, like clocks.ManualClock.
+    """
+    for event in events(read_records(file)):
+        game.dispatch(event)
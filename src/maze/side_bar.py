@@ -1,18 +1,36 @@
 """Side bar."""
 
+import collections
 import dataclasses
+import itertools
+import math
 import os
 import pygame
-from typing import Optional, Sequence, Tuple, Union
+from typing import DefaultDict, Dict, List, Optional, Sequence, Tuple, Union
 
 from common import color
-from common import img
 from common import state
+from . import assets
+from . import cache
 from . import interactions
 from . import objects
+from . import walls
 
 _SIDE_BAR_WIDTH = state.RECT.w - state.RECT.h
 _SIDE_CELL_WIDTH = _SIDE_BAR_WIDTH / 3
+# Enough rendered lines for a few screens of narration.
+_RENDERED_LINES = 64
+NUM_ITEM_CELLS = 8
+
+
+@dataclasses.dataclass(frozen=True)
+class MiniMapSnapshot:
+    """The parts of a minimap that change as the game is played."""
+
+    current_square: Tuple[int, int]
+    explored_squares: Tuple[Tuple[int, int], ...]
+    seen_walls: Tuple[walls.Wall, ...]
+    red: bool
 
 
 class MiniMap(objects.Rect):
@@ -24,50 +42,202 @@ class MiniMap(objects.Rect):
     _CENTER_RECT = pygame.Rect(RECT.centerx - _SQUARE_LENGTH / 2,
                                RECT.centery - _SQUARE_LENGTH / 2,
                                _SQUARE_LENGTH, _SQUARE_LENGTH)
+    # How many squares either side of the center of the map are drawn,
+    # including the partly shown ones and the squares whose walls spill into
+    # them.
+    _REACH = math.ceil(RECT.w / 2 / _SQUARE_LENGTH) + 2
+    # The squares across and down a page of the map. The squares in view
+    # always fit within two pages each way.
+    _PAGE = 2 * _REACH + 2
 
     def __init__(self, screen):
         super().__init__(screen)
-        self._current_square = (0, 0)
+        self._current_square: Tuple[int, int] = (0, 0)
         self._explored_squares = {self._current_square}
         self._seen_walls = set()
-        self._current_square_color: tuple[int, int, int] = color.BRIGHT_GREEN
-        self._square_color: tuple[int, int, int] = color.BLUE
-        self._wall_color: tuple[int, int, int] = color.LIGHT_CREAM
+        self._red = False
+        self._current_square_color: tuple[int, int, int]
+        self._square_color: tuple[int, int, int]
+        self._wall_color: tuple[int, int, int]
+        self._set_colors()
+        # Bounding box of the explored squares, for centering the map.
+        self._min_square = list(self._current_square)
+        self._max_square = list(self._current_square)
+        self._walls_by_square: DefaultDict[
+            Tuple[int, int], List[walls.Wall]] = (
+                collections.defaultdict(list))
+        # The explored squares and the seen walls, by the page they are on.
+        self._squares_by_page: DefaultDict[
+            Tuple[int, int], List[Tuple[int, int]]] = (
+                collections.defaultdict(list))
+        self._walls_by_page: DefaultDict[
+            Tuple[int, int], List[walls.Wall]] = (
+                collections.defaultdict(list))
+        self._squares_by_page[self._page(self._current_square)].append(
+            self._current_square)
+        # The explored squares and seen walls of two pages each way around the
+        # center of the map are drawn incrementally onto an off-screen layer,
+        # which is redrawn when the center moves off it. The current square
+        # is drawn on top when the layer is blitted.
+        self._layer_origin: Tuple[int, ...] = (0, 0)
+        # Walls straddle the edges of squares, so leave room for them.
+        self._layer = pygame.Surface(
+            ((2 * self._PAGE + 1) * self._SQUARE_LENGTH,) * 2)
+        self._fit_layer(redraw=True)
+
+    def _page(self, square) -> Tuple[int, int]:
+        return (square[0] // self._PAGE, square[1] // self._PAGE)
+
+    def _layer_rect(self, square):
+        """Returns the rect of a square on the layer."""
+        return pygame.Rect(
+            tuple((square[i] - self._layer_origin[i]) * self._SQUARE_LENGTH +
+                  self._SQUARE_LENGTH // 2 for i in range(2)),
+            (self._SQUARE_LENGTH, self._SQUARE_LENGTH))
+
+    def _draw_square(self, square, square_color):
+        pygame.draw.rect(self._layer, square_color, self._layer_rect(square))
+
+    def _draw_wall(self, wall, surface=None, square_rect=None):
+        if surface is None:
+            surface, square_rect = self._layer, self._layer_rect(wall.SQUARE)
+        start_pos, end_pos = wall.SIDE.endpoints(square_rect)
+        pygame.draw.line(surface, self._wall_color, start_pos, end_pos, 2)
+
+    def _redraw_layer(self):
+        self._layer.fill(self.COLOR)
+        x, y = self._page(self._layer_origin)
+        for page in itertools.product((x, x + 1), (y, y + 1)):
+            for square in self._squares_by_page.get(page, ()):
+                self._draw_square(square, self._square_color)
+        # Also draw the walls of the squares just off the layer, whose lines
+        # can reach onto it.
+        for page in itertools.product(range(x - 1, x + 3), range(y - 1, y + 3)):
+            for wall in self._walls_by_page.get(page, ()):
+                self._draw_wall(wall)
+
+    def _fit_layer(self, redraw=False):
+        center = self._center()
+        origin = tuple(
+            (math.floor(center[i]) - self._REACH) // self._PAGE * self._PAGE
+            for i in range(2))
+        if redraw or origin != self._layer_origin:
+            self._layer_origin = origin
+            self._redraw_layer()
+
+    def _center(self):
+        return tuple((self._max_square[i] + self._min_square[i]) / 2
+                     for i in range(2))
 
     def update(self, square, visible_walls):
+        if square == self._current_square and visible_walls <= self._seen_walls:
+            return
         self._current_square = square
-        self._explored_squares.add(square)
-        self._seen_walls |= visible_walls
+        if square not in self._explored_squares:
+            self._explored_squares.add(square)
+            self._squares_by_page[self._page(square)].append(square)
+            for i in range(2):
+                self._min_square[i] = min(self._min_square[i], square[i])
+                self._max_square[i] = max(self._max_square[i], square[i])
+            self._draw_square(square, self._square_color)
+            # Filling in the square covers up the inner halves of its walls.
+            for wall in self._walls_by_square[square]:
+                self._draw_wall(wall)
+        for wall in visible_walls - self._seen_walls:
+            self._add_wall(wall)
+            self._draw_wall(wall)
+        self._fit_layer()
+        self.dirty = True
+
+    def _add_wall(self, wall):
+        self._seen_walls.add(wall)
+        self._walls_by_page[self._page(wall.SQUARE)].append(wall)
+        # The line's ends can spill into the corners of diagonal squares.
+        for dx, dy in itertools.product((-1, 0, 1), repeat=2):
+            self._walls_by_square[
+                (wall.SQUARE[0] + dx, wall.SQUARE[1] + dy)].append(wall)
+
+    def _set_colors(self):
+        if self._red:
+            self._current_square_color = self._square_color = (
+                self._wall_color) = color.RED
+        else:
+            self._current_square_color = color.BRIGHT_GREEN
+            self._square_color = color.BLUE
+            self._wall_color = color.LIGHT_CREAM
 
     def turn_red(self):
-        self._current_square_color = self._square_color = self._wall_color = (
-            color.RED)
+        self._red = True
+        self._set_colors()
+        self._redraw_layer()
+        self.dirty = True
+
+    def snapshot(self) -> MiniMapSnapshot:
+        return MiniMapSnapshot(
+            self._current_square, tuple(self._explored_squares),
+            tuple(self._seen_walls), self._red)
+
+    def restore(self, snapshot: MiniMapSnapshot):
+        """Restores the map to a saved state.
+
+        The map is only rebuilt and redrawn if the explored squares, seen walls
+        or color differ from the saved ones.
+        """
+        self._current_square = snapshot.current_square
+        explored_squares = set(snapshot.explored_squares)
+        seen_walls = set(snapshot.seen_walls)
+        redraw = False
+        if (explored_squares != self._explored_squares or
+                seen_walls != self._seen_walls):
+            self._explored_squares = explored_squares
+            self._squares_by_page.clear()
+            for square in explored_squares:
+                self._squares_by_page[self._page(square)].append(square)
+            self._seen_walls = set()
+            self._walls_by_square.clear()
+            self._walls_by_page.clear()
+            for wall in seen_walls:
+                self._add_wall(wall)
+            for i in range(2):
+                self._min_square[i] = min(sq[i] for sq in explored_squares)
+                self._max_square[i] = max(sq[i] for sq in explored_squares)
+            redraw = True
+        if snapshot.red != self._red:
+            self._red = snapshot.red
+            self._set_colors()
+            redraw = True
+        self._fit_layer(redraw)
+        self.dirty = True
 
     def draw(self):
+        # Large maps don't fit in the minimap, so keep them from spilling into
+        # the item cells, which aren't necessarily redrawn along with it.
+        self._screen.set_clip(self.RECT)
+        self._draw_map()
+        self._screen.set_clip(None)
+
+    def _draw_map(self):
         super().draw()
-        center = tuple((max(coords) + min(coords)) / 2
-                       for coords in zip(*self._explored_squares))
+        center = self._center()
 
         def get_rect_at(index):
             return self._CENTER_RECT.move(tuple(
                 (index[i] - center[i]) * self._SQUARE_LENGTH for i in range(2)))
 
-        for square in self._explored_squares:
-            if square == self._current_square:
-                square_color = self._current_square_color
-            else:
-                square_color = self._square_color
-            pygame.draw.rect(self._screen, square_color, get_rect_at(square))
-        for wall in self._seen_walls:
-            start_pos, end_pos = wall.SIDE.endpoints(get_rect_at(wall.SQUARE))
-            pygame.draw.line(
-                self._screen, self._wall_color, start_pos, end_pos, 2)
+        layer_pos = get_rect_at(self._layer_origin).move(
+            -self._SQUARE_LENGTH // 2, -self._SQUARE_LENGTH // 2)
+        self._screen.blit(self._layer, layer_pos.topleft)
+        # Highlight the current square, then redraw the walls it covers up.
+        pygame.draw.rect(self._screen, self._current_square_color,
+                         get_rect_at(self._current_square))
+        for wall in self._walls_by_square[self._current_square]:
+            self._draw_wall(wall, self._screen, get_rect_at(wall.SQUARE))
 
 
 @dataclasses.dataclass
 class _Item:
     name: str
-    icon: img.PngFactory
+    icon: assets.PngFactory
 
 
 def _ItemCell(idx):
@@ -93,12 +263,14 @@ def _ItemCell(idx):
             return self._item.name if self._item else None
 
         def set_item(self, name):
-            self._item = _Item(name, img.load(
+            self._item = _Item(name, assets.PngFactory(
                 os.path.join('item', name), self._screen,
                 (self.RECT.centerx, self.RECT.centery), (-0.5, -0.5)))
+            self.dirty = True
 
         def del_item(self):
             self._item = None
+            self.dirty = True
 
         def draw(self):
             super().draw()
@@ -126,49 +298,128 @@ class TextArea(objects.Rect):
     def __init__(self, screen):
         super().__init__(screen)
         self._font = pygame.font.SysFont('couriernew', 20)
+        # The text being shown, and how it is laid out.
+        self.text: Optional[str] = None
         self._text: Sequence[_TextBlock] = []
+        # In a monospace font, text is laid out by adding up glyph advances
+        # instead of measuring ever-longer strings. SysFont falls back to a
+        # proportional font if Courier New is missing, and then lines are
+        # measured whole, since kerning makes them narrower or wider than
+        # their glyphs. Each line is rendered only once.
+        self._glyph_sizes: Dict[str, Tuple[int, int]] = {}
+        narrow, wide = self._font.size('i')[0], self._font.size('W')[0]
+        self._monospace = (narrow == wide and
+                           self._font.size('iW')[0] == narrow + wide)
+        self._rendered: cache.LruCache[Tuple[str, Tuple[int, ...]],
+                                       pygame.Surface] = cache.LruCache(
+                                           _RENDERED_LINES)
+
+    def _glyph_size(self, glyph):
+        if glyph not in self._glyph_sizes:
+            self._glyph_sizes[glyph] = self._font.size(glyph)
+        return self._glyph_sizes[glyph]
+
+    def _width(self, text):
+        if not self._monospace:
+            return self._font.size(text)[0]
+        return sum(self._glyph_size(glyph)[0] for glyph in text)
 
     def show(self, text):
+        self.text = text
         if text is None:
-            self._text = []
+            if self._text:
+                self._text = []
+                self.dirty = True
             return
-        self._text = [_TextBlock((self._LEFT_PAD, self.RECT.y), (0, 0), '')]
-        text = text.split()
-        for word in text:
-            current_block = self._text[-1]
-            if current_block.value:
-                value = current_block.value + ' ' + word
+        self.dirty = True
+        max_width = self.RECT.w - self._LEFT_PAD
+        space_width, line_height = self._glyph_size(' ')
+        lines = [([], 0)]
+        for word in text.split():
+            words, width = lines[-1]
+            word_width = self._width(word)
+            if not words:
+                lines[-1] = ([word], word_width)
+                continue
+            if self._monospace:
+                line_width = width + space_width + word_width
             else:
-                value = word
-            size = self._font.size(value)
-            if size[0] <= self.RECT.w - self._LEFT_PAD:
-                self._text[-1].size = size
-                self._text[-1].value = value
+                line_width = self._width(' '.join((*words, word)))
+            if line_width <= max_width:
+                words.append(word)
+                lines[-1] = (words, line_width)
             else:
-                y = current_block.pos[-1] + current_block.size[-1]
-                self._text.append(_TextBlock(
-                    (self._LEFT_PAD, y), self._font.size(word), word))
+                lines.append(([word], word_width))
+        self._text = [
+            _TextBlock((self._LEFT_PAD, self.RECT.y + i * line_height),
+                       (width, line_height), ' '.join(words))
+            for i, (words, width) in enumerate(lines)]
+
+    def _render(self, value, text_color):
+        key = (value, text_color)
+        rendered = self._rendered.get(key)
+        if rendered is None:
+            rendered = self._font.render(value, 0, text_color)
+            self._rendered[key] = rendered
+        return rendered
 
     def draw(self):
         super().draw()
         if not self._text:
             return
         for block in self._text:
-            self._screen.blit(self._font.render(
-                block.value, 0, color.BRIGHT_GREEN), block.pos)
+            self._screen.blit(
+                self._render(block.value, color.BRIGHT_GREEN), block.pos)
+
+
+@dataclasses.dataclass(frozen=True)
+class Snapshot:
+    """The parts of a side bar that change as the game is played."""
+
+    # The item in each cell, or None for empty cells.
+    items: Tuple[Optional[str], ...]
+    # The text being shown, if any.
+    text: Optional[str]
+    mini_map: MiniMapSnapshot
 
 
 class Surface(objects.Surface):
 
     RECT = pygame.Rect(state.RECT.h, 0, _SIDE_BAR_WIDTH, state.RECT.h)
     OBJECTS = {'mini_map': MiniMap, 'text_area': TextArea,
-               **{f'item_cell{i}': _ItemCell(i) for i in range(8)}}
+               **{f'item_cell{i}': _ItemCell(i)
+                  for i in range(NUM_ITEM_CELLS)}}
 
     @property
     def _item_cells(self):
-        for i in range(8):
+        for i in range(NUM_ITEM_CELLS):
             yield self._objects[f'item_cell{i}']
 
+    @property
+    def items(self) -> List[Optional[str]]:
+        """The item in each cell, or None for empty cells."""
+        return [item_cell.item for item_cell in self._item_cells]
+
+    def set_items(self, items):
+        for item_cell, item in zip(self._item_cells, items):
+            if item == item_cell.item:
+                continue
+            if item:
+                item_cell.set_item(item)
+            else:
+                item_cell.del_item()
+
+    def snapshot(self) -> Snapshot:
+        return Snapshot(tuple(self.items), self.text_area.text,
+                        self.mini_map.snapshot())
+
+    def restore(self, snapshot: Snapshot):
+        """Restores the side bar to a saved state."""
+        self.set_items(snapshot.items)
+        self.text_area.show(snapshot.text)
+        self.mini_map.restore(snapshot.mini_map)
+        self.mark_dirty()
+
     def add_item(self, name):
         for item_cell in self._item_cells:
             if not item_cell.item:
@@ -209,7 +460,7 @@ class Surface(objects.Surface):
         num_free_cells = sum(1 for cell in self._item_cells if not cell.item)
         for effect in item_effects:
             if effect.type is interactions.ItemEffectType.REMOVE:
-                if num_free_cells < 8:
+                if num_free_cells < NUM_ITEM_CELLS:
                     num_free_cells += 1
             else:
                 assert effect.type is interactions.ItemEffectType.ADD
@@ -0,0 +1,75 @@
+"""Headless playthroughs, for regression and load testing.
+
+A simulation drives a state.Game with synthetic events and a manual clock, so
+it runs as fast as the CPU allows and never renders anything:
+
+    sim = simulation.Simulation()
+    sim.press(K_RIGHT)
+    sim.wait(1000)
+    sim.release(K_RIGHT)
+
+Simulations can branch from checkpoints instead of replaying from the start:
+
+    checkpoint = sim.checkpoint()
+    ...
+    simulation.Simulation().restore(checkpoint)
+"""
+
+import os
+import pygame
+from pygame.locals import *
+
+from common import state as common_state
+from . import clocks
+from . import snapshot
+from . import state
+
+
+def headless_screen():
+    """Returns a screen-sized surface without opening a window.
+
+    Images still need a display mode to be loaded, so this uses SDL's dummy
+    video driver unless another one has been configured.
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.display.init()
+    pygame.font.init()
+    return pygame.display.set_mode(common_state.RECT.size)
+
+
+class Simulation:
+    """A game played by feeding it events instead of reading the event queue."""
+
+    def __init__(self, debug=False, cheat=None, screen=None, recorder=None,
+                 game_map=None):
+        self.clock = clocks.ManualClock()
+        self.game = state.Game(screen or headless_screen(), debug, cheat,
+                               clock=self.clock, headless=True,
+                               recorder=recorder, game_map=game_map)
+
+    def dispatch(self, event):
+        return self.game.dispatch(event)
+
+    def checkpoint(self) -> snapshot.Snapshot:
+        return snapshot.capture(self.game)
+
+    def restore(self, checkpoint: snapshot.Snapshot):
+        """Continues from a checkpoint, possibly of another simulation."""
+        snapshot.restore(self.game, checkpoint)
+
+    def wait(self, ms):
+        """Lets time pass, handling the timer events that fire meanwhile."""
+        for event in self.clock.advance(ms):
+            self.dispatch(event)
+
+    def press(self, key):
+        return self.dispatch(pygame.event.Event(KEYDOWN, key=key, mod=0))
+
+    def release(self, key):
+        return self.dispatch(pygame.event.Event(KEYUP, key=key, mod=0))
+
+    def click(self, pos, button=1):
+        if isinstance(pos, pygame.Rect):
+            pos = pos.center
+        return self.dispatch(
+            pygame.event.Event(MOUSEBUTTONDOWN, pos=pos, button=button))
@@ -0,0 +1,197 @@
+"""Saving and restoring the state of a game.
+
+A snapshot holds everything that changes as the maze is played: how far the
+view has scrolled, which objects are visible or hidden, the state flags, the
+inventory, the explored part of the minimap and the text being shown. Objects
+are identified by their position in a fixed list of names (see names()), so
+object membership is stored as bitsets, and items by their position in
+interactions.ITEMS. Objects in the play area are drawn in the order of the
+names, except for the few that were added back out of order, which are listed
+separately so that overlapping objects are restored in the same order.
+
+    saved = snapshot.capture(game).to_bytes()
+    ...
+    snapshot.restore(game, snapshot.Snapshot.from_bytes(saved))
+"""
+
+import array
+import dataclasses
+import struct
+from typing import List, Optional, Sequence, Tuple, cast
+
+from . import interactions
+from . import play_area
+from . import side_bar
+from . import walls
+
+_MAGIC = b'MZSN'
+_VERSION = 2
+# Magic, version, flags, camera offset, current square, number of objects,
+# number of state flags, number of inventory cells, number of explored
+# squares, length of the text, number of objects drawn last.
+_HEADER = struct.Struct('<4sBB4iIBBIHI')
+_RED = 1
+_HAS_TEXT = 2
+# Marks an empty inventory cell.
+_NO_ITEM = 0xFF
+
+
+def _to_bitset(names: Sequence[str], members) -> int:
+    bits = 0
+    for i, name in enumerate(names):
+        if name in members:
+            bits |= 1 << i
+    return bits
+
+
+def _from_bitset(names: Sequence[str], bits) -> List[str]:
+    return [name for i, name in enumerate(names) if bits >> i & 1]
+
+
+def _byte_length(count):
+    return (count + 7) // 8
+
+
+@dataclasses.dataclass(frozen=True)
+class Snapshot:
+    camera_offset: Tuple[int, int]
+    # Bitsets over names(): objects in the play area, hidden objects, and
+    # walls seen on the minimap.
+    visible: int
+    hidden: int
+    seen_walls: int
+    # Indices into names() of the objects in the play area that are drawn
+    # after the others, in drawing order.
+    drawn_last: Tuple[int, ...]
+    # Bitset over the play area's state flags that are still set.
+    state: int
+    # Index into interactions.ITEMS of each inventory cell's item, if any.
+    inventory: Tuple[Optional[int], ...]
+    current_square: Tuple[int, int]
+    explored_squares: Tuple[Tuple[int, int], ...]
+    red: bool
+    text: Optional[str]
+    object_count: int
+    state_count: int
+
+    def to_bytes(self) -> bytes:
+        flags = (_RED if self.red else 0) | (
+            _HAS_TEXT if self.text is not None else 0)
+        text = (self.text or '').encode()
+        object_bytes = _byte_length(self.object_count)
+        squares = array.array('i', [
+            coord for square in self.explored_squares for coord in square])
+        drawn_last = array.array('I', self.drawn_last)
+        return b''.join((
+            _HEADER.pack(
+                _MAGIC, _VERSION, flags, *self.camera_offset,
+                *self.current_square, self.object_count, self.state_count,
+                len(self.inventory), len(self.explored_squares), len(text),
+                len(drawn_last)),
+            self.visible.to_bytes(object_bytes, 'little'),
+            self.hidden.to_bytes(object_bytes, 'little'),
+            self.seen_walls.to_bytes(object_bytes, 'little'),
+            self.state.to_bytes(_byte_length(self.state_count), 'little'),
+            bytes(_NO_ITEM if item is None else item
+                  for item in self.inventory),
+            squares.tobytes(),
+            drawn_last.tobytes(),
+            text))
+
+    @classmethod
+    def from_bytes(cls, data) -> 'Snapshot':
+        (magic, version, flags, camera_x, camera_y, square_x, square_y,
+         object_count, state_count, inventory_count, square_count,
+         text_length, drawn_last_count) = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError('Not a game snapshot')
+        view = memoryview(data)
+        pos = _HEADER.size
+
+        def read(length):
+            nonlocal pos
+            chunk = view[pos:pos + length]
+            pos += length
+            return chunk
+
+        object_bytes = _byte_length(object_count)
+        visible = int.from_bytes(read(object_bytes), 'little')
+        hidden = int.from_bytes(read(object_bytes), 'little')
+        seen_walls = int.from_bytes(read(object_bytes), 'little')
+        state = int.from_bytes(read(_byte_length(state_count)), 'little')
+        inventory = tuple(None if item == _NO_ITEM else item
+                          for item in read(inventory_count))
+        squares = array.array('i')
+        squares.frombytes(read(square_count * 2 * squares.itemsize))
+        drawn_last = array.array('I')
+        drawn_last.frombytes(read(drawn_last_count * drawn_last.itemsize))
+        text = str(read(text_length), 'utf-8') if flags & _HAS_TEXT else None
+        return cls(
+            camera_offset=(camera_x, camera_y), visible=visible, hidden=hidden,
+            seen_walls=seen_walls, drawn_last=tuple(drawn_last), state=state,
+            inventory=inventory,
+            current_square=(square_x, square_y),
+            explored_squares=tuple(zip(squares[::2], squares[1::2])),
+            red=bool(flags & _RED), text=text, object_count=object_count,
+            state_count=state_count)
+
+
+def names(area) -> List[str]:
+    """Returns the names that identify the objects of a play area."""
+    return area.names
+
+
+def _drawn_last(object_names: Sequence[str], visible) -> Tuple[int, ...]:
+    """Returns the objects drawn after the longest run in names() order."""
+    positions = {name: i for i, name in enumerate(object_names)}
+    order = [positions[name] for name in visible]
+    end = 1
+    while end < len(order) and order[end - 1] < order[end]:
+        end += 1
+    return tuple(order[end:])
+
+
+def capture(game) -> Snapshot:
+    area = game._play_area
+    object_names = names(area)
+    saved_area = area.snapshot()
+    saved_bar = game._side_bar.snapshot()
+    mini_map = saved_bar.mini_map
+    return Snapshot(
+        camera_offset=saved_area.camera_offset,
+        visible=_to_bitset(object_names, set(saved_area.visible)),
+        hidden=_to_bitset(object_names, set(saved_area.hidden)),
+        seen_walls=_to_bitset(
+            object_names, set(area.names_of(mini_map.seen_walls))),
+        drawn_last=_drawn_last(object_names, saved_area.visible),
+        state=_to_bitset(area.state_names, set(saved_area.state)),
+        inventory=tuple(None if item is None else interactions.ITEMS.index(item)
+                        for item in saved_bar.items),
+        current_square=mini_map.current_square,
+        explored_squares=mini_map.explored_squares, red=mini_map.red,
+        text=saved_bar.text, object_count=len(object_names),
+        state_count=len(area.state_names))
+
+
+def restore(game, snapshot: Snapshot):
+    area = game._play_area
+    object_names = names(area)
+    if (snapshot.object_count != len(object_names) or
+            snapshot.state_count != len(area.state_names)):
+        raise ValueError('Snapshot is of a different map')
+    drawn_last = sum(1 << i for i in snapshot.drawn_last)
+    area.restore(play_area.Snapshot(
+        snapshot.camera_offset,
+        (*_from_bitset(object_names, snapshot.visible & ~drawn_last),
+         *(object_names[i] for i in snapshot.drawn_last)),
+        tuple(_from_bitset(object_names, snapshot.hidden)),
+        tuple(_from_bitset(area.state_names, snapshot.state))))
+    seen_walls = area.objects_named(
+        _from_bitset(object_names, snapshot.seen_walls))
+    game._side_bar.restore(side_bar.Snapshot(
+        tuple(None if item is None else interactions.ITEMS[item]
+              for item in snapshot.inventory),
+        snapshot.text,
+        side_bar.MiniMapSnapshot(
+            snapshot.current_square, snapshot.explored_squares,
+            tuple(cast(List[walls.Wall], seen_walls)), snapshot.red)))
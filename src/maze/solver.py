@@ -0,0 +1,551 @@
+"""Solving the maze's puzzles.
+
+The solver searches abstract game states instead of simulating play. The
+player is assumed to be able to walk anywhere in a square, and between two
+squares unless walls and other objects block the edge between them, so a
+state only records which objects are visible or hidden, the inventory, the
+state flags and which part of the maze the player is in. A step obtains an
+object, uses an item, or bumps into an object whose collision has an effect.
+A breadth-first search finds the fewest steps that reach play_map.END_SQUARE:
+
+    solution = solver.Puzzle(simulation.headless_screen()).solve()
+    for step in solution.steps:
+        print(step)
+"""
+
+import argparse
+import collections
+import dataclasses
+import enum
+import sys
+from typing import (Dict, FrozenSet, Iterator, List, NamedTuple, Optional,
+                    Sequence, Tuple, cast)
+
+from . import assets
+from . import interactions
+from . import objects
+from . import play_area
+from . import play_map
+from . import play_objects
+from . import side_bar
+from . import simulation
+from . import walls
+
+Square = Tuple[int, int]
+# Objects this close to the edge between two squares count as lying on it.
+_EDGE_MARGIN = 20
+
+
+class Action(enum.Enum):
+    OBTAIN = enum.auto()
+    USE = enum.auto()
+    COLLIDE = enum.auto()
+
+
+@dataclasses.dataclass(frozen=True)
+class Step:
+    action: Action
+    # The object obtained or collided with, or the item used.
+    name: str
+    # Where the player stands when taking the step.
+    square: Square
+    reason: str
+
+    def __str__(self):
+        return (f'{self.action.name.lower()} {self.name} in square '
+                f'{self.square}: {self.reason}')
+
+
+@dataclasses.dataclass
+class Solution:
+    steps: List[Step]
+    # How many states were visited to find the solution.
+    states: int
+
+
+class State(NamedTuple):
+    """An abstract game state."""
+
+    # Bitsets over Puzzle.names.
+    visible: int
+    hidden: int
+    # Bitset over Puzzle.state_names.
+    flags: int
+    # The items in the inventory, sorted.
+    inventory: Tuple[str, ...]
+    # The least square of the part of the maze that the player is in.
+    square: Square
+
+
+@dataclasses.dataclass
+class _Edge:
+    squares: Tuple[Square, Square]
+    # The edge's extent along its length.
+    span: Tuple[int, int]
+    # The narrowest gap the player's feet fit through.
+    min_gap: int
+    # The extent along the edge of each object that lies on it.
+    blockers: Dict[int, List[Tuple[int, int]]]
+    blocker_bits: int
+
+
+def _parts(rect):
+    if isinstance(rect, play_objects._MultiRect):
+        return rect._get_rects()
+    return [rect]
+
+
+def _squares_under(rect) -> Iterator[Square]:
+    left, top = play_map.pos_to_square(rect.topleft)
+    right, bottom = play_map.pos_to_square(
+        (rect.right - 1, rect.bottom - 1))
+    for x in range(left, right + 1):
+        for y in range(top, bottom + 1):
+            yield (x, y)
+
+
+def _has_gap(span, intervals, min_gap):
+    pos, end = span
+    for lo, hi in sorted(intervals):
+        if lo - pos >= min_gap:
+            return True
+        pos = max(pos, hi)
+    return end - pos >= min_gap
+
+
+def _add_items(inventory, items):
+    return tuple(sorted(inventory + tuple(items)))
+
+
+def _remove_items(inventory, items):
+    inventory = list(inventory)
+    for item in items:
+        inventory.remove(item)
+    return tuple(inventory)
+
+
+class Puzzle:
+    """The puzzles of a map, as a graph of abstract game states."""
+
+    def __init__(self, screen,
+                 visible: Optional[objects.ObjectsType] = None,
+                 hidden: Optional[objects.ObjectsType] = None,
+                 state_names: Optional[Sequence[str]] = None,
+                 start: Optional[Square] = None, end: Optional[Square] = None,
+                 config: Optional[interactions.Config] = None):
+        """Initializer.
+
+        Args:
+          screen: A surface for the objects, which are created but not drawn.
+          visible: The objects that start out in the play area. Defaults to
+            the built-in map's.
+          hidden: The objects that start out hidden. Defaults to the built-in
+            map's.
+          state_names: The state flags, which all start out set. Defaults to
+            the built-in map's.
+          start: The square the player starts in. Defaults to (0, 0).
+          end: The square to reach. Defaults to the built-in map's.
+          config: The objects' interaction config. Defaults to the built-in
+            map's.
+        """
+        if visible is None:
+            visible = play_objects.VISIBLE
+        if hidden is None:
+            hidden = play_objects.HIDDEN
+        if state_names is None:
+            state_names = play_objects.STATE
+        if start is None:
+            start = (0, 0)
+        if end is None:
+            end = play_map.END_SQUARE
+        if config is None:
+            config = interactions.Config(play_objects.DEFAULT.config)
+        self.names = [*visible, *hidden]
+        self.state_names = tuple(state_names)
+        self._bits = {name: 1 << i for i, name in enumerate(self.names)}
+        self._flag_bits = {
+            name: 1 << i for i, name in enumerate(self.state_names)}
+        objs = {name: factory(screen)
+                for name, factory in {**visible, **hidden}.items()}
+        rects = {name: obj.RECT for name, obj in objs.items()}
+        # Walls never leave the play area, so the edges they are on are
+        # always closed.
+        wall_objs = [cast(walls.Wall, obj) for name, obj in objs.items()
+                     if name in visible and walls.match(name)]
+        self._walls = walls.Grid.from_walls(
+            (wall.SQUARE, wall.SIDE) for wall in wall_objs)
+        self._start = State(
+            (1 << len(visible)) - 1, (1 << len(self.names)) - (
+                1 << len(visible)), (1 << len(self.state_names)) - 1, (),
+            start)
+        self._end = end
+        self._squares = self._bounds()
+        self._edges = list(self._compute_edges(rects))
+        self._blocker_bits = 0
+        self._edges_by_square: Dict[Square, List[_Edge]] = (
+            collections.defaultdict(list))
+        for edge in self._edges:
+            self._blocker_bits |= edge.blocker_bits
+            for square in edge.squares:
+                self._edges_by_square[square].append(edge)
+        # The squares an object can be interacted with from, or None for all.
+        self._close_squares: Dict[str, Optional[FrozenSet[Square]]] = {}
+        for name, rect in rects.items():
+            squares: interactions.SquaresType = config.get(name, 'squares')
+            if squares is interactions.Squares.ALL:
+                self._close_squares[name] = None
+            elif squares is interactions.Squares.DEFAULT:
+                self._close_squares[name] = frozenset(
+                    {play_map.pos_to_square(rect.midbottom)})
+            else:
+                self._close_squares[name] = frozenset(squares)
+        obtains = {name: item for name in self.names
+                   if (item := interactions.obtain(name)) and (
+                       item.item_effects or item.play_area_effects)}
+        self._collisions = {}
+        for name in self.names:
+            collision = interactions.collide(name, None)
+            if collision.play_area_effects:
+                self._collisions[name] = (
+                    collision, frozenset(_squares_under(rects[name])))
+        self._item_uses = self._find_uses(obtains.values())
+        # Items whose uses only take items away.
+        self._useless_items = frozenset(
+            name for name, uses in self._item_uses.items()
+            if not any(use.play_area_effects or any(
+                effect.type is interactions.ItemEffectType.ADD
+                for effect in use.item_effects) for use in uses))
+        self._activators = frozenset(
+            name for uses in self._item_uses.values() for use in uses
+            for name in use.activator)
+        self._all_obtains = obtains
+        self._obtains = {name: item for name, item in obtains.items()
+                         if not self._pointless(item)}
+        # Objects that give items without changing the play area, like fruit
+        # trees, can be obtained from again whenever the player needs another
+        # item, so there is no point carrying more than one of each.
+        self._renewable = frozenset(
+            name for name, item in self._obtains.items()
+            if not item.play_area_effects)
+        # Maps the blockers that are in the play area to the part of the maze
+        # that each square is in.
+        self._parts: Dict[int, Dict[Square, FrozenSet[Square]]] = {}
+
+    @classmethod
+    def from_map(cls, screen, game_map: play_objects.Map) -> 'Puzzle':
+        """Makes the puzzle of a loaded map, with its rules and end."""
+        return cls(screen, game_map.visible, game_map.hidden, game_map.state,
+                   end=game_map.end,
+                   config=interactions.Config(game_map.config))
+
+    @staticmethod
+    def _find_uses(items) -> Dict[str, Sequence[interactions.Use]]:
+        """Finds the uses of every item that can be obtained."""
+        item_uses: Dict[str, Sequence[interactions.Use]] = {}
+        effects = collections.deque(
+            effect for item in items for effect in item.item_effects)
+        while effects:
+            effect = effects.popleft()
+            if (effect.type is not interactions.ItemEffectType.ADD or
+                    effect.target in item_uses):
+                continue
+            item_uses[effect.target] = interactions.use(effect.target)
+            for use in item_uses[effect.target]:
+                effects.extend(use.item_effects)
+        return item_uses
+
+    def _pointless(self, item):
+        """Whether obtaining something can never help solve the puzzle.
+
+        That is the case when the items obtained are useless, because their
+        uses only take items away, and no object that matters is affected.
+        """
+        if not all(effect.type is interactions.ItemEffectType.ADD and
+                   effect.target in self._useless_items
+                   for effect in item.item_effects):
+            return False
+        return not any(
+            effect.target in self._activators or
+            effect.target in self._collisions
+            or self._bits.get(effect.target, 0) & self._blocker_bits
+            for effect in item.play_area_effects)
+
+    def _bounds(self) -> FrozenSet[Square]:
+        squares = {self._start.square, self._end}
+        if self._walls.width:
+            x, y = self._walls.origin
+            squares.update({(x, y), (x + self._walls.width - 1,
+                                     y + self._walls.height - 1)})
+        xs = [x for x, _ in squares]
+        ys = [y for _, y in squares]
+        return frozenset((x, y) for x in range(min(xs), max(xs) + 1)
+                         for y in range(min(ys), max(ys) + 1))
+
+    def _compute_edges(self, rects) -> Iterator[_Edge]:
+        feet_size = (assets.CACHE.size('player')[0],
+                     play_area._PLAYER_FEET_HEIGHT)
+        length = play_map.SQUARE_LENGTH
+        for square in sorted(self._squares):
+            x, y = play_map.square_to_pos(square)
+            for axis, side, neighbor in (
+                    (1, walls.Side.RIGHT, (square[0] + 1, square[1])),
+                    (0, walls.Side.BOTTOM, (square[0], square[1] + 1))):
+                if (neighbor not in self._squares or
+                        self._walls.has_wall(square, side)):
+                    continue
+                # A strip along the edge. The player crosses it moving along
+                # the other axis, so it must have a gap as wide as his feet.
+                if axis:
+                    strip = (x + length - _EDGE_MARGIN, y, 2 * _EDGE_MARGIN,
+                             length)
+                else:
+                    strip = (x, y + length - _EDGE_MARGIN, length,
+                             2 * _EDGE_MARGIN)
+                span = (strip[axis], strip[axis] + length)
+                blockers: Dict[int, List[Tuple[int, int]]] = {}
+                for name, rect in rects.items():
+                    for part in _parts(rect):
+                        if not part.colliderect(strip):
+                            continue
+                        lo = part.topleft[axis]
+                        hi = lo + part.size[axis]
+                        blockers.setdefault(self._bits[name], []).append(
+                            (max(lo, span[0]), min(hi, span[1])))
+                yield _Edge((square, neighbor), span, feet_size[axis],
+                            blockers, sum(blockers))
+
+    def _edge_open(self, edge, visible):
+        intervals = [interval for bit, bit_intervals in edge.blockers.items()
+                     if visible & bit for interval in bit_intervals]
+        return _has_gap(edge.span, intervals, edge.min_gap)
+
+    def part(self, visible, square) -> FrozenSet[Square]:
+        """Returns the squares the player can walk to from a square.
+
+        Args:
+          visible: A bitset of the objects in the play area.
+          square: Where the player is.
+        """
+        blockers = visible & self._blocker_bits
+        parts = self._parts.setdefault(blockers, {})
+        if square not in parts:
+            reached = {square}
+            queue = collections.deque([square])
+            while queue:
+                current = queue.popleft()
+                for edge in self._edges_by_square[current]:
+                    first, second = edge.squares
+                    neighbor = second if current == first else first
+                    if neighbor not in reached and self._edge_open(
+                            edge, blockers):
+                        reached.add(neighbor)
+                        queue.append(neighbor)
+            part = frozenset(reached)
+            for reached_square in part:
+                parts[reached_square] = part
+        return parts[square]
+
+    def _close_to(self, state, name, part) -> FrozenSet[Square]:
+        """Returns the squares in part of the maze that are close to an object.
+        """
+        if not state.visible & self._bits.get(name, 0):
+            return frozenset()
+        squares = self._close_squares[name]
+        return part if squares is None else part & squares
+
+    def _activated(self, state, activator, part) -> FrozenSet[Square]:
+        """Returns the squares in part of the maze that activate an item."""
+        for name in activator:
+            if not state.flags & self._flag_bits.get(name, 0):
+                part = self._close_to(state, name, part)
+        return part
+
+    def _apply(self, state, effects) -> State:
+        visible, hidden, flags, inventory = (
+            state.visible, state.hidden, state.flags, state.inventory)
+        for effect in effects:
+            if effect.type is interactions.ItemEffectType.REMOVE:
+                inventory = _remove_items(inventory, [effect.target])
+            elif effect.type is interactions.ItemEffectType.ADD:
+                inventory = _add_items(inventory, [effect.target])
+            elif effect.type is interactions.StateEffectType.REMOVE:
+                flags &= ~self._flag_bits.get(effect.target, 0)
+            else:
+                bit = self._bits[effect.target]
+                if effect.type is interactions.ObjectEffectType.REMOVE:
+                    visible &= ~bit
+                elif effect.type is interactions.ObjectEffectType.ADD:
+                    visible |= bit
+                    hidden &= ~bit
+                else:
+                    assert effect.type is interactions.ObjectEffectType.HIDE
+                    visible &= ~bit
+                    hidden |= bit
+        return State(visible, hidden, flags, inventory, state.square)
+
+    def _has_space_for(self, state, item_effects):
+        # Like side_bar.Surface.has_space_for.
+        num_free_cells = side_bar.NUM_ITEM_CELLS - len(state.inventory)
+        for effect in item_effects:
+            if effect.type is interactions.ItemEffectType.REMOVE:
+                if num_free_cells < side_bar.NUM_ITEM_CELLS:
+                    num_free_cells += 1
+            else:
+                if not num_free_cells:
+                    return False
+                num_free_cells -= 1
+        return True
+
+    def _moves(self, state, after, squares) -> Iterator[Tuple[Square, State]]:
+        """Places the player in the squares that a step can be taken from.
+
+        Args:
+          state: The state before the step.
+          after: The state after the step, with the player still where he was.
+          squares: Where the player can take the step.
+
+        Yields:
+          Each square that leads to a different part of the maze, and the
+          state with the player there. The player may be cut off from where
+          he was if the step added blockers.
+        """
+        if after.visible & self._blocker_bits == (
+                state.visible & self._blocker_bits):
+            yield min(squares), after
+            return
+        parts = set()
+        for square in sorted(squares):
+            part = self.part(after.visible, square)
+            if part not in parts:
+                parts.add(part)
+                yield square, after._replace(square=min(part))
+
+    def _successors(self, state, obtains) -> Iterator[Tuple[Step, State]]:
+        part = self.part(state.visible, state.square)
+        for name, item in obtains.items():
+            if not state.visible & self._bits[name]:
+                continue
+            if not self._has_space_for(state, item.item_effects) or (
+                    name in self._renewable and all(
+                        effect.target in state.inventory
+                        for effect in item.item_effects)):
+                continue
+            squares = self._close_to(state, name, part)
+            if not squares:
+                continue
+            after = self._apply(
+                state, (*item.play_area_effects, *item.item_effects))
+            for square, successor in self._moves(state, after, squares):
+                yield Step(Action.OBTAIN, name, square, item.reason), successor
+        for name in sorted(set(state.inventory)):
+            # The first use that the player is close enough to activate is the
+            # one that happens, so where he stands decides the outcome.
+            remaining = part
+            for use in self._item_uses[name]:
+                squares = self._activated(state, use.activator, remaining)
+                if not squares:
+                    continue
+                remaining -= squares
+                after = self._apply(
+                    state, (*use.play_area_effects, *use.item_effects))
+                for square, successor in self._moves(state, after, squares):
+                    yield Step(Action.USE, name, square, use.reason), successor
+        for name, (collision, collision_squares) in self._collisions.items():
+            if not state.visible & self._bits[name]:
+                continue
+            squares = part & collision_squares
+            if not squares:
+                continue
+            after = self._apply(state, collision.play_area_effects)
+            for square, successor in self._moves(state, after, squares):
+                yield (Step(Action.COLLIDE, name, square, collision.reason),
+                       successor)
+
+    def solved(self, state):
+        """Whether the player can walk to the end."""
+        return self._end in self.part(state.visible, state.square)
+
+    def can_reach(self, state, name):
+        """Whether the player can get close enough to interact with an object.
+        """
+        return bool(self._close_to(
+            state, name, self.part(state.visible, state.square)))
+
+    @property
+    def start(self) -> State:
+        return self._start._replace(
+            square=min(self.part(self._start.visible, self._start.square)))
+
+    def solve(self) -> Optional[Solution]:
+        """Finds the shortest solution, or None if the end can't be reached."""
+        start = self.start
+        parents: Dict[State, Optional[Tuple[State, Step]]] = {start: None}
+        queue = collections.deque([start])
+        end = start if self.solved(start) else None
+        while queue and not end:
+            state = queue.popleft()
+            for step, successor in self._successors(state, self._obtains):
+                if successor in parents:
+                    continue
+                parents[successor] = (state, step)
+                if self.solved(successor):
+                    # States are found in order of distance from the start,
+                    # so this is the first one at the shortest distance.
+                    end = successor
+                    break
+                queue.append(successor)
+        if not end:
+            return None
+        steps = []
+        parent = parents[end]
+        while parent:
+            state, step = parent
+            steps.append(step)
+            parent = parents[state]
+        return Solution(steps[::-1], len(parents))
+
+    def explore(self) -> Dict[State, List[Tuple[Step, State]]]:
+        """Finds every state that can be reached from the start.
+
+        Unlike solve(), this includes obtaining useless items, which can still
+        fill up the inventory. The game is over once the end can be reached,
+        so states that reach it are not explored further.
+
+        Returns:
+          The steps that can be taken from each state and where they lead.
+        """
+        graph: Dict[State, List[Tuple[Step, State]]] = {}
+        queue = collections.deque([self.start])
+        while queue:
+            state = queue.popleft()
+            if state in graph:
+                continue
+            if self.solved(state):
+                graph[state] = []
+                continue
+            graph[state] = list(self._successors(state, self._all_obtains))
+            queue.extend(successor for _, successor in graph[state]
+                         if successor not in graph)
+        return graph
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Find the shortest solution to a map.')
+    parser.add_argument('map', nargs='?', help='map file (default: the maze)')
+    args = parser.parse_args()
+    screen = simulation.headless_screen()
+    if args.map:
+        puzzle = Puzzle.from_map(screen, play_objects.load(args.map))
+    else:
+        puzzle = Puzzle(screen)
+    solution = puzzle.solve()
+    if not solution:
+        sys.exit('No solution')
+    for i, step in enumerate(solution.steps, 1):
+        print(f'{i}. {step}')
+    print(f'{len(solution.steps)} steps, {solution.states} states searched')
+
+
+if __name__ == '__main__':
+    main()
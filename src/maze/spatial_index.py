@@ -0,0 +1,312 @@
+"""Spatial indexes for looking up play area objects by position."""
+
+import abc
+import collections
+import itertools
+import pygame
+from typing import (Dict, Iterable, Iterator, List, Optional, Set, Tuple,
+                    Type, cast)
+
+from . import play_map
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:  # numpy is optional; only ArrayIndex needs it.
+    HAS_NUMPY = False
+
+_Cell = Tuple[int, int]
+# ArrayIndex tests every object on each query, and GridIndex only the objects
+# in the squares around it, so ArrayIndex is only faster when the objects are
+# crowded into a few squares. See test_index_frame in tests/benchmarks.py.
+_CROWDED_SQUARE = 1000
+_MAX_CROWDED_SQUARES = 25
+
+
+class Index(abc.ABC):
+    """A collection of named object rects that can be queried by position.
+
+    Query results are returned in the order in which objects were added so
+    that callers see the same ordering as when iterating over the objects
+    directly. Objects that move must be removed and re-added.
+    """
+
+    @abc.abstractmethod
+    def __contains__(self, name):
+        pass
+
+    @abc.abstractmethod
+    def __len__(self):
+        pass
+
+    @abc.abstractmethod
+    def add(self, name, rect):
+        pass
+
+    @abc.abstractmethod
+    def remove(self, name):
+        pass
+
+    @abc.abstractmethod
+    def query(self, rect) -> List[str]:
+        """Returns the objects whose bounding rects overlap the given rect."""
+
+    @abc.abstractmethod
+    def collide(self, rect) -> List[str]:
+        """Returns the objects whose shapes collide with the given rect.
+
+        Unlike query(), this respects custom colliderect implementations.
+        """
+
+    @abc.abstractmethod
+    def query_point(self, pos) -> List[str]:
+        """Returns the objects whose bounding rects contain the given point."""
+
+
+class GridIndex(Index):
+    """A uniform grid that buckets object rects by the cells they overlap.
+
+    Queries only visit the cells around the query, so their cost grows with the
+    local density of objects rather than with the total number of objects.
+    """
+
+    def __init__(self, cell_length=play_map.SQUARE_LENGTH):
+        self._cell_length = cell_length
+        self._cells: Dict[_Cell, Set[str]] = collections.defaultdict(set)
+        self._rects: Dict[str, pygame.Rect] = {}
+        self._order: Dict[str, int] = {}
+        self._counter = itertools.count()
+
+    def __contains__(self, name):
+        return name in self._rects
+
+    def __len__(self):
+        return len(self._rects)
+
+    def _cell(self, pos) -> _Cell:
+        return (int((pos[0] - play_map.START_POS[0]) // self._cell_length),
+                int((pos[1] - play_map.START_POS[1]) // self._cell_length))
+
+    def _cells_for(self, rect) -> Iterator[_Cell]:
+        left, top = self._cell(rect.topleft)
+        right, bottom = self._cell(
+            (max(rect.right - 1, rect.left), max(rect.bottom - 1, rect.top)))
+        for x in range(left, right + 1):
+            for y in range(top, bottom + 1):
+                yield (x, y)
+
+    def add(self, name, rect):
+        if name in self._rects:
+            self.remove(name)
+        self._rects[name] = rect
+        self._order[name] = next(self._counter)
+        for cell in self._cells_for(rect):
+            self._cells[cell].add(name)
+
+    def remove(self, name):
+        rect = self._rects.pop(name)
+        del self._order[name]
+        for cell in self._cells_for(rect):
+            names = self._cells[cell]
+            names.discard(name)
+            if not names:
+                del self._cells[cell]
+
+    def _candidates(self, rect) -> Set[str]:
+        candidates = set()
+        for cell in self._cells_for(rect):
+            candidates.update(self._cells.get(cell, ()))
+        return candidates
+
+    def _ordered(self, names) -> List[str]:
+        return sorted(names, key=self._order.__getitem__)
+
+    def query(self, rect) -> List[str]:
+        return self._ordered(
+            name for name in self._candidates(rect)
+            if pygame.Rect.colliderect(self._rects[name], rect))
+
+    def collide(self, rect) -> List[str]:
+        return self._ordered(
+            name for name in self._candidates(rect)
+            if self._rects[name].colliderect(rect))
+
+    def query_point(self, pos) -> List[str]:
+        return self._ordered(
+            name for name in self._cells.get(self._cell(pos), ())
+            if pygame.Rect.collidepoint(self._rects[name], pos))
+
+
+class _Rows:
+    """A numpy array that grows by doubling as rows are appended."""
+
+    def __init__(self, dtype, width=None):
+        self._data = np.zeros((16,) if width is None else (16, width), dtype)
+        self.count = 0
+
+    @property
+    def array(self):
+        return self._data[:self.count]
+
+    def append(self, rows):
+        end = self.count + len(rows)
+        if end > len(self._data):
+            data = np.zeros((max(2 * len(self._data), end),) +
+                            self._data.shape[1:], self._data.dtype)
+            data[:self.count] = self.array
+            self._data = data
+        self._data[self.count:end] = rows
+        self.count = end
+
+
+class ArrayIndex(Index):
+    """An index that tests every object at once with vectorized comparisons.
+
+    Bounding rects and the parts of composite shapes (anything with a
+    _get_rects() method, like play_objects._MultiRect) are kept in contiguous
+    numpy arrays, one row per rect in the order the objects were added. Other
+    rects with a custom colliderect fall back to calling it directly. Added
+    objects are appended to the arrays in a batch on the next query, and
+    removed ones are only marked dead until most rows are dead. Requires
+    numpy.
+    """
+
+    def __init__(self):
+        if not HAS_NUMPY:
+            raise ImportError('ArrayIndex requires numpy')
+        self._rects: Dict[str, pygame.Rect] = {}
+        self._clear()
+
+    def _clear(self):
+        # The object of each row, or None once it is removed.
+        self._names: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+        # Objects added since the arrays were last updated.
+        self._pending: List[str] = []
+        self._boxes = _Rows('int64', 4)
+        self._live = _Rows('bool')
+        self._has_parts = _Rows('bool')
+        self._parts = _Rows('int64', 4)
+        self._part_owners = _Rows('int64')
+        self._custom: Set[int] = set()
+
+    def __contains__(self, name):
+        return name in self._rects
+
+    def __len__(self):
+        return len(self._rects)
+
+    def add(self, name, rect):
+        # Re-adding moves the object to the end, like a dict.
+        if name in self._rects:
+            self.remove(name)
+        self._rects[name] = rect
+        self._rows[name] = len(self._names)
+        self._names.append(name)
+        self._pending.append(name)
+
+    def remove(self, name):
+        self._update()
+        del self._rects[name]
+        row = self._rows.pop(name)
+        self._names[row] = None
+        self._live.array[row] = False
+        self._custom.discard(row)
+        if len(self._names) > 2 * len(self._rects) + 16:
+            # Most rows are dead, so start over with just the live objects.
+            self._clear()
+            for other in self._rects:
+                self._rows[other] = len(self._names)
+                self._names.append(other)
+            self._pending = list(self._rects)
+
+    @staticmethod
+    def _edges(rects):
+        # Each row is (left, top, right, bottom). Like colliderect, treat rects
+        # with negative sizes as normalized.
+        boxes = np.array([tuple(rect) for rect in rects],
+                         dtype=np.int64).reshape(-1, 4)
+        boxes[:, 2:] += boxes[:, :2]
+        return np.concatenate(
+            (np.minimum(boxes[:, :2], boxes[:, 2:]),
+             np.maximum(boxes[:, :2], boxes[:, 2:])), axis=1)
+
+    def _update(self):
+        if not self._pending:
+            return
+        rects = [self._rects[name] for name in self._pending]
+        parts: List[pygame.Rect] = []
+        owners: List[int] = []
+        has_parts = []
+        for name, rect in zip(self._pending, rects):
+            row = self._rows[name]
+            rect_parts = (rect._get_rects() if hasattr(rect, '_get_rects')
+                          else ())
+            parts.extend(rect_parts)
+            owners.extend([row] * len(rect_parts))
+            has_parts.append(bool(rect_parts))
+            if (not rect_parts and
+                    type(rect).colliderect is not pygame.Rect.colliderect):
+                self._custom.add(row)
+        self._boxes.append(self._edges(rects))
+        self._live.append(np.ones(len(rects), dtype=bool))
+        self._has_parts.append(has_parts)
+        self._parts.append(self._edges(parts))
+        self._part_owners.append(owners)
+        self._pending = []
+
+    def _overlaps(self, boxes, rect):
+        # Matches pygame.Rect.colliderect: empty rects never collide.
+        return ((boxes[:, 0] < rect.right) & (rect.left < boxes[:, 2]) &
+                (boxes[:, 1] < rect.bottom) & (rect.top < boxes[:, 3]) &
+                (boxes[:, 0] < boxes[:, 2]) & (boxes[:, 1] < boxes[:, 3]))
+
+    def _box_mask(self, rect):
+        self._update()
+        rect = pygame.Rect(rect)
+        rect.normalize()
+        if not rect.w or not rect.h:
+            return np.zeros(self._boxes.count, dtype=bool), rect
+        return self._overlaps(self._boxes.array, rect) & self._live.array, rect
+
+    def _select(self, mask) -> List[str]:
+        names = self._names
+        return [cast(str, names[i]) for i in np.flatnonzero(mask)]
+
+    def query(self, rect) -> List[str]:
+        return self._select(self._box_mask(rect)[0])
+
+    def collide(self, rect) -> List[str]:
+        mask, rect = self._box_mask(rect)
+        if not mask.any():
+            return []
+        part_hits = self._part_owners.array[
+            self._overlaps(self._parts.array, rect)]
+        hit_parts = np.zeros(len(mask), dtype=bool)
+        hit_parts[part_hits] = True
+        mask &= ~self._has_parts.array | hit_parts
+        for i in self._custom:
+            if mask[i]:
+                mask[i] = self._rects[cast(str, self._names[i])].colliderect(
+                    rect)
+        return self._select(mask)
+
+    def query_point(self, pos) -> List[str]:
+        self._update()
+        boxes = self._boxes.array
+        x, y = pos
+        return self._select(
+            (boxes[:, 0] <= x) & (x < boxes[:, 2]) &
+            (boxes[:, 1] <= y) & (y < boxes[:, 3]) & self._live.array)
+
+
+def choose(rects: Iterable[pygame.Rect]) -> Type[Index]:
+    """Returns the kind of index that is faster for the given rects."""
+    if not HAS_NUMPY:
+        return GridIndex
+    counts = collections.Counter(
+        play_map.pos_to_square(rect.topleft) for rect in rects)
+    if (len(counts) <= _MAX_CROWDED_SQUARES and
+            sum(counts.values()) >= _CROWDED_SQUARE * len(counts)):
+        return ArrayIndex
+    return GridIndex
@@ -1,5 +1,7 @@
 """Game state."""
 
+import collections
+import contextlib
 import itertools
 import pygame
 from pygame.locals import *
@@ -10,10 +12,14 @@ from common import img
 from common import state as common_state
 from escape import room
 from escape import state as escape_state
+from . import assets
+from . import clocks
 from . import interactions
 from . import play_area
 from . import play_map
 from . import play_objects
+from . import profiling
+from . import replay
 from . import side_bar
 
 
@@ -35,6 +41,14 @@ class ShortEscapeEnding(escape_state.Ending):
         return True
 
 
+DEFAULT_FPS = 60
+# When frames take longer than this, the game slows down instead of running
+# more and more ticks per frame to catch up.
+_MAX_FRAME_MS = 5 * play_area._TICK_INTERVAL_MS
+# How often to refresh the profiling overlay.
+_PROFILE_OVERLAY_FRAMES = 30
+
+
 class Game(common_state.GameState):
 
     _INTRO_TEXT = ("You've escaped the house, but you're lost in a maze. Try "
@@ -45,8 +59,37 @@ class Game(common_state.GameState):
                  "it's a closed heart shape. You've reached the end, Happy "
                  "Valentine's Day!")
 
-    def __init__(self, screen, debug, cheat):
-        self._play_area = play_area.Surface(screen)
+    # The handlers for gameplay events, as opposed to quitting and such.
+    _RECORDED_HANDLERS = ('handle_click', 'handle_debug_location_request',
+                          'handle_player_movement')
+
+    def __init__(self, screen, debug, cheat,
+                 clock: Optional[clocks.Clock] = None, headless=False,
+                 recorder: Optional[replay.Recorder] = None, fps=DEFAULT_FPS,
+                 profiler: Optional[profiling.Profiler] = None,
+                 game_map: Optional[play_objects.Map] = None):
+        """Initializer.
+
+        Args:
+          screen: The surface to draw on.
+          debug: Whether to draw collision rects and allow debug keys.
+          cheat: The square to start in, if not the first one.
+          clock: The source of timer events. Defaults to a clock that run()
+            advances once per frame.
+          headless: Whether to skip rendering. Events must then be fed to
+            dispatch() instead of run(); see simulation.py.
+          recorder: Where to record the gameplay events that are handled.
+          fps: The maximum frame rate in run().
+          profiler: Where to record how long each subsystem takes per frame.
+          game_map: The map to play. Defaults to the built-in one.
+        """
+        self._headless = headless
+        self._clock = clock or clocks.ManualClock()
+        self._fps = fps
+        # Whether run() is drawing once per frame, rather than after each event.
+        self._frame_loop = False
+        self._play_area = play_area.Surface(screen, self._clock, game_map)
+        self._end_square = game_map.end if game_map else play_map.END_SQUARE
         self._side_bar = side_bar.Surface(screen)
         self._side_bar.text_area.show(self._INTRO_TEXT)
         self._debug = debug
@@ -56,11 +99,21 @@ class Game(common_state.GameState):
             self._interact_objects = None
         if cheat:
             x, y = cheat
-            for obj in itertools.chain(
-                    self._play_area._objects.values(),
-                    self._play_area._hidden_objects.values()):
-                obj.move((-x * 800, -y * 800))
+            self._play_area.scroll((-x * 800, -y * 800), smooth=False)
+        self._profiler = profiler
+        if profiler:
+            for method in ('_check_player_collision', 'apply_effects', 'draw'):
+                profiler.instrument(
+                    self._play_area, method, f'play_area.{method}')
+            profiler.instrument(self._side_bar, 'draw_dirty', 'side_bar.draw')
+            profiler.watch('assets', assets.CACHE.stats)
         super().__init__(screen)
+        self._recorder = recorder
+        if recorder:
+            self._event_handlers = [
+                recorder.wrap(handle)
+                if handle.__name__ in self._RECORDED_HANDLERS else handle
+                for handle in self._event_handlers]
 
     def _debug_compute_interact_objects(self):
         interact_objects = set()
@@ -70,9 +123,9 @@ class Game(common_state.GameState):
             if not item:
                 continue
             interact_objects.add(name)
-            effects = list(item.item_effects)
+            effects = collections.deque(item.item_effects)
             while effects:
-                effect = effects.pop(0)
+                effect = effects.popleft()
                 if effect.type is not interactions.ItemEffectType.ADD:
                     continue
                 for use in interactions.use(effect.target):
@@ -84,12 +137,15 @@ class Game(common_state.GameState):
     def _debug_draw(self):
         rects = [(self._play_area._player_feet_rect, color.BRIGHT_GREEN)]
         for name, obj in self._play_area._objects.items():
-            rects.append((obj.RECT, color.BRIGHT_GREEN))
-            if (name not in self._interact_objects or interactions.config(
-                    name, 'squares') is interactions.Squares.ALL):
+            rect = obj.RECT.move(self._play_area._render_offset)
+            rects.append((rect, color.BRIGHT_GREEN))
+            if (name not in self._interact_objects or
+                    self._play_area.config.get(name, 'squares') is
+                    interactions.Squares.ALL):
                 continue
-            inflation: tuple[int, int] = interactions.config(name, 'inflation')
-            rects.append((obj.RECT.inflate(*inflation), color.LIGHT_CREAM))
+            inflation: tuple[int, int] = self._play_area.config.get(
+                name, 'inflation')
+            rects.append((rect.inflate(*inflation), color.LIGHT_CREAM))
         for rect, rect_color in rects:
             if isinstance(rect, play_objects._MultiRect):
                 rects_to_draw = rect._get_rects()
@@ -98,12 +154,79 @@ class Game(common_state.GameState):
             for rect in rects_to_draw:
                 pygame.draw.rect(self._play_area._surface, rect_color, rect, 2)
 
+    def run(self):
+        """Runs the game with a fixed timestep.
+
+        Each frame handles the queued events, advances the clock by how long the
+        frame took, handling the movement ticks that fired, and then draws the
+        play area partway between where it was at the last two ticks. Movement
+        thus happens at the same rate regardless of the frame rate.
+        """
+        frame_clock = pygame.time.Clock()
+        self._frame_loop = True
+        for frame in itertools.count():
+            with self._timed('events'):
+                for event in pygame.event.get():
+                    self.dispatch(event)
+            if not self.active:
+                break
+            elapsed_ms = min(frame_clock.tick(self._fps), _MAX_FRAME_MS)
+            with self._timed('events'):
+                for event in self._clock.advance(elapsed_ms):
+                    self.dispatch(event)
+            self._play_area.interpolate(self._clock.progress(play_area._TICK))
+            if self._profiler and not frame % _PROFILE_OVERLAY_FRAMES:
+                self._play_area.dirty = True
+            self.draw()
+            if self._profiler:
+                self._profiler.end_frame()
+        self._frame_loop = False
+        self.cleanup()
+
+    def cleanup(self):
+        if self._recorder:
+            self._recorder.close()
+
+    def dispatch(self, event):
+        """Handles one event, like run() does for each queued event."""
+        for handle in self._event_handlers:
+            if handle(event):
+                return True
+        return False
+
+    def _timed(self, name):
+        if self._profiler:
+            return self._profiler.section(name)
+        return contextlib.nullcontext()
+
+    def _draw_after_event(self):
+        if not self._frame_loop:
+            self.draw()
+
     def draw(self):
-        self._play_area.draw()
-        self._side_bar.draw()
-        if self._debug:
-            self._debug_draw()
-        pygame.display.update()
+        if self._headless:
+            return
+        # Only redraw and update the parts of the screen that have changed.
+        # The play area changes as a whole whenever it scrolls.
+        rects = []
+        if self._play_area.dirty:
+            self._play_area.draw()
+            if self._debug:
+                self._debug_draw()
+            if self._profiler:
+                self._profiler.draw(self._play_area._surface)
+            rects.append(self._play_area.RECT)
+        rects.extend(self._side_bar.draw_dirty())
+        if rects:
+            with self._timed('display.update'):
+                pygame.display.update(rects)
+
+    def handle_fullscreen(self, event):
+        if common_state.keypressed(event, K_F11):
+            # Switching modes gives us a blank screen to fill in.
+            self._play_area.dirty = True
+            self._side_bar.mark_dirty()
+        return super().handle_fullscreen(event)
 
     def handle_player_movement(self, event):
         move_result: Union[bool, str] = self._play_area.handle_player_movement(
@@ -116,10 +239,10 @@ class Game(common_state.GameState):
             self._side_bar.text_area.show(None)
         self._side_bar.mini_map.update(
             self._play_area.current_square, self._play_area.visible_walls)
-        if self._play_area.current_square == play_map.END_SQUARE:
+        if self._play_area.current_square == self._end_square:
             self._side_bar.mini_map.turn_red()
             self._side_bar.text_area.show(self._END_TEXT)
-        self.draw()
+        self._draw_after_event()
         return True
 
     def _apply_item_effects(self, effects, pos=None):
@@ -160,7 +283,7 @@ class Game(common_state.GameState):
                     self._side_bar.text_area.show(
                         self._USE_FAIL_TEXT.format(
                             click_result.replace('_', ' ')))
-        self.draw()
+        self._draw_after_event()
         return True
 
     def handle_debug_location_request(self, event):
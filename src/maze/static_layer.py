@@ -0,0 +1,78 @@
+"""Pre-rendered layer of play area objects that never change."""
+
+import pygame
+from typing import Callable, Iterator, Tuple
+
+from . import cache
+from . import play_map
+
+_CHUNK_SIZE = (play_map.SQUARE_LENGTH, play_map.SQUARE_LENGTH)
+# Chunks are 32-bit surfaces with per-pixel alpha.
+_CHUNK_BYTES = 4 * play_map.SQUARE_LENGTH ** 2
+_DEFAULT_MAX_BYTES = 64 * 2 ** 20
+
+_Square = Tuple[int, int]
+
+
+def chunk_rect(square) -> pygame.Rect:
+    """Returns the area of the map covered by the chunk for a square."""
+    return pygame.Rect(play_map.square_to_pos(square), _CHUNK_SIZE)
+
+
+def _squares_in(rect) -> Iterator[_Square]:
+    left, top = play_map.pos_to_square(rect.topleft)
+    right, bottom = play_map.pos_to_square(
+        (max(rect.right - 1, rect.left), max(rect.bottom - 1, rect.top)))
+    for x in range(left, right + 1):
+        for y in range(top, bottom + 1):
+            yield (x, y)
+
+
+class StaticLayer:
+    """Static objects composited into one surface per map square.
+
+    Chunks are rendered on demand by a callback that draws the static objects
+    overlapping a chunk's area, and are kept in an LRU cache that is capped by
+    memory use. Since the view is smaller than a square, drawing the layer blits
+    at most four chunks.
+    """
+
+    def __init__(
+            self, render_chunk: Callable[[pygame.Surface, pygame.Rect], None],
+            max_bytes=_DEFAULT_MAX_BYTES):
+        """Initializer.
+
+        Args:
+          render_chunk: Draws the static objects in the given area of the map
+            onto the given surface, whose top-left is the top-left of the area.
+          max_bytes: Roughly how much memory the cached chunks may use.
+        """
+        self._render_chunk = render_chunk
+        self._chunks: cache.LruCache[_Square, pygame.Surface] = cache.LruCache(
+            max(max_bytes // _CHUNK_BYTES, 1))
+
+    def _get_chunk(self, square):
+        chunk = self._chunks.get(square)
+        if chunk is None:
+            chunk = pygame.Surface(_CHUNK_SIZE, pygame.SRCALPHA)
+            self._render_chunk(chunk, chunk_rect(square))
+            self._chunks[square] = chunk
+        return chunk
+
+    def draw(self, screen, view_rect, offset):
+        """Draws the part of the layer in view.
+
+        Args:
+          screen: The surface to draw on.
+          view_rect: The area of the map that the screen shows.
+          offset: How far to shift map positions to get screen positions.
+        """
+        for square in _squares_in(view_rect):
+            pos = play_map.square_to_pos(square)
+            screen.blit(self._get_chunk(square),
+                        tuple(pos[i] + offset[i] for i in range(2)))
+
+    def invalidate(self, rect):
+        """Drops the chunks that overlap an area of the map."""
+        for square in _squares_in(rect):
+            self._chunks.discard(square)
@@ -0,0 +1,179 @@
+"""Checking that maps can be played through.
+
+For each map, validation checks that the end can be reached (see solver.py),
+that the player can reach every object that can be obtained, and that there
+are no soft locks: steps after which the end can no longer be reached, like
+using up an item that is still needed.
+
+Maps are validated in parallel, one per worker process:
+
+    python -m maze.validate [--jobs N] [MAP ...]
+
+Where possible, workers are forked from a server process that has already
+imported the game's modules, so they share its rule tables instead of each
+building their own.
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import dataclasses
+import multiprocessing
+import os
+import sys
+import time
+from typing import Iterator, List, Optional, Sequence
+
+from . import interactions
+from . import map_file
+from . import play_objects
+from . import simulation
+from . import solver
+
+MAPS_DIR = os.path.dirname(map_file.DEFAULT_PATH)
+# Each worker process's screen, for creating the objects of the maps it
+# validates.
+_screen = None
+
+
+@dataclasses.dataclass
+class Report:
+    path: str
+    # The length of the shortest solution, or None if there is none.
+    steps: Optional[int]
+    # How many states the game can get into before the end is reached.
+    states: int
+    # Objects that can be obtained but that the player never gets close to.
+    unreachable: List[str]
+    # Steps that leave the player unable to reach the end.
+    soft_locks: List[str]
+    seconds: float
+
+    @property
+    def ok(self):
+        return (self.steps is not None and not self.unreachable and
+                not self.soft_locks)
+
+    def __str__(self):
+        if self.steps is None:
+            result = 'no solution'
+        else:
+            result = f'solved in {self.steps} steps'
+        lines = [f'{self.path}: {result}, {self.states} states '
+                 f'({self.seconds:.2f}s)']
+        lines.extend(f'  unreachable: {name}' for name in self.unreachable)
+        lines.extend(f'  soft lock: {step}' for step in self.soft_locks)
+        return '\n'.join(lines)
+
+
+def _soft_locks(graph, solved) -> List[solver.Step]:
+    """Finds steps from states that can reach the end to ones that can't.
+
+    Args:
+      graph: The steps that can be taken from each state and where they lead.
+      solved: The states that reach the end.
+    """
+    predecessors = collections.defaultdict(list)
+    for state, steps in graph.items():
+        for _, successor in steps:
+            predecessors[successor].append(state)
+    alive = set(solved)
+    queue = collections.deque(alive)
+    while queue:
+        for predecessor in predecessors[queue.popleft()]:
+            if predecessor not in alive:
+                alive.add(predecessor)
+                queue.append(predecessor)
+    locks = {}
+    for state in alive:
+        for step, successor in graph[state]:
+            if successor not in alive:
+                locks.setdefault(str(step), step)
+    return [locks[key] for key in sorted(locks)]
+
+
+def _init_worker():
+    global _screen
+    _screen = simulation.headless_screen()
+
+
+def validate(path, screen=None) -> Report:
+    """Validates a map file.
+
+    Args:
+      path: The map file.
+      screen: A surface for the map's objects. Defaults to the worker
+        process's screen.
+    """
+    start = time.perf_counter()
+    puzzle = solver.Puzzle.from_map(
+        screen or _screen or simulation.headless_screen(),
+        play_objects.load(path))
+    solution = puzzle.solve()
+    graph = puzzle.explore()
+    targets = {name for name in puzzle.names if interactions.obtain(name)}
+    for state in graph:
+        targets = {name for name in targets
+                   if not puzzle.can_reach(state, name)}
+        if not targets:
+            break
+    solved = {state for state in graph if puzzle.solved(state)}
+    return Report(
+        path, len(solution.steps) if solution else None, len(graph),
+        sorted(targets),
+        [str(step) for step in _soft_locks(graph, solved)],
+        time.perf_counter() - start)
+
+
+def validate_all(paths: Sequence[str], jobs=None) -> Iterator[Report]:
+    """Validates maps in parallel.
+
+    Args:
+      paths: The map files.
+      jobs: How many worker processes to use. Defaults to one per CPU. With
+        one job, maps are validated in this process.
+
+    Yields:
+      A report for each map, in order.
+    """
+    if jobs == 1:
+        _init_worker()
+        yield from map(validate, paths)
+        return
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload([solver.__name__])
+    else:
+        context = None
+    with concurrent.futures.ProcessPoolExecutor(
+            jobs, mp_context=context, initializer=_init_worker) as pool:
+        yield from pool.map(validate, paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Check that maps can be played through.')
+    parser.add_argument(
+        'maps', nargs='*',
+        help='map files (default: the maps that ship with the game)')
+    parser.add_argument('-j', '--jobs', type=int,
+                        help='number of worker processes (default: one per '
+                        'CPU)')
+    args = parser.parse_args()
+    # The JSON maps that ship with the game are the sources of compiled ones.
+    paths = args.maps or [os.path.join(MAPS_DIR, name)
+                          for name in sorted(os.listdir(MAPS_DIR))
+                          if not name.endswith('.json')]
+    start = time.perf_counter()
+    failed = 0
+    for report in validate_all(paths, args.jobs):
+        print(report)
+        failed += not report.ok
+    print(f'{len(paths) - failed}/{len(paths)} maps passed '
+          f'({time.perf_counter() - start:.2f}s)')
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
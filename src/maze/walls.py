@@ -1,16 +1,31 @@
 """Maze walls."""
 
+import abc
+import array
 import enum
-from common import img
+import functools
+import pygame
+from typing import Callable, Iterable, Iterator, Mapping, Optional, Tuple
+
+from . import assets
+from . import map_file
 from . import play_map
 
 
+PREFIX = 'wall_'
+PARTIAL_PREFIX = 'partial_wall_'
+Square = Tuple[int, int]
+# Grid bits for a square's right and bottom walls.
+_RIGHT = 1
+_BOTTOM = 2
+
+
 def match(name):
-    return name.startswith('wall_')
+    return name.startswith(PREFIX)
 
 
 def partial_match(name):
-    return name.startswith('partial_wall_')
+    return name.startswith(PARTIAL_PREFIX)
 
 
 class Side(enum.Enum):
@@ -31,97 +46,356 @@ class Side(enum.Enum):
             return (rect.bottomleft, rect.bottomright)
 
 
-class WallBase(img.PngFactory):
-    SQUARE: tuple[int, int]
-    SIDE: int
+_SPRITE_NAMES = {Side.LEFT: 'wall_vertical', Side.RIGHT: 'wall_vertical',
+                 Side.TOP: 'wall_horizontal', Side.BOTTOM: 'wall_horizontal'}
+# Shift of the sprite by a fraction of its size, so that it is centered on the
+# edge of the square.
+_SPRITE_SHIFTS = {Side.LEFT: (-0.5, 0), Side.RIGHT: (-0.5, 0),
+                  Side.TOP: (0, -0.5), Side.BOTTOM: (0, -0.5)}
+
+
+class _Walls(abc.ABC):
+    """Walls that are looked up by index."""
+
+    @abc.abstractmethod
+    def square(self, index) -> Square:
+        """Returns the square a wall belongs to."""
+
+    @abc.abstractmethod
+    def side(self, index) -> Side:
+        """Returns which side of its square a wall is on."""
+
+    def adjacent_squares(self, index):
+        x, y = self.square(index)
+        side = self.side(index)
+        if side is Side.LEFT:
+            square = (x - 1, y)
+        elif side is Side.RIGHT:
+            square = (x + 1, y)
+        elif side is Side.TOP:
+            square = (x, y - 1)
+        else:
+            assert side is Side.BOTTOM
+            square = (x, y + 1)
+        return {(x, y), square}
+
+    def endpoints(self, index):
+        """Returns the map positions of the ends of a wall."""
+        square_rect = pygame.Rect(
+            play_map.square_to_pos(self.square(index)),
+            (play_map.SQUARE_LENGTH, play_map.SQUARE_LENGTH))
+        return self.side(index).endpoints(square_rect)
+
+
+class Table(_Walls):
+    """Walls, stored as arrays of square coordinates and sides.
+
+    A table takes a few bytes per wall. Play area objects for the walls are
+    created from the table by the factories that add() returns.
+    """
+
+    def __init__(self):
+        self._xs = array.array('i')
+        self._ys = array.array('i')
+        self._sides = array.array('B')
+
+    def __len__(self):
+        return len(self._sides)
+
+    def add(self, square, side) -> Callable[[pygame.Surface], 'Wall']:
+        """Adds a wall and returns a factory for it.
+
+        Args:
+          square: The square the wall belongs to, relative to the starting
+            square.
+          side: Which side of the square the wall is on.
+        """
+        index = len(self)
+        self._xs.append(square[0])
+        self._ys.append(square[1])
+        self._sides.append(side.value)
+        return functools.partial(Wall, self, index)
+
+    def square(self, index) -> Tuple[int, int]:
+        return (self._xs[index], self._ys[index])
+
+    def side(self, index) -> Side:
+        return Side(self._sides[index])
+
+    def grid(self) -> 'Grid':
+        return Grid.from_walls((self.square(index), self.side(index))
+                               for index in range(len(self)))
+
+
+class Grid(_Walls):
+    """Walls, as a bit-packed grid of squares.
+
+    Each square has two bits, for walls on its right and bottom sides; a wall
+    on the left or top of a square is stored as the right or bottom wall of
+    its neighbor. Squares outside the grid have no walls. Whether there is a
+    wall between two squares is a constant-time lookup, and connected
+    components are labeled on first use.
+
+    A wall's index is twice its square's index, plus one for a bottom wall.
+    """
+
+    def __init__(self, origin: Square = (0, 0), size=(0, 0), walled=False):
+        """Initializer.
+
+        Args:
+          origin: The top-left square of the grid.
+          size: The number of squares across and down.
+          walled: Whether every square starts out with right and bottom walls.
+        """
+        self.origin = origin
+        self.width, self.height = size
+        num_squares = self.width * self.height
+        # Four squares per byte.
+        self._walls = bytearray(b'\xff' if walled else b'\0') * (
+            (num_squares + 3) // 4)
+        if walled and num_squares % 4:
+            self._walls[-1] &= (1 << 2 * (num_squares % 4)) - 1
+        # The connected component of each square, or None if not yet labeled.
+        self._labels: Optional[array.array] = None
+
+    @classmethod
+    def from_walls(cls, walls: Iterable[Tuple[Square, Side]]) -> 'Grid':
+        """Makes the smallest grid that has every square next to a wall."""
+        walls = list(walls)
+        if not walls:
+            return cls()
+        squares = []
+        for (x, y), side in walls:
+            squares.append((x, y))
+            if side is Side.LEFT:
+                squares.append((x - 1, y))
+            elif side is Side.RIGHT:
+                squares.append((x + 1, y))
+            elif side is Side.TOP:
+                squares.append((x, y - 1))
+            else:
+                squares.append((x, y + 1))
+        xs = [x for x, _ in squares]
+        ys = [y for _, y in squares]
+        grid = cls((min(xs), min(ys)),
+                   (max(xs) - min(xs) + 1, max(ys) - min(ys) + 1))
+        for square, side in walls:
+            grid.add_wall(square, side)
+        return grid
+
+    @classmethod
+    def from_packed(cls, wall_grid: map_file.WallGrid) -> 'Grid':
+        grid = cls(wall_grid.origin, wall_grid.size)
+        grid._walls[:] = wall_grid.data
+        return grid
+
+    def packed(self) -> map_file.WallGrid:
+        return map_file.WallGrid(self.origin, (self.width, self.height),
+                                 bytes(self._walls))
+
+    def __contains__(self, square):
+        return self._index(square) >= 0
+
+    def __len__(self):
+        """Returns the number of walls."""
+        return int.from_bytes(self._walls, 'little').bit_count()
+
+    def _index(self, square):
+        x = square[0] - self.origin[0]
+        y = square[1] - self.origin[1]
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return y * self.width + x
+        return -1
+
+    def _bits(self, index):
+        return self._walls[index >> 2] >> ((index & 3) << 1) & 3
+
+    def _edge(self, square, side):
+        """Returns the index of the square that stores a wall, and its bit."""
+        x, y = square
+        if side is Side.LEFT:
+            return self._index((x - 1, y)), _RIGHT
+        elif side is Side.RIGHT:
+            return self._index(square), _RIGHT
+        elif side is Side.TOP:
+            return self._index((x, y - 1)), _BOTTOM
+        else:
+            assert side is Side.BOTTOM
+            return self._index(square), _BOTTOM
+
+    def square(self, index) -> Square:
+        index >>= 1
+        return (self.origin[0] + index % self.width,
+                self.origin[1] + index // self.width)
+
+    def side(self, index) -> Side:
+        return Side.BOTTOM if index & 1 else Side.RIGHT
+
+    def wall_index(self, square, side: Side) -> int:
+        """Returns the index of a wall, or -1 if it isn't in the grid."""
+        index, bit = self._edge(square, side)
+        if index < 0 or not self._bits(index) & bit:
+            return -1
+        return 2 * index + (bit == _BOTTOM)
+
+    def has_wall(self, square, side: Side) -> bool:
+        """Whether a side of a square is walled."""
+        index, bit = self._edge(square, side)
+        return index >= 0 and bool(self._bits(index) & bit)
+
+    def add_wall(self, square, side: Side):
+        """Walls a side of a square, which must be in or next to the grid."""
+        index, bit = self._edge(square, side)
+        if index < 0:
+            raise ValueError(f'{side.name.lower()} wall of square {square} is '
+                             'outside the grid')
+        self._walls[index >> 2] |= bit << ((index & 3) << 1)
+        self._labels = None
+
+    def remove_wall(self, square, side: Side):
+        """Knocks down the wall on a side of a square, if there is one."""
+        index, bit = self._edge(square, side)
+        if index >= 0:
+            self._walls[index >> 2] &= ~(bit << ((index & 3) << 1))
+            self._labels = None
+
+    def walls(self) -> Iterator[Tuple[Square, Side]]:
+        """Yields each wall, as a square and its right or bottom side."""
+        width = self.width
+        ox, oy = self.origin
+        for index in range(width * self.height):
+            bits = self._bits(index)
+            if bits & _RIGHT:
+                yield (ox + index % width, oy + index // width), Side.RIGHT
+            if bits & _BOTTOM:
+                yield (ox + index % width, oy + index // width), Side.BOTTOM
+
+    def passable(self, square, other) -> bool:
+        """Whether two squares are next to each other with no wall between."""
+        dx = other[0] - square[0]
+        dy = other[1] - square[1]
+        if abs(dx) + abs(dy) != 1:
+            return False
+        if dx:
+            side = Side.RIGHT if dx > 0 else Side.LEFT
+        else:
+            side = Side.BOTTOM if dy > 0 else Side.TOP
+        return not self.has_wall(square, side)
+
+    def neighbors(self, square) -> Iterator[Square]:
+        """Yields the squares in the grid that a square opens onto."""
+        x, y = square
+        for neighbor in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+            if neighbor in self and self.passable(square, neighbor):
+                yield neighbor
+
+    def _label(self) -> array.array:
+        width = self.width
+        num_squares = width * self.height
+        bits = self._bits
+        labels = array.array('i', [-1]) * num_squares
+        label = 0
+        for start in range(num_squares):
+            if labels[start] >= 0:
+                continue
+            labels[start] = label
+            stack = [start]
+            while stack:
+                index = stack.pop()
+                x = index % width
+                for neighbor, is_open in (
+                        (index + 1, x + 1 < width and not bits(index) & _RIGHT),
+                        (index - 1, x and not bits(index - 1) & _RIGHT),
+                        (index + width, index + width < num_squares and
+                         not bits(index) & _BOTTOM),
+                        (index - width, index >= width and
+                         not bits(index - width) & _BOTTOM)):
+                    if is_open and labels[neighbor] < 0:
+                        labels[neighbor] = label
+                        stack.append(neighbor)
+            label += 1
+        return labels
+
+    def connected(self, square, other) -> bool:
+        """Whether two squares in the grid can be walked between within it."""
+        first = self._index(square)
+        second = self._index(other)
+        if first < 0 or second < 0:
+            return False
+        if self._labels is None:
+            self._labels = self._label()
+        return self._labels[first] == self._labels[second]
+
+
+class Wall(assets.PngFactory):
+    """A wall in the play area.
+
+    All walls on the same axis share one image.
+    """
+
+    def __init__(self, table: _Walls, index, screen):
+        side = table.side(index)
+        start, _ = table.endpoints(index)
+        super().__init__(_SPRITE_NAMES[side], screen, start,
+                         _SPRITE_SHIFTS[side])
+        self._table = table
+        self._index = index
+
+    @property
+    def SQUARE(self):
+        return self._table.square(self._index)
+
+    @property
+    def SIDE(self):
+        return self._table.side(self._index)
 
     @property
     def adjacent_squares(self):
-        if self.SIDE is Side.LEFT:
-            square = (self.SQUARE[0] - 1, self.SQUARE[1])
-        elif self.SIDE is Side.RIGHT:
-            square = (self.SQUARE[0] + 1, self.SQUARE[1])
-        elif self.SIDE is Side.TOP:
-            square = (self.SQUARE[0], self.SQUARE[1] - 1)
-        else:
-            assert self.SIDE is Side.BOTTOM
-            square = (self.SQUARE[0], self.SQUARE[1] + 1)
-        return {self.SQUARE, square}
+        return self._table.adjacent_squares(self._index)
 
 
-def _Wall(coord_x, coord_y, side):
-    """Returns a wall.
+class GridWalls(Mapping[str, Callable[[pygame.Surface], Wall]]):
+    """Factories for the walls of a grid, by name, made on access.
 
-    Args:
-      coord_x: Horizontal distance from starting square in number of squares.
-      coord_y: Vertical distance from starting square in number of squares.
-      side: Which side of the square the wall is on.
+    Walls are named by map_file.wall_name(), after their square and its right
+    or bottom side.
     """
-    wall_x, wall_y = play_map.square_to_pos((coord_x, coord_y))
-    if side is Side.RIGHT:
-        wall_x += play_map.SQUARE_LENGTH
-    elif side is Side.BOTTOM:
-        wall_y += play_map.SQUARE_LENGTH
-    else:
-        assert side in (Side.LEFT, Side.TOP)
-    if side in (Side.LEFT, Side.RIGHT):
-        img_name = 'wall_vertical'
-        shift = (-0.5, 0)
-    else:
-        assert side in (Side.TOP, Side.BOTTOM)
-        img_name = 'wall_horizontal'
-        shift = (0, -0.5)
-
-    class Wall(WallBase):
-
-        SQUARE = (coord_x, coord_y)
-        SIDE = side
-
-        def __init__(self, screen):
-            super().__init__(img_name, screen, (wall_x, wall_y), shift)
-
-    return Wall
-
-
-ALL = {
-    'wall_sright': _Wall(0, 0, Side.RIGHT),
-    'wall_sbottom': _Wall(0, 0, Side.BOTTOM),
-    'wall_1left': _Wall(-1, 0, Side.LEFT),
-    'wall_1top': _Wall(-1, 0, Side.TOP),
-    'wall_2left': _Wall(0, -1, Side.LEFT),
-    'wall_2top': _Wall(0, -1, Side.TOP),
-    'wall_3top': _Wall(1, -1, Side.TOP),
-    'wall_3right': _Wall(1, -1, Side.RIGHT),
-    'wall_6left': _Wall(0, 1, Side.LEFT),
-    'wall_7bottom': _Wall(-1, 1, Side.BOTTOM),
-    'wall_7left': _Wall(-1, 1, Side.LEFT),
-    'wall_8top': _Wall(2, 0, Side.TOP),
-    'wall_8bottom': _Wall(2, 0, Side.BOTTOM),
-    'wall_9bottom': _Wall(2, 1, Side.BOTTOM),
-    'wall_10left': _Wall(2, 2, Side.LEFT),
-    'wall_12bottom': _Wall(0, 2, Side.BOTTOM),
-    'wall_12left': _Wall(0, 2, Side.LEFT),
-    'wall_13left': _Wall(3, -1, Side.LEFT),
-    'wall_13top': _Wall(3, -1, Side.TOP),
-    'wall_14bottom': _Wall(3, 0, Side.BOTTOM),
-    'wall_15bottom': _Wall(3, 1, Side.BOTTOM),
-    'wall_17right': _Wall(3, 3, Side.RIGHT),
-    'wall_17bottom': _Wall(3, 3, Side.BOTTOM),
-    'wall_17left': _Wall(3, 3, Side.LEFT),
-    'wall_18left': _Wall(2, 3, Side.LEFT),
-    'wall_19bottom': _Wall(1, 3, Side.BOTTOM),
-    'wall_19left': _Wall(1, 3, Side.LEFT),
-    'wall_20top': _Wall(4, -1, Side.TOP),
-    'wall_20right': _Wall(4, -1, Side.RIGHT),
-    'wall_21bottom': _Wall(4, 0, Side.BOTTOM),
-    'wall_22right': _Wall(4, 1, Side.RIGHT),
-    'wall_23right': _Wall(4, 2, Side.RIGHT),
-    'wall_23bottom': _Wall(4, 2, Side.BOTTOM),
-    'wall_24top': _Wall(5, 0, Side.TOP),
-    'wall_24right': _Wall(5, 0, Side.RIGHT),
-    'wall_25right': _Wall(5, 1, Side.RIGHT),
-    'wall_25bottom': _Wall(5, 1, Side.BOTTOM),
-    'wall_eright': _Wall(2, 4, Side.RIGHT),
-    'wall_ebottom': _Wall(2, 4, Side.BOTTOM),
-    'wall_eleft': _Wall(2, 4, Side.LEFT),
-}
+
+    def __init__(self, grid: Grid):
+        self._grid = grid
+
+    def _name(self, square, side):
+        return map_file.wall_name(square, side.name.lower())
+
+    def __getitem__(self, name):
+        index = -1
+        if match(name):
+            try:
+                x, y, side = name[len(PREFIX):].split('_')
+                index = self._grid.wall_index((int(x), int(y)),
+                                              Side[side.upper()])
+            except (KeyError, ValueError):
+                pass
+        # A left or top wall is only named after the square on its other side.
+        if index < 0 or name != self._name(self._grid.square(index),
+                                           self._grid.side(index)):
+            raise KeyError(name)
+        return functools.partial(Wall, self._grid, index)
+
+    def __iter__(self):
+        for square, side in self._grid.walls():
+            yield self._name(square, side)
+
+    def __len__(self):
+        return len(self._grid)
+
+
+def from_entry(entry, table=None):
+    """Adds the wall for a map_file.Entry to a table, by default TABLE."""
+    table = TABLE if table is None else table
+    return table.add(entry.square, Side[entry.side.upper()])
+
+
+TABLE = Table()
+ALL = {entry.name: from_entry(entry)
+       for entry in map_file.default().group('walls')}
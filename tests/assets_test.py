@@ -0,0 +1,69 @@
+"""Tests for maze.assets."""
+
+import pygame
+import unittest
+
+from common import test_utils
+from maze import assets
+
+
+class CacheTest(test_utils.ImgTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cache = assets.Cache()
+
+    def test_size(self):
+        self.assertEqual(self.cache.size('player'),
+                         self.cache.get('player').get_size())
+
+    def test_size_does_not_load(self):
+        self.cache.size('player')
+        self.assertEqual(self.cache.loads, 0)
+
+    def test_get_shared(self):
+        self.assertIs(self.cache.get('player'), self.cache.get('player'))
+        self.assertEqual(self.cache.loads, 1)
+
+    def test_stats(self):
+        self.assertEqual(self.cache.stats(),
+                         {'images': 0, 'loads': 0, 'bytes': 0})
+        image = self.cache.get('player')
+        stats = self.cache.stats()
+        self.assertEqual(stats['images'], 1)
+        self.assertEqual(stats['bytes'],
+                         image.get_pitch() * image.get_height())
+
+    def test_clear(self):
+        self.cache.get('player')
+        self.cache.clear()
+        self.assertEqual(self.cache.stats(),
+                         {'images': 0, 'loads': 0, 'bytes': 0})
+
+
+class PngFactoryTest(test_utils.ImgTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Images cached by other tests were loaded with a different mock.
+        assets.CACHE.clear()
+
+    def test_rect(self):
+        factory = assets.PngFactory('player', self.screen, (100, 50), (-0.5, 0))
+        w, h = assets.CACHE.size('player')
+        self.assertEqual(factory.RECT, pygame.Rect(100 - w / 2, 50, w, h))
+
+    def test_draw(self):
+        factory = assets.PngFactory('player', self.screen)
+        factory.draw()
+        self.screen.blit.assert_called_once_with(
+            assets.CACHE.get('player'), (0, 0))
+
+    def test_share_image(self):
+        factory1 = assets.PngFactory('player', self.screen)
+        factory2 = assets.PngFactory('player', self.screen, (10, 10))
+        self.assertIs(factory1._img, factory2._img)
+
+
+if __name__ == '__main__':
+    unittest.main()
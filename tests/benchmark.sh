@@ -0,0 +1,7 @@
+# Run from the directory above tests. Each run is saved under .benchmarks/ and
+# compared against the previous one; runs fail if a benchmark's median time
+# regresses by more than 20%. To compare against a specific commit's run
+# instead, pass e.g. --benchmark-compare=0001.
+pip install '.[dev]'
+pytest tests/benchmarks.py --benchmark-autosave --benchmark-compare \
+  --benchmark-compare-fail=median:20% "$@"
@@ -0,0 +1,219 @@
+"""Benchmarks, run with pytest-benchmark.
+
+These aren't collected with the unit tests. See benchmark.sh for how to save
+baselines and compare against them.
+"""
+
+import pygame
+from pygame.locals import *
+import pytest
+import random
+
+from common import color
+from maze import interactions
+from maze import objects
+from maze import play_area
+from maze import play_map
+from maze import play_objects
+from maze import side_bar
+from maze import simulation
+from maze import spatial_index
+from maze import state
+from maze import walls
+
+_OBJECT_COUNTS = (100, 1000, 10000)
+# Objects per map square: spread out like the real maze, or crowded.
+_DENSITIES = (10, 1000)
+_INDEXES = (spatial_index.GridIndex, spatial_index.ArrayIndex)
+_FLOWER_SIZE = 30
+# The most a snapshot restore of the built-in map may take, in seconds.
+_RESTORE_BUDGET = 0.001
+
+
+def synthetic_objects(object_count, seed=0,
+                      density=10) -> objects.ObjectsType:
+    """Returns a large map of random walls and flowers.
+
+    The map is a square grid of map squares with about `density` flowers per
+    square. Each square gets a right and a bottom wall with probability 1/2,
+    like the real maze.
+    """
+    rng = random.Random(seed)
+    side = max(int((object_count / density) ** 0.5), 1)
+    wall_table = walls.Table()
+    objs = {}
+    for x in range(side):
+        for y in range(side):
+            for wall_side in (walls.Side.RIGHT, walls.Side.BOTTOM):
+                if rng.random() < 0.5:
+                    objs[f'wall_{x}_{y}_{wall_side.name.lower()}'] = (
+                        wall_table.add((x, y), wall_side))
+    while len(objs) < object_count:
+        square = (rng.randrange(side), rng.randrange(side))
+        pos = play_map.shifted_square_to_pos(square, (
+            rng.randrange(play_map.SQUARE_LENGTH - _FLOWER_SIZE),
+            rng.randrange(play_map.SQUARE_LENGTH - _FLOWER_SIZE)))
+
+        class Flower(objects.Rect):
+            RECT = pygame.Rect(pos, (_FLOWER_SIZE, _FLOWER_SIZE))
+            COLOR = color.BRIGHT_GREEN
+
+        objs[f'flowers_{len(objs)}'] = Flower
+    return objs
+
+
+def synthetic_surface(object_count, seed=0, density=10, index=None):
+    """Returns a play area class for a synthetic map."""
+    objs = synthetic_objects(object_count, seed, density)
+    return type('SyntheticSurface', (play_area.Surface,), {
+        'OBJECTS': objs, '_HIDDEN_OBJECTS': {},
+        '_STATIC': frozenset(objs), '_INDEX': index})
+
+
+@pytest.fixture(scope='module')
+def screen():
+    return simulation.headless_screen()
+
+
+def _moving_play_area(screen, object_count, density=10, index=None):
+    surface = synthetic_surface(object_count, density=density,
+                                index=index)(screen)
+    # Walk diagonally into the middle of the map.
+    surface.scroll((-1000, -1000))
+    surface._scroll_speed = (-40, -40)
+    return surface
+
+
+@pytest.mark.parametrize('object_count', _OBJECT_COUNTS)
+def test_check_player_collision(benchmark, screen, object_count):
+    surface = _moving_play_area(screen, object_count)
+    benchmark(surface._check_player_collision)
+
+
+@pytest.mark.parametrize('index', _INDEXES, ids=lambda index: index.__name__)
+@pytest.mark.parametrize('density', _DENSITIES)
+@pytest.mark.parametrize('object_count', _OBJECT_COUNTS)
+def test_index_frame(benchmark, screen, object_count, density, index):
+    # The index queries of a frame: the player's path and the view.
+    surface = _moving_play_area(screen, object_count, density, index)
+    view_rect = surface._view_rect()
+
+    def frame():
+        surface._check_player_collision()
+        surface._index.collide(view_rect)
+
+    benchmark(frame)
+
+
+@pytest.mark.parametrize('index', _INDEXES, ids=lambda index: index.__name__)
+@pytest.mark.parametrize('object_count', _OBJECT_COUNTS)
+def test_index_reveal(benchmark, screen, object_count, index):
+    # Objects are added and removed as they are revealed and picked up.
+    surface = _moving_play_area(screen, object_count, index=index)
+    name = next(iter(surface._objects))
+    rect = surface._objects[name].RECT
+
+    def reveal():
+        surface._index.remove(name)
+        surface._index.add(name, rect)
+        surface._check_player_collision()
+
+    benchmark(reveal)
+
+
+@pytest.mark.parametrize('object_count', _OBJECT_COUNTS)
+def test_walk(benchmark, screen, object_count):
+    surface_cls = synthetic_surface(object_count)
+    rng = random.Random(0)
+    keys = [rng.choice((K_LEFT, K_RIGHT, K_UP, K_DOWN)) for _ in range(50)]
+    tick = pygame.event.Event(play_area._TICK)
+
+    def walk(surface):
+        for key in keys:
+            surface.handle_player_movement(
+                pygame.event.Event(KEYDOWN, key=key, mod=0))
+            for _ in range(20):
+                surface.handle_player_movement(tick)
+            surface.handle_player_movement(
+                pygame.event.Event(KEYUP, key=key, mod=0))
+
+    # Only time the walk, not loading the map.
+    benchmark.pedantic(
+        walk, setup=lambda: ((surface_cls(screen),), {}), rounds=5)
+
+
+@pytest.mark.parametrize('object_count', _OBJECT_COUNTS)
+def test_visible_walls(benchmark, screen, object_count):
+    surface = _moving_play_area(screen, object_count)
+    benchmark(lambda: surface.visible_walls)
+
+
+@pytest.mark.parametrize('object_count', _OBJECT_COUNTS)
+def test_play_area_draw(benchmark, screen, object_count):
+    surface = _moving_play_area(screen, object_count)
+    surface.draw()  # render the static layer
+
+    def draw():
+        surface.scroll((1, 0))
+        surface.draw()
+
+    benchmark(draw)
+
+
+def test_side_bar_draw(benchmark, screen):
+    surface = side_bar.Surface(screen)
+    benchmark(surface.draw)
+
+
+def test_show_long_text(benchmark, screen):
+    text_area = side_bar.TextArea(screen)
+    text = ' '.join([state.Game._END_TEXT] * 20)
+    benchmark(text_area.show, text)
+
+
+def test_mini_map_draw(benchmark, screen):
+    mini_map = side_bar.MiniMap(screen)
+    all_walls = [wall(screen) for wall in walls.ALL.values()]
+    for x in range(-10, 10):
+        for y in range(-10, 10):
+            mini_map.update((x, y), {wall for wall in all_walls
+                                     if (x, y) in wall.adjacent_squares})
+    benchmark(mini_map.draw)
+
+
+@pytest.mark.parametrize('changed', (False, True),
+                         ids=('unchanged', 'changed'))
+def test_restore(benchmark, changed):
+    sim = simulation.Simulation()
+    sim.press(K_DOWN)
+    sim.wait(800)
+    sim.release(K_DOWN)
+    saved = sim.checkpoint()
+    sim.game._play_area.apply_effects((
+        interactions.Effect.remove_object('key'),
+        interactions.Effect.add_object('happy_cat')))
+    checkpoints = [sim.checkpoint(), saved] if changed else [saved]
+
+    def restore():
+        # Each restore undoes the last one's changes, if any.
+        checkpoints.reverse()
+        sim.restore(checkpoints[0])
+
+    benchmark(restore)
+    if benchmark.stats:
+        assert benchmark.stats.stats.median < _RESTORE_BUDGET
+
+
+def test_interaction_lookups(benchmark):
+    names = [*play_objects.VISIBLE, *play_objects.HIDDEN]
+    items = ['key', 'eggplant', 'fishing_rod', 'fish', 'bucket',
+             'filled_bucket', 'matches', *play_objects.FRUITS,
+             *(f'block_{char}' for char in 'LOVE')]
+
+    def lookups():
+        for name in names:
+            interactions.obtain(name)
+        for item in items:
+            interactions.use(item)
+
+    benchmark(lookups)
@@ -0,0 +1,46 @@
+"""Tests for maze.cache."""
+
+import unittest
+
+from maze import cache
+
+
+class LruCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cache = cache.LruCache(2)
+
+    def test_get(self):
+        self.cache['a'] = 1
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertIsNone(self.cache.get('b'))
+
+    def test_evict(self):
+        self.cache['a'] = 1
+        self.cache['b'] = 2
+        self.cache['c'] = 3
+        self.assertEqual(list(self.cache), ['b', 'c'])
+
+    def test_evict_least_recently_used(self):
+        self.cache['a'] = 1
+        self.cache['b'] = 2
+        self.cache.get('a')
+        self.cache['c'] = 3
+        self.assertEqual(list(self.cache), ['a', 'c'])
+
+    def test_discard(self):
+        self.cache['a'] = 1
+        self.cache.discard('a')
+        self.cache.discard('b')
+        self.assertNotIn('a', self.cache)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_clear(self):
+        self.cache['a'] = 1
+        self.cache.clear()
+        self.assertFalse(len(self.cache))
+
+
+if __name__ == '__main__':
+    unittest.main()
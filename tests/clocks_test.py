@@ -0,0 +1,45 @@
+"""Tests for maze.clocks."""
+
+import unittest
+
+from maze import clocks
+
+
+class ManualClockTest(unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.clock = clocks.ManualClock()
+
+    def test_no_timers(self):
+        self.assertFalse(self.clock.advance(1000))
+        self.assertEqual(self.clock.time_ms, 1000)
+
+    def test_fire(self):
+        self.clock.set_timer(1, 100)
+        self.assertFalse(self.clock.advance(99))
+        self.assertEqual([e.type for e in self.clock.advance(1)], [1])
+        self.assertEqual(len(self.clock.advance(250)), 2)
+
+    def test_interleave(self):
+        self.clock.set_timer(1, 100)
+        self.clock.set_timer(2, 150)
+        self.assertEqual([e.type for e in self.clock.advance(300)],
+                         [1, 2, 1, 1, 2])
+
+    def test_progress(self):
+        self.clock.set_timer(1, 100)
+        self.clock.advance(130)
+        self.assertAlmostEqual(self.clock.progress(1), 0.3)
+
+    def test_progress_no_timer(self):
+        self.assertEqual(self.clock.progress(1), 1)
+
+    def test_stop(self):
+        self.clock.set_timer(1, 100)
+        self.clock.set_timer(1, 0)
+        self.assertFalse(self.clock.advance(1000))
+
+
+if __name__ == '__main__':
+    unittest.main()
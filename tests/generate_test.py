@@ -0,0 +1,101 @@
+"""Tests for maze.generate."""
+
+import collections
+import os
+import tempfile
+import unittest
+
+from common import test_utils
+from maze import generate
+from maze import map_file
+from maze import play_objects
+from maze import validate
+from maze import walls
+
+
+def _distances(maze):
+    distances = {(0, 0): 0}
+    queue = collections.deque(distances)
+    while queue:
+        x, y = square = queue.popleft()
+        for side, neighbor in ((walls.Side.LEFT, (x - 1, y)),
+                               (walls.Side.RIGHT, (x + 1, y)),
+                               (walls.Side.TOP, (x, y - 1)),
+                               (walls.Side.BOTTOM, (x, y + 1))):
+            if (not maze.has_wall(square, side) and
+                    neighbor not in distances):
+                distances[neighbor] = distances[square] + 1
+                queue.append(neighbor)
+    return distances
+
+
+class GenerateTest(unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.maze = generate.generate(7, 5, seed=1)
+
+    def test_seed(self):
+        other = generate.generate(7, 5, seed=1)
+        self.assertEqual(list(other.walls()), list(self.maze.walls()))
+        self.assertEqual(other.end, self.maze.end)
+
+    def test_border(self):
+        for x in range(7):
+            self.assertTrue(self.maze.has_wall((x, 0), walls.Side.TOP))
+            self.assertTrue(self.maze.has_wall((x, 4), walls.Side.BOTTOM))
+        for y in range(5):
+            self.assertTrue(self.maze.has_wall((0, y), walls.Side.LEFT))
+            self.assertTrue(self.maze.has_wall((6, y), walls.Side.RIGHT))
+
+    def test_perfect(self):
+        distances = _distances(self.maze)
+        self.assertEqual(len(distances), 35)
+        # A grid with one way between any two squares is a tree, so it has
+        # one fewer open edge than squares.
+        inner_walls = len(self.maze) - 2 * (7 + 5)
+        self.assertEqual(2 * 7 * 5 - 7 - 5 - inner_walls, 34)
+
+    def test_end(self):
+        distances = _distances(self.maze)
+        self.assertEqual(distances[self.maze.end], max(distances.values()))
+
+    def test_len(self):
+        self.assertEqual(len(self.maze), len(list(self.maze.walls())))
+
+
+class MapDataTest(unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.maze = generate.generate(4, 3, seed=2)
+        self.map_data = self.maze.map_data()
+
+    def test_wall_grid(self):
+        self.assertEqual(list(self.map_data.entries()), [])
+        assert self.map_data.wall_grid
+        grid = walls.Grid.from_packed(self.map_data.wall_grid)
+        self.assertEqual(list(grid.walls()), list(self.maze.walls()))
+
+    def test_compile(self):
+        compiled = map_file.from_binary(map_file.compile_map(self.map_data))
+        self.assertEqual(compiled.end, self.maze.end)
+        self.assertEqual(compiled.wall_grid, self.map_data.wall_grid)
+
+
+class ValidateTest(test_utils.ImgTestCase):
+
+    def test_solvable(self):
+        maze = generate.generate(3, 3, seed=3)
+        with tempfile.TemporaryDirectory() as tempdir:
+            path = os.path.join(tempdir, 'maze.map')
+            with open(path, 'wb') as f:
+                f.write(map_file.compile_map(maze.map_data()))
+            self.assertEqual(play_objects.load(path).end, maze.end)
+            report = validate.validate(path, self.screen)
+        self.assertIsNotNone(report.steps)
+        self.assertEqual(report.soft_locks, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,7 @@
 
 import unittest
 from maze import interactions
+from maze import map_file
 
 
 class CloserThanTest(unittest.TestCase):
@@ -54,6 +55,20 @@ class CollideTest(unittest.TestCase):
         collision = interactions.collide('wall_1', (-3, 0))
         self.assertIn('wall', collision.reason)
 
+    def test_prefix(self):
+        collision = interactions.collide('tree_peach', (-3, 0))
+        self.assertIn('tree', collision.reason)
+
+    def test_effects(self):
+        collision = interactions.collide('invisible_wall', (-3, 0))
+        self.assertSequenceEqual(
+            collision.play_area_effects,
+            (interactions.Effect.remove_state('pre_crave'),))
+
+    def test_unknown(self):
+        with self.assertRaises(NotImplementedError):
+            interactions.collide('doesnotexist', (-3, 0))
+
 
 class ObtainTest(unittest.TestCase):
 
@@ -69,6 +84,21 @@ class ObtainTest(unittest.TestCase):
     def test_noop(self):
         self.assertIsNone(interactions.obtain('wall_1'))
 
+    def test_fruit(self):
+        item = interactions.obtain('tree_peach')
+        assert item  # for pytype
+        self.assertSequenceEqual(item.item_effects,
+                                 (interactions.Effect.add_item('peach'),))
+
+    def test_slotted_block(self):
+        item = interactions.obtain('slotted_block_L_in_O')
+        assert item  # for pytype
+        self.assertSequenceEqual(item.item_effects,
+                                 (interactions.Effect.add_item('block_L'),))
+        self.assertSequenceEqual(item.play_area_effects, (
+            interactions.Effect.hide_object('slotted_block_L_in_O'),
+            interactions.Effect.add_object('puzzle_slot_O')))
+
 
 class UseTest(unittest.TestCase):
 
@@ -89,25 +119,50 @@ class UseTest(unittest.TestCase):
             interactions.Effect.add_object('open_gate_left'),
             interactions.Effect.add_object('open_gate_right')))
 
+    def test_block(self):
+        uses = interactions.use('block_L')
+        # One use per slot, plus solving the puzzle in the L slot.
+        self.assertEqual(len(uses), 5)
+
+    def test_unknown(self):
+        with self.assertRaises(NotImplementedError):
+            interactions.use('doesnotexist')
+
+    def test_items(self):
+        for item in interactions.ITEMS:
+            with self.subTest(item=item):
+                self.assertIsInstance(interactions.use(item), list)
+
 
 class ConfigTest(unittest.TestCase):
 
+    def setUp(self):
+        super().setUp()
+        self.config = interactions.Config(map_file.default().config)
+
     def test_squares(self):
-        squares = interactions.config('invisible_wall', 'squares')
+        squares = self.config.get('invisible_wall', 'squares')
         self.assertIs(squares, interactions.Squares.ALL)
 
     def test_squares_default(self):
-        squares = interactions.config('doesnotexist', 'squares')
+        squares = self.config.get('doesnotexist', 'squares')
         self.assertIs(squares, interactions.Squares.DEFAULT)
 
     def test_inflation(self):
-        inflation = interactions.config('puzzle_slot_L', 'inflation')
+        inflation = self.config.get('puzzle_slot_L', 'inflation')
         self.assertEqual(inflation, (-40, 100))
 
     def test_inflation_default(self):
-        inflation = interactions.config('doesnotexist', 'inflation')
+        inflation = self.config.get('doesnotexist', 'inflation')
         self.assertEqual(inflation, interactions._DEFAULT_INFLATION)
 
+    def test_squares_from_entries(self):
+        config = interactions.Config(
+            [map_file.ConfigEntry('gate', squares=((0, 0), (0, 1)))])
+        self.assertEqual(config.get('gate', 'squares'), {(0, 0), (0, 1)})
+        self.assertIs(config.get('invisible_wall', 'squares'),
+                      interactions.Squares.DEFAULT)
+
 
 if __name__ == '__main__':
     unittest.main()
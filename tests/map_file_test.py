@@ -0,0 +1,182 @@
+"""Tests for maze.map_file."""
+
+import json
+import os
+import tempfile
+import unittest
+
+from maze import map_file
+
+_MAP = {
+    'version': 1,
+    'static': ['walls'],
+    'groups': {
+        'walls': [
+            {'name': 'wall_a', 'kind': 'wall', 'square': [0, -1],
+             'side': 'right'},
+        ],
+        'things': [
+            {'name': 'house', 'kind': 'class', 'class': 'House'},
+            {'name': 'tree_a', 'kind': 'tree', 'square': [1, 2],
+             'offset': [350, 25]},
+            {'name': 'gate', 'kind': 'image', 'image': 'gate',
+             'square': [0, 0], 'offset': [400, 15], 'shift': [-0.5, -1]},
+        ],
+    },
+    'config': {
+        'gate': {'squares': [[0, 0], [0, 1]], 'inflation': [50, -40]},
+        'house': {'squares': 'all'},
+    },
+}
+
+
+class JsonTest(unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.map_data = map_file.from_json(_MAP)
+
+    def test_groups(self):
+        self.assertEqual(self.map_data.group_names, ('walls', 'things'))
+        self.assertEqual(self.map_data.static, ('walls',))
+        self.assertEqual(
+            [entry.name for entry in self.map_data.entries()],
+            ['wall_a', 'house', 'tree_a', 'gate'])
+        self.assertEqual(self.map_data.group('missing'), ())
+
+    def test_entries(self):
+        wall, house, tree, gate = self.map_data.entries()
+        self.assertEqual(wall, map_file.Entry(
+            'wall_a', map_file.Kind.WALL, square=(0, -1), side='right'))
+        self.assertEqual(house, map_file.Entry(
+            'house', map_file.Kind.CLASS, ref='House'))
+        self.assertEqual(tree, map_file.Entry(
+            'tree_a', map_file.Kind.TREE, square=(1, 2), offset=(350, 25)))
+        self.assertEqual(gate, map_file.Entry(
+            'gate', map_file.Kind.IMAGE, square=(0, 0), offset=(400, 15),
+            shift=(-0.5, -1), ref='gate'))
+
+    def test_config(self):
+        self.assertEqual(self.map_data.config, [
+            map_file.ConfigEntry('gate', squares=((0, 0), (0, 1)),
+                                 inflation=(50, -40)),
+            map_file.ConfigEntry('house', all_squares=True),
+        ])
+
+    def test_end(self):
+        self.assertIsNone(self.map_data.end)
+        self.assertEqual(map_file.from_json({**_MAP, 'end': [3, -2]}).end,
+                         (3, -2))
+
+    def test_bad_version(self):
+        with self.assertRaises(ValueError):
+            map_file.from_json({**_MAP, 'version': 0})
+
+
+class BinaryTest(unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.map_data = map_file.from_json(_MAP)
+        self.compiled = map_file.from_binary(
+            map_file.compile_map(self.map_data))
+
+    def test_roundtrip(self):
+        self.assertEqual(self.compiled.group_names, ('walls', 'things'))
+        self.assertEqual(self.compiled.static, ('walls',))
+        self.assertEqual(list(self.compiled.entries()),
+                         list(self.map_data.entries()))
+        self.assertEqual(self.compiled.config, self.map_data.config)
+        self.assertIsNone(self.compiled.end)
+
+    def test_end(self):
+        map_data = map_file.from_json({**_MAP, 'end': [3, -2]})
+        compiled = map_file.from_binary(map_file.compile_map(map_data))
+        self.assertEqual(compiled.end, (3, -2))
+
+    def test_wall_grid(self):
+        wall_grid = map_file.WallGrid((-1, 2), (3, 2), b'\x21\x02')
+        map_data = map_file.MapData({}, (), (), wall_grid=wall_grid)
+        compiled = map_file.from_binary(map_file.compile_map(map_data))
+        self.assertEqual(compiled.wall_grid, wall_grid)
+        self.assertIsNone(self.compiled.wall_grid)
+
+    def test_number_types(self):
+        gate = self.compiled.group('things')[-1]
+        assert gate.offset
+        self.assertIsInstance(gate.offset[0], int)
+        self.assertIsInstance(gate.shift[0], float)
+        self.assertIsInstance(gate.shift[1], int)
+
+    def test_lazy_entries(self):
+        things = self.compiled.group('things')
+        self.assertEqual(len(things), 3)
+        self.assertEqual(things[-1].name, 'gate')
+        self.assertEqual([entry.name for entry in things[1:]],
+                         ['tree_a', 'gate'])
+        with self.assertRaises(IndexError):
+            things[3]
+
+    def test_not_compiled(self):
+        with self.assertRaises(ValueError):
+            map_file.from_binary(b'JUNK' + bytes(100))
+
+    def test_default_roundtrip(self):
+        default = map_file.default()
+        compiled = map_file.from_binary(map_file.compile_map(default))
+        self.assertEqual(list(compiled.entries()), list(default.entries()))
+        self.assertEqual(compiled.config, default.config)
+
+    def test_default_compiled(self):
+        # The built-in map must be recompiled whenever its source changes.
+        with open(map_file.DEFAULT_PATH, 'rb') as f:
+            self.assertEqual(
+                f.read(),
+                map_file.compile_map(map_file.load(map_file.SOURCE_PATH)))
+
+    def test_wall_name(self):
+        entry = map_file.Entry(map_file.wall_name((3, -1), 'left'),
+                               map_file.Kind.WALL, (3, -1), side='left')
+        data = map_file.compile_map(
+            map_file.MapData({'walls': [entry]}, (), ()))
+        self.assertNotIn(entry.name.encode(), data)
+        self.assertEqual(map_file.from_binary(data).group('walls')[0], entry)
+
+    def test_entry_size(self):
+        def size(*entries):
+            return len(map_file.compile_map(
+                map_file.MapData({'walls': list(entries)}, (), ())))
+        wall = map_file.Entry(map_file.wall_name((0, 0), 'top'),
+                              map_file.Kind.WALL, side='top')
+        self.assertEqual(size(wall, wall) - size(wall), 24)
+        shifted = map_file.Entry(map_file.wall_name((0, 0), 'top'),
+                                 map_file.Kind.WALL, offset=(1, 2), side='top')
+        self.assertEqual(size(wall, shifted) - size(wall), 40)
+
+
+class LoadTest(unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def _path(self, name):
+        return os.path.join(self.dir.name, name)
+
+    def test_load_json(self):
+        with open(self._path('map.json'), 'w') as f:
+            json.dump(_MAP, f)
+        map_data = map_file.load(self._path('map.json'))
+        self.assertEqual(len(list(map_data.entries())), 4)
+
+    def test_load_compiled(self):
+        with open(self._path('map.map'), 'wb') as f:
+            f.write(map_file.compile_map(map_file.from_json(_MAP)))
+        map_data = map_file.load(self._path('map.map'))
+        self.assertEqual(map_data.group('walls')[0].name, 'wall_a')
+        self.assertEqual(map_data.config[1].name, 'house')
+
+
+if __name__ == '__main__':
+    unittest.main()
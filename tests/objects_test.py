@@ -2,6 +2,7 @@
 
 import pygame
 import unittest
+import unittest.mock
 
 from common import img
 from common import test_utils
@@ -17,6 +18,12 @@ class RectTest(test_utils.GameStateTestCase):
     def test_draw(self):
         self.TestRect(self.screen).draw()
 
+    def test_clean_after_draw(self):
+        rect = self.TestRect(self.screen)
+        self.assertTrue(rect.dirty)
+        rect.draw()
+        self.assertFalse(rect.dirty)
+
 
 class SurfaceTest(test_utils.GameStateTestCase):
 
@@ -59,6 +66,80 @@ class SurfaceTest(test_utils.GameStateTestCase):
         self.assertEqual(self.surface.colliding_mock_rect.drawn, 1)
         self.assertEqual(self.surface.nocolliding_mock_rect.drawn, 0)
 
+    def test_draw_dirty_untracked(self):
+        self.assertEqual(self.surface.draw_dirty(), [pygame.Rect(1, 1, 1, 1)])
+        self.assertEqual(self.surface.draw_dirty(), [pygame.Rect(1, 1, 1, 1)])
+        self.assertEqual(self.surface.colliding_mock_rect.drawn, 2)
+
+
+class LazyObjectsTest(unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.screen = unittest.mock.Mock()
+        self.factories = {'a': unittest.mock.Mock(),
+                          'b': unittest.mock.Mock()}
+        self.objects = objects.LazyObjects(self.screen, self.factories)
+
+    def test_not_created(self):
+        self.assertEqual(set(self.objects), {'a', 'b'})
+        self.assertIn('a', self.objects)
+        self.assertEqual(len(self.objects), 2)
+        self.assertFalse(self.objects.created)
+        self.factories['a'].assert_not_called()
+
+    def test_create_on_access(self):
+        obj = self.objects['a']
+        self.factories['a'].assert_called_once_with(self.screen)
+        self.assertIs(self.objects['a'], obj)
+        self.factories['a'].assert_called_once()
+        self.assertEqual(set(self.objects.created), {'a'})
+        self.assertEqual(len(self.objects), 2)
+
+    def test_pop(self):
+        obj = self.objects.pop('b')
+        self.assertIs(obj, self.factories['b'].return_value)
+        self.assertNotIn('b', self.objects)
+
+    def test_set(self):
+        obj = unittest.mock.Mock()
+        self.objects['c'] = obj
+        self.assertIs(self.objects['c'], obj)
+
+    def test_delete_uncreated(self):
+        del self.objects['a']
+        self.assertNotIn('a', self.objects)
+        self.factories['a'].assert_not_called()
+
+    def test_missing(self):
+        with self.assertRaises(KeyError):
+            self.objects['c']
+
+
+class DirtySurfaceTest(test_utils.GameStateTestCase):
+
+    class TestSurface(objects.Surface):
+
+        class TestRect(objects.Rect):
+            RECT = pygame.Rect(0, 0, 1, 1)
+            COLOR = (0, 0, 0)
+
+        RECT = pygame.Rect((1, 1, 10, 10))
+        OBJECTS = {'test_rect': TestRect}
+
+    def setUp(self):
+        super().setUp()
+        self.surface = self.TestSurface(self.screen)
+
+    def test_draw_dirty(self):
+        self.assertEqual(self.surface.draw_dirty(), [pygame.Rect(1, 1, 1, 1)])
+        self.assertFalse(self.surface.draw_dirty())
+
+    def test_mark_dirty(self):
+        self.surface.draw_dirty()
+        self.surface.mark_dirty()
+        self.assertEqual(self.surface.draw_dirty(), [pygame.Rect(1, 1, 1, 1)])
+
 
 if __name__ == '__main__':
     unittest.main()
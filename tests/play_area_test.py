@@ -1,21 +1,81 @@
 """Tests for maze.play_area."""
 
 import itertools
+import math
+import pygame
 from pygame.locals import *
+import random
 from typing import cast
 import unittest
+import unittest.mock
 
 from common import test_utils
+from maze import assets
 from maze import interactions
 from maze import play_area
+from maze import play_objects
+from maze import spatial_index
 from maze import walls
 
 
+class StepsToClearTest(unittest.TestCase):
+
+    _SHAPES = (pygame.Rect, play_objects._HouseRect, play_objects._TreeRect,
+               play_objects._LakeRect, play_objects._PuzzleWallRect,
+               play_objects._HoleRect, play_objects._FishingRodRect)
+
+    def _decelerate_until_clear(self, feet_rect, rect, speed):
+        # The step-by-step search that _steps_to_clear replaces.
+        speed = play_area._decelerate(speed)
+        while speed and rect.colliderect(
+                feet_rect.union(feet_rect.move(tuple(-s for s in speed)))):
+            speed = play_area._decelerate(speed)
+        return speed
+
+    def test_plain_rect(self):
+        feet_rect = pygame.Rect(0, 0, 40, 15)
+        rect = pygame.Rect(100, 0, 10, 10)
+        self.assertEqual(
+            play_area._steps_to_clear(feet_rect, rect, (-200, 0)), 28)
+
+    def test_overlapping(self):
+        feet_rect = pygame.Rect(0, 0, 40, 15)
+        self.assertEqual(play_area._steps_to_clear(
+            feet_rect, pygame.Rect(10, 0, 10, 10), (-200, 0)), math.inf)
+
+    def test_matches_decelerating(self):
+        rng = random.Random(0)
+        for shape in self._SHAPES:
+            for _ in range(300):
+                feet_rect = pygame.Rect(
+                    rng.randint(-300, 300), rng.randint(-300, 300), 40, 15)
+                rect = shape(
+                    (rng.randint(-700, 700), rng.randint(-700, 700)),
+                    (rng.randint(1, 800), rng.randint(1, 800)))
+                speed = rng.choice(
+                    ((5 * rng.randint(-200, 200), 0),
+                     (0, 5 * rng.randint(-200, 200)),
+                     (5 * rng.randint(-100, 100), 5 * rng.randint(-100, 100))))
+                steps = play_area._steps_to_clear(feet_rect, rect, speed)
+                with self.subTest(shape=shape, feet_rect=feet_rect, rect=rect,
+                                  speed=speed):
+                    self.assertEqual(
+                        play_area._decelerate(speed, max(steps, 1)),
+                        self._decelerate_until_clear(feet_rect, rect, speed))
+
+
 class SurfaceTest(test_utils.ImgTestCase):
 
+    SURFACE = play_area.Surface
+
     def setUp(self):
         super().setUp()
-        self.play_area = play_area.Surface(self.screen)
+        # Static layer chunks can't blit mock images.
+        surface_patch = test_utils.patch('pygame.Surface')
+        self.mock_surface = surface_patch.start()
+        self.addCleanup(surface_patch.stop)
+        assets.CACHE.clear()
+        self.play_area = self.SURFACE(self.screen)
 
     def _set_speed_for_collision(self):
         # Since the player is standing with his head overlapping with the house,
@@ -23,9 +83,7 @@ class SurfaceTest(test_utils.ImgTestCase):
         self.play_area._scroll_speed = (0, self.play_area.player.RECT.h)
 
     def _move_player(self, x, y):
-        for obj in itertools.chain(self.play_area._objects.values(),
-                                   self.play_area._hidden_objects.values()):
-            obj.move((-x, -y))
+        self.play_area.scroll((-x, -y))
 
     def test_move(self):
         house_rect = self.play_area.house.RECT
@@ -47,19 +105,47 @@ class SurfaceTest(test_utils.ImgTestCase):
         self.assertTrue(self.play_area._check_player_collision())
 
     def test_start_player_movement(self):
-        object_x = self.play_area.house.RECT.x
-        hidden_object_x = (
-            self.play_area._hidden_objects['open_gate_left'].RECT.x)
+        house_rect = self.play_area.house.RECT
         self.assertIs(self.play_area.handle_player_movement(
             test_utils.MockEvent(typ=KEYDOWN, key=K_LEFT)), True)
         self.assertIsNotNone(self.play_area._scroll_speed)
         speed_x, speed_y = self.play_area._scroll_speed
         self.assertGreater(speed_x, 0)
         self.assertFalse(speed_y)
-        self.assertEqual(self.play_area.house.RECT.x, object_x + speed_x)
-        self.assertEqual(
-            self.play_area._hidden_objects['open_gate_left'].RECT.x,
-            hidden_object_x + speed_x)
+        self.assertEqual(self.play_area._camera_offset, (speed_x, 0))
+        self.assertEqual(self.play_area.house.RECT, house_rect)
+        self.assertEqual(self.play_area._to_screen(house_rect).x,
+                         house_rect.x + speed_x)
+
+    def test_scroll(self):
+        self.play_area.scroll((10, -20))
+        self.play_area.scroll((5.5, 0))
+        self.assertEqual(self.play_area._camera_offset, (15, -20))
+        self.assertEqual(self.play_area._effective_rect(
+            self.play_area.player.RECT).topleft,
+            (self.play_area.player.RECT.x - 15,
+             self.play_area.player.RECT.y + 20))
+
+    def test_interpolate(self):
+        self.play_area.handle_player_movement(
+            test_utils.MockEvent(typ=play_area._TICK))
+        self._move_player(0, 100)
+        self.play_area.dirty = False
+        self.play_area.interpolate(0.25)
+        self.assertEqual(self.play_area._render_offset, (0, -25))
+        self.assertTrue(self.play_area.dirty)
+        self.play_area.interpolate(1)
+        self.assertEqual(self.play_area._render_offset, (0, -100))
+
+    def test_interpolate_unchanged(self):
+        self.play_area.dirty = False
+        self.play_area.interpolate(0.5)
+        self.assertFalse(self.play_area.dirty)
+
+    def test_scroll_not_smooth(self):
+        self.play_area.scroll((100, 0), smooth=False)
+        self.play_area.interpolate(0)
+        self.assertEqual(self.play_area._render_offset, (100, 0))
 
     def test_stop_player_movement(self):
         self.assertIs(self.play_area.handle_player_movement(
@@ -103,13 +189,87 @@ class SurfaceTest(test_utils.ImgTestCase):
         self.assertEqual(wall.SQUARE, (0, 0))
         self.assertEqual(wall.SIDE, walls.Side.RIGHT)
 
+    def test_walls_by_square(self):
+        self.assertEqual(
+            set(self.play_area._walls_by_square[(0, 0)]),
+            {'wall_sright', 'wall_sbottom'})
+        self.assertEqual(
+            set(self.play_area._walls_by_square[(-2, 0)]), {'wall_1left'})
+
+    def test_visible_walls_lookup_per_square(self):
+        self.play_area.visible_walls
+        square_walls = self.play_area._square_walls
+        self._move_player(100, 0)
+        self.play_area.visible_walls
+        self.assertIs(self.play_area._square_walls, square_walls)
+        self._move_player(-900, 0)
+        self.play_area.visible_walls
+        self.assertEqual(self.play_area._walls_square, (-1, 0))
+
+    def test_visible_walls_matches_scan(self):
+        for dx, dy in ((400, 0), (-800, 300), (0, -800), (1200, 1200)):
+            self._move_player(dx, dy)
+            view_rect = self.play_area._view_rect()
+            expected = {
+                wall for name, wall in self.play_area._objects.items()
+                if walls.match(name) and wall.RECT.colliderect(view_rect) and
+                self.play_area.current_square in cast(
+                    walls.Wall, wall).adjacent_squares}
+            self.assertEqual(self.play_area.visible_walls, expected)
+
+    def test_draw_static_chunks(self):
+        self.play_area.draw()
+        self.assertEqual(set(self.play_area._static_layer._chunks), {(0, 0)})
+        self._move_player(400, 0)
+        self.play_area.draw()
+        self.assertEqual(set(self.play_area._static_layer._chunks),
+                         {(0, 0), (1, 0)})
+        self.assertEqual(self.mock_surface.call_count, 2)
+
+    def test_draw_static_objects_once(self):
+        wall = self.play_area.wall_sright
+        with unittest.mock.patch.object(wall, 'draw') as mock_draw:
+            self._move_player(400, 0)
+            self.play_area.draw()
+            # The wall is on the edge between two chunks.
+            self.assertEqual(mock_draw.call_count, 2)
+            self._move_player(10, 0)
+            self.play_area.draw()
+            self.assertEqual(mock_draw.call_count, 2)
+
+    def test_remove_static_object(self):
+        self.play_area.draw()
+        self.play_area.apply_effects(
+            (interactions.Effect.remove_object('house'),))
+        self.assertFalse(set(self.play_area._static_layer._chunks))
+
+    def test_remove_dynamic_object(self):
+        self._move_player(-950, 950)
+        self.play_area.draw()
+        chunks = set(self.play_area._static_layer._chunks)
+        self.play_area.apply_effects(
+            (interactions.Effect.remove_object('key'),))
+        self.assertEqual(set(self.play_area._static_layer._chunks), chunks)
+
     def test_handle_click(self):
         self.assertIs(self.play_area.handle_click((288, 288)), True)
 
     def test_handle_key(self):
         self._move_player(-950, 950)
         click_result = cast(interactions.Item, self.play_area.handle_click(
-            self.play_area.key.RECT.center))
+            self.play_area._to_screen(self.play_area.key.RECT).center))
+        self.assertIn('key', click_result.reason)
+
+    def test_handle_click_between_ticks(self):
+        self._move_player(-950, 950)
+        self.play_area.handle_player_movement(
+            test_utils.MockEvent(typ=play_area._TICK))
+        self._move_player(-self.play_area.key.RECT.w, 0)
+        # The view is still drawn where it was at the start of the tick.
+        self.play_area.interpolate(0)
+        click_result = cast(interactions.Item, self.play_area.handle_click(
+            self.play_area.key.RECT.move(
+                self.play_area._tick_start_offset).center))
         self.assertIn('key', click_result.reason)
 
     def test_handle_outside_click(self):
@@ -140,12 +300,27 @@ class SurfaceTest(test_utils.ImgTestCase):
         self.play_area.apply_effects(
             (interactions.Effect.remove_object('key'),))
         self.assertNotIn('key', self.play_area._objects)
+        self.assertNotIn('key', self.play_area._index)
 
     def test_add_object(self):
         self.assertNotIn('happy_cat', self.play_area._objects)
         self.play_area.apply_effects(
             (interactions.Effect.add_object('happy_cat'),))
         self.assertIn('happy_cat', self.play_area._objects)
+        self.assertIn('happy_cat', self.play_area._index)
+
+    def test_hidden_objects_created_lazily(self):
+        self.assertFalse(self.play_area._hidden_objects.created)
+        self.play_area.apply_effects(
+            (interactions.Effect.add_object('happy_cat'),))
+        self.assertFalse(self.play_area._hidden_objects.created)
+        self.assertIn('fire', self.play_area._hidden_objects)
+
+    def test_hide_object(self):
+        self.play_area.apply_effects(
+            (interactions.Effect.hide_object('key'),))
+        self.assertNotIn('key', self.play_area._index)
+        self.assertIn('key', self.play_area._hidden_objects)
 
     def test_can_collide(self):
         for name in itertools.chain(self.play_area._objects,
@@ -260,6 +435,59 @@ class SurfaceTest(test_utils.ImgTestCase):
         self.play_area.apply_effects(item.play_area_effects)
         self.play_area.use_item('block_E')
 
+    def test_snapshot(self):
+        self._move_player(100, 0)
+        self.play_area.apply_effects((
+            interactions.Effect.remove_object('key'),
+            interactions.Effect.add_object('happy_cat')))
+        saved = self.play_area.snapshot()
+        self.assertEqual(saved.camera_offset, (-100, 0))
+        self.assertNotIn('key', saved.visible)
+        self.assertIn('happy_cat', saved.visible)
+        self.assertNotIn('happy_cat', saved.hidden)
+        other = self.SURFACE(self.screen)
+        other.restore(saved)
+        self.assertEqual(other.snapshot(), saved)
+        self.assertIn('happy_cat', other._index)
+
+    def test_restore_drawing_order(self):
+        saved = self.play_area.snapshot()
+        self.play_area.apply_effects((
+            interactions.Effect.hide_object('house'),
+            interactions.Effect.add_object('happy_cat'),
+            interactions.Effect.add_object('house')))
+        reordered = self.play_area.snapshot()
+        self.assertEqual(reordered.visible[-2:], ('happy_cat', 'house'))
+        everywhere = pygame.Rect(-10**6, -10**6, 2 * 10**6, 2 * 10**6)
+        for snapshot in (saved, reordered, saved):
+            self.play_area.restore(snapshot)
+            restored = self.play_area.snapshot()
+            self.assertEqual(restored.visible, snapshot.visible)
+            self.assertCountEqual(restored.hidden, snapshot.hidden)
+            self.assertEqual(self.play_area._index.query(everywhere),
+                             list(snapshot.visible))
+
+    def test_restore_keeps_static_layer(self):
+        saved = self.play_area.snapshot()
+        self.play_area.draw()
+        chunks = self.play_area._static_layer._chunks
+        self.assertTrue(chunks)
+        chunk_count = len(chunks)
+        self.play_area.restore(saved)
+        self.assertIs(self.play_area._static_layer._chunks, chunks)
+        self.assertEqual(len(chunks), chunk_count)
+
+    def test_index(self):
+        # The built-in map is spread out over many squares.
+        self.assertIsInstance(self.play_area._index, self.SURFACE._INDEX or
+                              spatial_index.GridIndex)
+
+    def test_names_of(self):
+        house = self.play_area.house
+        self.assertEqual(self.play_area.names_of([house, object()]), ['house'])
+        self.assertEqual(self.play_area.objects_named(['house', 'fire']),
+                         [house])
+
     def test_remove_slotted_block_from_below(self):
         self._move_player(1400, 2600)
         self.play_area.use_item('block_L')
@@ -269,5 +497,16 @@ class SurfaceTest(test_utils.ImgTestCase):
                                  (interactions.Effect.add_item('block_L'),))
 
 
+class _ArrayIndexSurface(play_area.Surface):
+
+    _INDEX = spatial_index.ArrayIndex
+
+
+@unittest.skipUnless(spatial_index.HAS_NUMPY, 'requires numpy')
+class ArrayIndexSurfaceTest(SurfaceTest):
+
+    SURFACE = _ArrayIndexSurface
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,10 +1,15 @@
 """Tests for maze.play_objects."""
 
+import os
 import pygame
+import tempfile
 import unittest
+from typing import cast
 
 from common import test_utils
+from maze import map_file
 from maze import play_objects
+from maze import walls
 
 
 class HouseTest(test_utils.ImgTestCase):
@@ -22,6 +27,49 @@ class HouseTest(test_utils.ImgTestCase):
             pygame.Rect(self.house.RECT.topleft, (10, 10))))
 
 
+class MultiRectTest(unittest.TestCase):
+
+    def test_layout_cached(self):
+        rect = play_objects._HouseRect((0, 0), (600, 500))
+        layout = rect._layout()
+        self.assertIs(rect._layout(), layout)
+        self.assertEqual(len(layout), 4 * len(rect._get_rects()))
+        rect.move_ip((10, 10))
+        self.assertIsNot(rect._layout(), layout)
+
+    def test_negative_position(self):
+        rect = play_objects._TreeRect((-550, -50), (429, 450))
+        self.assertEqual(rect._get_rects(), [
+            pygame.Rect(-550, -50, 429, 270), pygame.Rect(-462, 220, 214, 180)])
+
+    def test_unaligned_position(self):
+        rect = play_objects._FishingRodRect((1251, 1953), (208, 200))
+        rects = rect._get_rects()
+        self.assertEqual(rects[0], pygame.Rect(1417, 1953, 41, 41))
+        self.assertEqual(rects[1], pygame.Rect(1396, 1973, 41, 41))
+        self.assertEqual(rects[4], pygame.Rect(1333, 2033, 49, 49))
+        self.assertEqual(rects[-1], pygame.Rect(1249, 2117, 41, 41))
+
+    def test_move(self):
+        rect = play_objects._LakeRect((0, 0), (600, 500))
+        moved_rect = cast(play_objects._LakeRect, rect.move((-1000, 30)))
+        self.assertEqual(
+            moved_rect._get_rects(),
+            [r.move((-1000, 30)) for r in rect._get_rects()])
+        point = rect._get_rects()[-1].center
+        self.assertTrue(rect.colliderect(pygame.Rect(point, (1, 1))))
+        self.assertFalse(moved_rect.colliderect(pygame.Rect(point, (1, 1))))
+        self.assertTrue(moved_rect.colliderect(
+            pygame.Rect((point[0] - 1000, point[1] + 30), (1, 1))))
+
+    def test_collidepoint_after_move(self):
+        rect = play_objects._TreeRect((0, 0), (200, 300))
+        moved_rect = rect.move((500, -500))
+        self.assertTrue(moved_rect.collidepoint(
+            (rect.centerx + 500, rect.centery - 500)))
+        self.assertFalse(moved_rect.collidepoint(rect.center))
+
+
 class TreeTest(test_utils.ImgTestCase):
 
     def setUp(self):
@@ -156,5 +204,50 @@ class PuzzleTest(test_utils.GameStateTestCase):
         play_objects.PuzzleSlotL(self.screen).draw()
 
 
+class LoadTest(test_utils.ImgTestCase):
+
+    def test_load_default(self):
+        loaded = play_objects.load(map_file.DEFAULT_PATH)
+        self.assertEqual(list(loaded.visible), list(play_objects.VISIBLE))
+        self.assertEqual(list(loaded.hidden), list(play_objects.HIDDEN))
+        self.assertEqual(loaded.static, play_objects.STATIC)
+        self.assertEqual(loaded.config, play_objects.DEFAULT.config)
+        self.assertTrue(loaded.config)
+        screen = cast(pygame.Surface, self.screen)
+        for name, factory in loaded.visible.items():
+            self.assertEqual(factory(screen).RECT,
+                             play_objects.VISIBLE[name](screen).RECT)
+
+    def test_load_wall_grid(self):
+        grid = walls.Grid((0, 0), (2, 1))
+        grid.add_wall((0, 0), walls.Side.RIGHT)
+        map_data = map_file.MapData(
+            {'things': [map_file.Entry('house', map_file.Kind.CLASS,
+                                       ref='House')]},
+            (), (), wall_grid=grid.packed())
+        with tempfile.TemporaryDirectory() as tempdir:
+            path = os.path.join(tempdir, 'map.map')
+            with open(path, 'wb') as f:
+                f.write(map_file.compile_map(map_data))
+            loaded = play_objects.load(path)
+        self.assertEqual(list(loaded.visible), ['wall_0_0_right', 'house'])
+        self.assertIn('wall_0_0_right', loaded.static)
+        self.assertNotIn('house', loaded.static)
+        self.assertNotIn('wall_0_0_bottom', loaded.visible)
+
+    def test_load_bad_class(self):
+        for ref in ('load', 'Nonexistent'):
+            map_data = map_file.MapData(
+                {'things': [map_file.Entry('thing', map_file.Kind.CLASS,
+                                           ref=ref)]}, (), ())
+            with tempfile.TemporaryDirectory() as tempdir:
+                path = os.path.join(tempdir, 'map.map')
+                with open(path, 'wb') as f:
+                    f.write(map_file.compile_map(map_data))
+                with self.subTest(ref=ref):
+                    with self.assertRaisesRegex(ValueError, 'Unknown class'):
+                        play_objects.load(path)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,117 @@
+"""Tests for maze.profiling."""
+
+import csv
+import json
+import os
+import tempfile
+import unittest
+import unittest.mock
+
+from common import test_utils
+from maze import profiling
+
+
+class PercentileTest(unittest.TestCase):
+
+    def test_empty(self):
+        self.assertEqual(profiling.percentile([], 50), 0)
+
+    def test_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(profiling.percentile(values, 50), 50)
+        self.assertEqual(profiling.percentile(values, 99), 99)
+        self.assertEqual(profiling.percentile(values, 0), 1)
+
+
+class ProfilerTest(unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.profiler = profiling.Profiler(window=3)
+        time_patch = test_utils.patch('time.perf_counter')
+        self.perf_counter = time_patch.start()
+        self.addCleanup(time_patch.stop)
+
+    def _time(self, name, seconds):
+        self.perf_counter.side_effect = [0, seconds]
+        with self.profiler.section(name):
+            pass
+
+    def test_sum_per_frame(self):
+        self._time('draw', 0.001)
+        self._time('draw', 0.002)
+        self.profiler.end_frame()
+        self.assertAlmostEqual(self.profiler.stats()['draw']['p50'], 3)
+
+    def test_skip_frames_without_section(self):
+        self._time('draw', 0.001)
+        self.profiler.end_frame()
+        self.profiler.end_frame()
+        self.assertEqual(self.profiler.stats()['draw']['frames'], 1)
+
+    def test_window(self):
+        for ms in (100, 1, 2, 3):
+            self._time('draw', ms / 1000)
+            self.profiler.end_frame()
+        self.assertAlmostEqual(self.profiler.stats()['draw']['p99'], 3)
+
+    def test_instrument(self):
+        obj = unittest.mock.MagicMock()
+        obj.method.return_value = 42
+        self.perf_counter.side_effect = [0, 0.005]
+        self.profiler.instrument(obj, 'method', 'obj.method')
+        self.assertEqual(obj.method(), 42)
+        self.profiler.end_frame()
+        self.assertAlmostEqual(self.profiler.stats()['obj.method']['p50'], 5)
+
+    def _dump(self, suffix):
+        self._time('draw', 0.001)
+        self.profiler.end_frame()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'profile' + suffix)
+            self.profiler.dump(path)
+            with open(path) as f:
+                if suffix == '.json':
+                    return json.load(f)
+                return list(csv.reader(f))
+
+    def test_dump_json(self):
+        stats = self._dump('.json')
+        self.assertEqual(set(stats['draw']), {'p50', 'p95', 'p99', 'frames'})
+
+    def test_dump_csv(self):
+        header, row = self._dump('.csv')
+        self.assertEqual(header, ['section', 'p50', 'p95', 'p99', 'frames'])
+        self.assertEqual(row[0], 'draw')
+
+    def test_counters(self):
+        self.profiler.watch('assets', lambda: {'loads': 3})
+        self.assertEqual(self.profiler.counters(), {'assets.loads': 3})
+        self.assertIn('assets.loads', self.profiler._lines()[-1])
+
+    def test_dump_counters_json(self):
+        self.profiler.watch('assets', lambda: {'loads': 3})
+        stats = self._dump('.json')
+        self.assertEqual(stats['counters'], {'assets.loads': 3})
+
+    def test_dump_counters_csv(self):
+        self.profiler.watch('assets', lambda: {'loads': 3})
+        rows = self._dump('.csv')
+        self.assertEqual(rows[-2:],
+                         [['counter', 'value'], ['assets.loads', '3']])
+
+
+class ProfilerDrawTest(test_utils.GameStateTestCase):
+
+    def test_draw(self):
+        profiler = profiling.Profiler()
+        with profiler.section('draw'):
+            pass
+        profiler.end_frame()
+        profiler.draw(self.screen)
+        # A header and one section.
+        self.assertEqual(self.screen.blit.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
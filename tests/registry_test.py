@@ -0,0 +1,60 @@
+"""Tests for maze.registry."""
+
+import unittest
+
+from maze import registry
+
+
+class RegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.registry = registry.Registry()
+
+    def test_exact(self):
+        self.registry.add('key', 1)
+        self.assertEqual(self.registry.get('key'), 1)
+        self.assertIsNone(self.registry.get('keys'))
+
+    def test_prefix(self):
+        self.registry.add_prefix('tree_', 1)
+        self.assertEqual(self.registry.match('tree_3'), ('tree_', 1))
+        self.assertIsNone(self.registry.get('tree'))
+
+    def test_exact_before_prefix(self):
+        self.registry.add_prefix('tree_', 1)
+        self.registry.add('tree_peach', 2)
+        self.assertEqual(self.registry.get('tree_peach'), 2)
+        self.assertEqual(self.registry.get('tree_apple'), 1)
+
+    def test_longest_prefix(self):
+        self.registry.add_prefix('wall_', 1)
+        self.registry.add_prefix('wall_e', 2)
+        self.assertEqual(self.registry.get('wall_eright'), 2)
+        self.assertEqual(self.registry.get('wall_sright'), 1)
+        self.assertEqual(self.registry.get('wall_'), 1)
+
+    def test_shorter_prefix_after_mismatch(self):
+        self.registry.add_prefix('block_', 1)
+        self.registry.add_prefix('block_LOVE', 2)
+        self.assertEqual(self.registry.get('block_LOVR'), 1)
+
+    def test_default(self):
+        self.assertEqual(self.registry.get('key', 0), 0)
+        self.assertNotIn('key', self.registry)
+
+    def test_add_after_lookup(self):
+        self.assertIsNone(self.registry.get('key'))
+        self.registry.add('key', 1)
+        self.assertIn('key', self.registry)
+
+    def test_many_names(self):
+        for i in range(5000):
+            self.registry.add(f'flowers_{i}', i)
+        self.registry.add_prefix('flowers_', -1)
+        self.assertEqual(self.registry.get('flowers_4999'), 4999)
+        self.assertEqual(self.registry.get('flowers_5000'), -1)
+
+
+if __name__ == '__main__':
+    unittest.main()
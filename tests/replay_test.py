@@ -0,0 +1,105 @@
+"""Tests for maze.replay."""
+
+import io
+import pygame
+from pygame.locals import *
+import unittest
+
+from maze import play_area
+from maze import replay
+from maze import simulation
+
+
+class _Log(io.BytesIO):
+    """A log that can still be read after the recorder closes it."""
+
+    def close(self):
+        pass
+
+
+class RecorderTest(unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.log = _Log()
+        self.recorder = replay.Recorder(self.log)
+
+    def _records(self):
+        self.log.seek(0)
+        self.assertIsNone(replay.read_header(self.log))
+        return list(replay.read_records(self.log))
+
+    def test_record(self):
+        self.recorder.record(pygame.event.Event(KEYDOWN, key=K_LEFT, mod=0))
+        self.recorder.record(pygame.event.Event(play_area._TICK))
+        self.recorder.record(pygame.event.Event(play_area._TICK))
+        self.recorder.record(pygame.event.Event(
+            MOUSEBUTTONDOWN, button=1, pos=(100, 200)))
+        self.recorder.close()
+        self.assertEqual(self._records(), [
+            replay.Record(0, replay.Kind.KEYDOWN, K_LEFT),
+            replay.Record(2, replay.Kind.CLICK, 1, (100, 200)),
+            replay.Record(2, replay.Kind.END)])
+
+    def test_compact(self):
+        for _ in range(100):
+            self.recorder.record(pygame.event.Event(play_area._TICK))
+        self.recorder.close()
+        self.assertEqual(len(self.log.getvalue()),
+                         replay._HEADER.size + replay._RECORD.size)
+
+    def test_ignore_other_events(self):
+        self.recorder.record(pygame.event.Event(QUIT))
+        self.recorder.close()
+        self.assertEqual(self._records(), [replay.Record(0, replay.Kind.END)])
+
+    def test_cheat(self):
+        log = io.BytesIO()
+        replay.Recorder(log, (-1.5, 2))
+        log.seek(0)
+        self.assertEqual(replay.read_header(log), (-1.5, 2))
+
+    def test_bad_header(self):
+        with self.assertRaises(ValueError):
+            replay.read_header(io.BytesIO(b'\0' * replay._HEADER.size))
+
+
+class EventsTest(unittest.TestCase):
+
+    def test_regenerate_ticks(self):
+        events = list(replay.events([
+            replay.Record(1, replay.Kind.KEYDOWN, K_UP),
+            replay.Record(3, replay.Kind.KEYUP, K_UP),
+            replay.Record(4, replay.Kind.END)]))
+        self.assertEqual(
+            [event.type for event in events],
+            [play_area._TICK, KEYDOWN, play_area._TICK, play_area._TICK,
+             KEYUP, play_area._TICK])
+        self.assertEqual(events[1].key, K_UP)
+
+
+class ReplayTest(unittest.TestCase):
+
+    def test_replay(self):
+        log = _Log()
+        sim = simulation.Simulation(recorder=replay.Recorder(log))
+        sim.press(K_DOWN)
+        sim.wait(700)
+        sim.release(K_DOWN)
+        sim.press(K_RIGHT)
+        sim.wait(60000)
+        sim.click((288, 288))
+        sim.game.cleanup()
+        log.seek(0)
+        replay.read_header(log)
+        game = simulation.Simulation().game
+        replay.replay(game, log)
+        self.assertNotEqual(game._play_area._camera_offset, (0, 0))
+        self.assertEqual(game._play_area._camera_offset,
+                         sim.game._play_area._camera_offset)
+        self.assertEqual(game._side_bar.mini_map._explored_squares,
+                         sim.game._side_bar.mini_map._explored_squares)
+
+
+if __name__ == '__main__':
+    unittest.main()
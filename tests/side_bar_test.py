@@ -2,6 +2,7 @@
 
 import pygame
 import unittest
+import unittest.mock
 
 from common import color
 from common import test_utils
@@ -36,11 +37,109 @@ class MiniMapTest(test_utils.GameStateTestCase):
     def test_draw(self):
         self.mini_map.draw()
 
+    def test_dirty(self):
+        self.mini_map.draw()
+        self.mini_map.update((0, 0), set())
+        self.assertFalse(self.mini_map.dirty)
+        self.mini_map.update((0, 1), set())
+        self.assertTrue(self.mini_map.dirty)
+
+    def test_dirty_seen_walls(self):
+        self.mini_map.draw()
+        self.mini_map.update((0, 0), {walls.ALL['wall_sright'](self.screen)})
+        self.assertTrue(self.mini_map.dirty)
+
+    def test_bounding_box(self):
+        self.mini_map.update((2, -1), set())
+        self.mini_map.update((-3, 0), set())
+        self.assertEqual(self.mini_map._min_square, [-3, -1])
+        self.assertEqual(self.mini_map._max_square, [2, 0])
+
+    def test_layer_covers_view(self):
+        self.mini_map.update((5, 0), set())
+        self.mini_map.update((0, -2), set())
+        for square in ((0, 0), (5, 0), (0, -2)):
+            self.assertTrue(self.mini_map._layer.get_rect().contains(
+                self.mini_map._layer_rect(square)))
+
+    def test_layer_size_capped(self):
+        size = self.mini_map._layer.get_size()
+        for x in range(0, 1000, 10):
+            self.mini_map.update((x, x), set())
+        self.assertEqual(self.mini_map._layer.get_size(), size)
+        center = (495, 495)
+        self.assertTrue(self.mini_map._layer.get_rect().contains(
+            self.mini_map._layer_rect(center)))
+        self.assertFalse(self.mini_map._layer.get_rect().colliderect(
+            self.mini_map._layer_rect((0, 0))))
+
+    def test_layer_redrawn_from_pages(self):
+        wall = walls.ALL['wall_sright'](self.screen)
+        self.mini_map.update((0, 0), {wall})
+        self.mini_map.update((100, 0), set())
+        draw = self.mocks['pygame.draw']
+        draw.reset_mock()
+        # The new square is drawn, then moving the center back redraws the
+        # square and wall near it.
+        self.mini_map.update((-100, 0), set())
+        self.assertEqual(draw.rect.call_count, 2)
+        draw.line.assert_called_once()
+
+    def test_update_draws_new_square(self):
+        self.mini_map.update((1, 1), set())
+        draw_rect = self.mocks['pygame.draw'].rect
+        draw_rect.reset_mock()
+        self.mini_map.update((0, 1), set())
+        draw_rect.assert_called_once()
+
+    def test_draw_constant(self):
+        draw = self.mocks['pygame.draw']
+        for x in range(10):
+            for y in range(10):
+                self.mini_map.update((x, y), {
+                    walls.ALL['wall_sright'](self.screen),
+                    walls.ALL['wall_sbottom'](self.screen)})
+        draw.reset_mock()
+        self.mini_map.draw()
+        # The background and current square.
+        self.assertEqual(draw.rect.call_count, 2)
+        draw.line.assert_not_called()
+
+    def test_draw_current_square_walls(self):
+        self.mini_map.update((0, 0), {walls.ALL['wall_sright'](self.screen)})
+        draw = self.mocks['pygame.draw']
+        draw.reset_mock()
+        self.mini_map.draw()
+        draw.line.assert_called_once()
+
     def test_turn_red(self):
         self.assertNotEqual(self.mini_map._square_color, color.RED)
         self.mini_map.turn_red()
         self.assertEqual(self.mini_map._square_color, color.RED)
 
+    def test_restore(self):
+        wall = walls.ALL['wall_sright'](self.screen)
+        self.mini_map.turn_red()
+        self.mini_map.restore(side_bar.MiniMapSnapshot(
+            (1, 0), ((0, 0), (1, 0), (1, 1)), (wall,), False))
+        self.assertEqual(self.mini_map._current_square, (1, 0))
+        self.assertEqual(self.mini_map._seen_walls, {wall})
+        self.assertIn(wall, self.mini_map._walls_by_square[(1, 1)])
+        self.assertEqual(self.mini_map._min_square, [0, 0])
+        self.assertEqual(self.mini_map._max_square, [1, 1])
+        self.assertNotEqual(self.mini_map._square_color, color.RED)
+        self.assertTrue(self.mini_map.dirty)
+
+    def test_restore_unchanged(self):
+        self.mini_map.update((1, 0), {walls.ALL['wall_sright'](self.screen)})
+        saved = self.mini_map.snapshot()
+        self.mini_map.update((0, 0), set())
+        with unittest.mock.patch.object(
+                self.mini_map, '_redraw_layer') as redraw_layer:
+            self.mini_map.restore(saved)
+        redraw_layer.assert_not_called()
+        self.assertEqual(self.mini_map.snapshot(), saved)
+
 
 class TextAreaTest(test_utils.GameStateTestCase):
 
@@ -54,31 +153,90 @@ class TextAreaTest(test_utils.GameStateTestCase):
         block, = self.text_area._text
         self.assertEqual(block.value, 'This is some text.')
 
-    def test_multiple_lines(self):
+    def _set_text_size(self, size):
         # pyrefly: ignore[missing-attribute]
-        pygame.font.SysFont.return_value.size = (
-            lambda text: (self.max_width * len(text.split()), 10))
+        pygame.font.SysFont.return_value.size = size
+
+    def _set_glyph_width(self, width):
+        self._set_text_size(lambda text: (width * len(text), 10))
+
+    def test_multiple_lines(self):
+        glyph_width = self.max_width // 6
+        self._set_glyph_width(glyph_width)
         self.text_area.show('Two lines.')
         block1, block2 = self.text_area._text
-        self.assertEqual(block1.size, (self.max_width, 10))
+        self.assertEqual(block1.size, (3 * glyph_width, 10))
         self.assertEqual(block1.value, 'Two')
-        self.assertEqual(block2.size, (self.max_width, 10))
+        self.assertEqual(block2.size, (6 * glyph_width, 10))
         self.assertEqual(block2.pos, (block1.pos[0], block1.pos[1] + 10))
         self.assertEqual(block2.value, 'lines.')
 
     def test_whitespace(self):
-        # pyrefly: ignore[missing-attribute]
-        pygame.font.SysFont.return_value.size = (
-            lambda text: (self.max_width * len(text.split()) // 2, 10))
-        self.text_area.show('Two words per line.')
+        self._set_glyph_width(self.max_width // 9)
+        self.text_area.show('Two  words per\nline.')
         block1, block2 = self.text_area._text
         self.assertEqual(block1.value, 'Two words')
         self.assertEqual(block2.value, 'per line.')
 
+    def test_proportional_font(self):
+        glyph_width = self.max_width // 9
+
+        def size(text):
+            # A wide W makes the font proportional, and kerning adds space
+            # between glyphs.
+            width = sum(glyph_width + (glyph == 'W') for glyph in text)
+            return (width + 5 * (len(text) - 1), 10)
+        self._set_text_size(size)
+        text_area = side_bar.TextArea(self.screen)
+        text_area.show('aaaa aaaa')
+        block1, block2 = text_area._text
+        self.assertEqual(block1.value, 'aaaa')
+        self.assertEqual(block1.size, (size('aaaa')[0], 10))
+        self.assertEqual(block2.value, 'aaaa')
+
+    def test_measure_glyphs_once(self):
+        font = self.mocks['pygame.font'].SysFont.return_value
+        font.size.reset_mock()
+        self.text_area.show('aaa bbb aaa')
+        self.assertEqual(
+            sorted(call.args[0] for call in font.size.call_args_list),
+            [' ', 'a', 'b'])
+
+    def test_render_once(self):
+        font = self.mocks['pygame.font'].SysFont.return_value
+        self.text_area.show('Some text.')
+        self.text_area.draw()
+        self.text_area.draw()
+        font.render.assert_called_once_with(
+            'Some text.', 0, color.BRIGHT_GREEN)
+
+    def test_render_cached_text_once(self):
+        font = self.mocks['pygame.font'].SysFont.return_value
+        self.text_area.show('Some text.')
+        self.text_area.draw()
+        self.text_area.show('Other text.')
+        self.text_area.draw()
+        self.text_area.show('Some text.')
+        self.text_area.draw()
+        self.assertEqual(font.render.call_count, 2)
+
     def test_show_none(self):
         self.text_area.show(None)
         self.assertFalse(self.text_area._text)
 
+    def test_text(self):
+        self.text_area.show('Text.')
+        self.assertEqual(self.text_area.text, 'Text.')
+        self.text_area.show(None)
+        self.assertIsNone(self.text_area.text)
+
+    def test_dirty(self):
+        self.text_area.draw()
+        self.text_area.show(None)
+        self.assertFalse(self.text_area.dirty)
+        self.text_area.show('Text.')
+        self.assertTrue(self.text_area.dirty)
+
 
 class SurfaceTest(test_utils.GameStateTestCase):
 
@@ -91,6 +249,33 @@ class SurfaceTest(test_utils.GameStateTestCase):
         self.side_bar.add_item('key')
         self.assertIsNotNone(self.side_bar.item_cell0.item)
 
+    def test_items(self):
+        self.side_bar.add_item('key')
+        self.assertEqual(self.side_bar.items, ['key'] + [None] * 7)
+
+    def test_set_items(self):
+        self.side_bar.add_item('key')
+        self.side_bar.set_items([None, 'peach'] + [None] * 6)
+        self.assertIsNone(self.side_bar.item_cell0.item)
+        self.assertEqual(self.side_bar.item_cell1.item, 'peach')
+
+    def test_snapshot(self):
+        self.side_bar.add_item('key')
+        self.side_bar.text_area.show('Hello.')
+        saved = self.side_bar.snapshot()
+        other = side_bar.Surface(self.screen)
+        other.restore(saved)
+        self.assertEqual(other.items, self.side_bar.items)
+        self.assertEqual(other.text_area.text, 'Hello.')
+        self.assertEqual(other.snapshot(), saved)
+
+    def test_add_item_dirty(self):
+        self.side_bar.draw_dirty()
+        self.side_bar.add_item('key')
+        self.assertTrue(self.side_bar.item_cell0.dirty)
+        self.assertEqual(self.side_bar.draw_dirty(),
+                         [self.side_bar.item_cell0.RECT.move(576, 0)])
+
     def test_handle_outside_click(self):
         self.assertIs(self.side_bar.handle_click((288, 288)), False)
 
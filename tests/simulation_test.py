@@ -0,0 +1,43 @@
+"""Tests for maze.simulation."""
+
+from pygame.locals import *
+import unittest
+
+from maze import simulation
+
+
+class SimulationTest(unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.sim = simulation.Simulation()
+        self.play_area = self.sim.game._play_area
+
+    def test_walk(self):
+        self.sim.press(K_DOWN)
+        self.sim.wait(500)
+        self.sim.release(K_DOWN)
+        self.assertLess(self.play_area._camera_offset[1], 0)
+
+    def test_walk_into_wall(self):
+        self.sim.press(K_RIGHT)
+        self.sim.wait(60000)
+        self.assertEqual(self.play_area.current_square, (0, 0))
+        self.assertTrue(self.play_area.visible_walls)
+
+    def test_wait_without_moving(self):
+        self.sim.wait(1000)
+        self.assertEqual(self.play_area._camera_offset, (0, 0))
+
+    def test_obtain_key(self):
+        sim = simulation.Simulation(cheat=(-1.1875, 1.1875))
+        play_area = sim.game._play_area
+        self.assertTrue(sim.click(play_area._to_screen(play_area.key.RECT)))
+        self.assertEqual(sim.game._side_bar.item_cell0.item, 'key')
+
+    def test_no_rendering(self):
+        self.assertTrue(self.play_area.dirty)
+
+
+if __name__ == '__main__':
+    unittest.main()
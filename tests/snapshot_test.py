@@ -0,0 +1,117 @@
+"""Tests for maze.snapshot."""
+
+import dataclasses
+from pygame.locals import *
+import unittest
+
+from maze import interactions
+from maze import simulation
+from maze import snapshot
+
+
+class SnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.sim = simulation.Simulation()
+        self.game = self.sim.game
+        self.play_area = self.game._play_area
+        self.side_bar = self.game._side_bar
+
+    def _play(self):
+        self.sim.press(K_DOWN)
+        self.sim.wait(800)
+        self.sim.release(K_DOWN)
+        self.side_bar.add_item('key')
+        self.play_area.apply_effects((
+            interactions.Effect.remove_object('key'),
+            interactions.Effect.add_object('happy_cat'),
+            interactions.Effect.remove_state('pre_crave')))
+
+    def test_bytes_roundtrip(self):
+        self._play()
+        saved = snapshot.capture(self.game)
+        self.assertEqual(snapshot.Snapshot.from_bytes(saved.to_bytes()), saved)
+
+    def test_not_a_snapshot(self):
+        with self.assertRaises(ValueError):
+            snapshot.Snapshot.from_bytes(b'JUNK' + bytes(100))
+
+    def test_capture(self):
+        self._play()
+        saved = snapshot.capture(self.game)
+        self.assertNotEqual(saved.camera_offset, (0, 0))
+        self.assertEqual(saved.inventory[0], interactions.ITEMS.index('key'))
+        self.assertIsNone(saved.inventory[1])
+        self.assertEqual(saved.state, 0)
+        names = snapshot.names(self.play_area)
+        self.assertFalse(saved.visible >> names.index('key') & 1)
+        self.assertTrue(saved.visible >> names.index('happy_cat') & 1)
+        self.assertTrue(saved.hidden >> names.index('fire') & 1)
+
+    def test_restore_into_new_game(self):
+        self._play()
+        saved = snapshot.capture(self.game)
+        other = simulation.Simulation()
+        other.restore(saved)
+        self.assertEqual(other.checkpoint(), saved)
+        other_play_area = other.game._play_area
+        self.assertNotIn('key', other_play_area._objects)
+        self.assertIn('happy_cat', other_play_area._objects)
+        self.assertIn('happy_cat', other_play_area._index)
+        self.assertEqual(other.game._side_bar.items[0], 'key')
+        self.assertEqual(other_play_area.current_square,
+                         self.play_area.current_square)
+
+    def test_restore_earlier_state(self):
+        saved = snapshot.capture(self.game)
+        self._play()
+        self.sim.restore(saved)
+        self.assertEqual(self.sim.checkpoint(), saved)
+        self.assertIn('key', self.play_area._objects)
+        self.assertIn('happy_cat', self.play_area._hidden_objects)
+        self.assertIsNone(self.side_bar.items[0])
+
+    def test_restore_seen_walls(self):
+        self.sim.press(K_RIGHT)
+        self.sim.wait(60000)
+        self.sim.release(K_RIGHT)
+        saved = snapshot.capture(self.game)
+        self.assertTrue(saved.seen_walls)
+        other = simulation.Simulation()
+        other.restore(saved)
+        wall, = other.game._side_bar.mini_map._seen_walls
+        self.assertIs(wall, other.game._play_area._objects['wall_sright'])
+
+    def test_restore_drawing_order(self):
+        self.play_area.apply_effects((
+            interactions.Effect.hide_object('house'),
+            interactions.Effect.add_object('happy_cat'),
+            interactions.Effect.add_object('house')))
+        saved = snapshot.capture(self.game)
+        names = snapshot.names(self.play_area)
+        self.assertEqual(saved.drawn_last, (names.index('house'),))
+        saved = snapshot.Snapshot.from_bytes(saved.to_bytes())
+        other = simulation.Simulation()
+        other.restore(saved)
+        self.assertEqual(other.game._play_area.snapshot().visible,
+                         self.play_area.snapshot().visible)
+
+    def test_restore_red(self):
+        self.side_bar.mini_map.turn_red()
+        saved = snapshot.capture(self.game)
+        self.assertTrue(saved.red)
+        other = simulation.Simulation()
+        other.restore(saved)
+        self.assertTrue(other.game._side_bar.mini_map._red)
+
+    def test_different_map(self):
+        saved = snapshot.capture(self.game)
+        saved = dataclasses.replace(
+            saved, object_count=saved.object_count + 1)
+        with self.assertRaises(ValueError):
+            snapshot.restore(self.game, saved)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""Tests for maze.solver."""
+
+import dataclasses
+import unittest
+
+from common import test_utils
+from maze import play_map
+from maze import play_objects
+from maze import solver
+
+
+class PuzzleTest(test_utils.ImgTestCase):
+
+    def _puzzle(self, **kwargs):
+        return solver.Puzzle(self.screen, **kwargs)
+
+    def test_part(self):
+        puzzle = self._puzzle()
+        start = puzzle._start
+        self.assertEqual(puzzle.part(start.visible, (0, 0)),
+                         {(-1, 0), (-1, 1), (0, 0)})
+
+    def test_part_without_blockers(self):
+        puzzle = self._puzzle()
+        bits = sum(puzzle._bits[name] for name in play_objects.VISIBLE
+                   if name not in ('gate', 'angry_cat', 'invisible_wall',
+                                   'shrubbery', 'puzzle_door'))
+        self.assertIn(play_map.END_SQUARE, puzzle.part(bits, (0, 0)))
+
+    def test_solve(self):
+        solution = self._puzzle().solve()
+        assert solution
+        self.assertEqual(len(solution.steps), 21)
+        actions = [(step.action, step.name) for step in solution.steps]
+        self.assertLess(actions.index((solver.Action.OBTAIN, 'key')),
+                        actions.index((solver.Action.USE, 'key')))
+        self.assertIn((solver.Action.COLLIDE, 'invisible_wall'), actions)
+        self.assertEqual(solution.steps[-1].square, (2, 3))
+
+    def test_already_solved(self):
+        solution = self._puzzle(start=play_map.END_SQUARE).solve()
+        assert solution
+        self.assertEqual(solution.steps, [])
+
+    def test_unsolvable(self):
+        visible = {name: factory
+                   for name, factory in play_objects.VISIBLE.items()
+                   if name != 'key'}
+        self.assertIsNone(self._puzzle(visible=visible).solve())
+
+    def test_from_map(self):
+        game_map = dataclasses.replace(play_objects.DEFAULT, config=(),
+                                       state=())
+        puzzle = solver.Puzzle.from_map(self.screen, game_map)
+        self.assertEqual(puzzle.state_names, ())
+        self.assertIsNotNone(puzzle._close_squares['invisible_wall'])
+        self.assertIsNone(self._puzzle()._close_squares['invisible_wall'])
+
+    def test_pointless(self):
+        puzzle = self._puzzle()
+        self.assertNotIn('eggplant', puzzle._obtains)
+        self.assertIn('key', puzzle._obtains)
+
+    def test_step_str(self):
+        step = solver.Step(solver.Action.OBTAIN, 'key', (-1, 1), 'Got it.')
+        self.assertEqual(str(step), 'obtain key in square (-1, 1): Got it.')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+"""Tests for maze.spatial_index."""
+
+import pygame
+import random
+import unittest
+
+from maze import play_map
+from maze import play_objects
+from maze import spatial_index
+
+
+class _CornerRect(pygame.Rect):
+
+    def colliderect(self, rect):  # pyrefly: ignore[bad-param-name-override]
+        return pygame.Rect(self.topleft, (1, 1)).colliderect(rect)
+
+
+class GridIndexTest(unittest.TestCase):
+
+    INDEX: type[spatial_index.Index] = spatial_index.GridIndex
+
+    def setUp(self):
+        super().setUp()
+        self.index = self.INDEX()
+        self.origin = play_map.START_POS
+
+    def _rect(self, x, y, w=10, h=10):
+        return pygame.Rect(self.origin[0] + x, self.origin[1] + y, w, h)
+
+    def test_query(self):
+        self.index.add('a', self._rect(0, 0))
+        self.index.add('b', self._rect(2000, 0))
+        self.assertEqual(self.index.query(self._rect(5, 5)), ['a'])
+
+    def test_query_across_cells(self):
+        length = play_map.SQUARE_LENGTH
+        self.index.add('wall', self._rect(length - 5, 0, 10, length))
+        self.assertEqual(self.index.query(self._rect(length + 1, 100)),
+                         ['wall'])
+        self.assertEqual(self.index.query(self._rect(length - 10, 100)),
+                         ['wall'])
+
+    def test_insertion_order(self):
+        self.index.add('b', self._rect(0, 0))
+        self.index.add('a', self._rect(0, 0))
+        self.assertEqual(self.index.query(self._rect(0, 0)), ['b', 'a'])
+
+    def test_readd(self):
+        self.index.add('a', self._rect(0, 0))
+        self.index.add('b', self._rect(0, 0))
+        self.index.remove('a')
+        self.index.add('a', self._rect(0, 0))
+        self.assertEqual(self.index.query(self._rect(0, 0)), ['b', 'a'])
+
+    def test_remove(self):
+        self.index.add('a', self._rect(0, 0))
+        self.index.remove('a')
+        self.assertNotIn('a', self.index)
+        self.assertFalse(self.index.query(self._rect(0, 0)))
+
+    def test_collide(self):
+        self.index.add('corner', _CornerRect(self._rect(0, 0)))
+        self.assertEqual(self.index.query(self._rect(5, 5)), ['corner'])
+        self.assertFalse(self.index.collide(self._rect(5, 5)))
+        self.assertEqual(self.index.collide(self._rect(0, 0)), ['corner'])
+
+    def test_query_point(self):
+        self.index.add('a', self._rect(0, 0))
+        self.assertEqual(self.index.query_point(self._rect(5, 5).topleft),
+                         ['a'])
+        self.assertFalse(self.index.query_point(self._rect(10, 10).topleft))
+
+    def test_negative_cells(self):
+        self.index.add('a', self._rect(-1000, -1000))
+        self.assertEqual(self.index.query(self._rect(-995, -995)), ['a'])
+        self.assertFalse(self.index.query(self._rect(0, 0)))
+
+    def test_len(self):
+        self.index.add('a', self._rect(0, 0))
+        self.index.add('b', self._rect(0, 0))
+        self.assertEqual(len(self.index), 2)
+
+    def test_multi_rect(self):
+        lake = play_objects._LakeRect(self._rect(0, 0).topleft, (600, 500))
+        self.index.add('lake', lake)
+        self.assertEqual(self.index.query(self._rect(0, 0)), ['lake'])
+        self.assertFalse(self.index.collide(self._rect(0, 0)))
+        self.assertEqual(self.index.collide(self._rect(300, 250)), ['lake'])
+
+    def test_empty_rect(self):
+        self.index.add('a', self._rect(0, 0))
+        self.assertFalse(self.index.collide(self._rect(5, 5, 0, 0)))
+
+    def test_matches_colliderect(self):
+        rng = random.Random(0)
+        shapes = (pygame.Rect, play_objects._HouseRect, play_objects._TreeRect,
+                  play_objects._LakeRect, play_objects._HoleRect)
+        rects = {}
+        for i in range(200):
+            rects[f'obj{i}'] = rng.choice(shapes)(
+                (rng.randint(-2000, 2000), rng.randint(-2000, 2000)),
+                (rng.randint(1, 600), rng.randint(1, 600)))
+            self.index.add(f'obj{i}', rects[f'obj{i}'])
+        for _ in range(50):
+            query_rect = pygame.Rect(
+                (rng.randint(-2000, 2000), rng.randint(-2000, 2000)),
+                (rng.randint(1, 600), rng.randint(1, 600)))
+            self.assertEqual(
+                self.index.collide(query_rect),
+                [name for name, rect in rects.items()
+                 if rect.colliderect(query_rect)])
+            self.assertEqual(
+                self.index.query_point(query_rect.topleft),
+                [name for name, rect in rects.items()
+                 if pygame.Rect.collidepoint(rect, query_rect.topleft)])
+
+    def test_matches_colliderect_after_changes(self):
+        rng = random.Random(1)
+        rects = {}
+        for i in range(500):
+            name = f'obj{rng.randrange(100)}'
+            if name in rects and rng.random() < 0.7:
+                del rects[name]
+                self.index.remove(name)
+            else:
+                rects.pop(name, None)
+                rects[name] = rng.choice(
+                    (pygame.Rect, play_objects._TreeRect, _CornerRect))(
+                        (rng.randint(-2000, 2000), rng.randint(-2000, 2000)),
+                        (rng.randint(1, 600), rng.randint(1, 600)))
+                self.index.add(name, rects[name])
+            query_rect = pygame.Rect(
+                (rng.randint(-2000, 2000), rng.randint(-2000, 2000)),
+                (rng.randint(1, 1000), rng.randint(1, 1000)))
+            self.assertEqual(
+                self.index.collide(query_rect),
+                [name for name, rect in rects.items()
+                 if rect.colliderect(query_rect)])
+        self.assertEqual(len(self.index), len(rects))
+
+
+class GridIndexCellsTest(unittest.TestCase):
+
+    def test_remove_empties_cells(self):
+        index = spatial_index.GridIndex()
+        index.add('a', pygame.Rect(0, 0, 10, 10))
+        index.remove('a')
+        self.assertFalse(index._cells)
+
+
+@unittest.skipUnless(spatial_index.HAS_NUMPY, 'requires numpy')
+class ArrayIndexTest(GridIndexTest):
+
+    INDEX = spatial_index.ArrayIndex
+
+
+class ChooseTest(unittest.TestCase):
+
+    def _rects(self, count, squares):
+        return [pygame.Rect(play_map.square_to_pos((i % squares, 0)), (10, 10))
+                for i in range(count)]
+
+    def test_spread_out(self):
+        self.assertIs(spatial_index.choose(self._rects(10000, 100)),
+                      spatial_index.GridIndex)
+
+    def test_few_objects(self):
+        self.assertIs(spatial_index.choose(self._rects(100, 1)),
+                      spatial_index.GridIndex)
+
+    @unittest.skipUnless(spatial_index.HAS_NUMPY, 'requires numpy')
+    def test_crowded(self):
+        self.assertIs(spatial_index.choose(self._rects(10000, 4)),
+                      spatial_index.ArrayIndex)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,7 +5,12 @@ import unittest
 
 from common import color
 from common import test_utils
+from maze import assets
+from maze import interactions
+from maze import map_file
 from maze import play_area
+from maze import play_objects
+from maze import profiling
 from maze import state
 from maze import walls
 
@@ -35,11 +40,87 @@ class GameTest(test_utils.GameStateTestCase):
 
     def setUp(self):
         super().setUp()
+        # Static layer chunks can't blit mock images.
+        surface_patch = test_utils.patch('pygame.Surface')
+        surface_patch.start()
+        self.addCleanup(surface_patch.stop)
+        assets.CACHE.clear()
         self.game = state.Game(self.screen, False, None)
 
     def test_draw(self):
         self.game.draw()
 
+    def test_draw_headless(self):
+        game = state.Game(self.screen, False, None, headless=True)
+        update = self.mocks['pygame.display'].update
+        update.reset_mock()
+        game._side_bar.text_area.show('Hello.')
+        game.draw()
+        update.assert_not_called()
+
+    def test_dispatch(self):
+        self.assertTrue(self.game.dispatch(
+            test_utils.MockEvent(typ=KEYDOWN, key=K_RIGHT)))
+        self.assertFalse(self.game.dispatch(
+            test_utils.MockEvent(typ=KEYUP, key=K_a)))
+
+    def _run(self, frame_ms, events):
+        # Quit once the events run out.
+        events = list(events) + [[test_utils.MockEvent(typ=QUIT)]]
+        with test_utils.patch('pygame.event.get', side_effect=events), \
+                test_utils.patch('pygame.time.Clock') as mock_clock:
+            mock_clock.return_value.tick.return_value = frame_ms
+            self.game.run()
+
+    def test_run_ticks(self):
+        self._run(50, [[test_utils.MockEvent(typ=KEYDOWN, key=K_DOWN)], [],
+                       [], []])
+        # Pressing the key moves the player once, and 200ms of frames tick
+        # twice.
+        self.assertEqual(self.game._play_area._camera_offset, (0, -30))
+
+    def test_run_interpolates(self):
+        self._run(50, [[test_utils.MockEvent(typ=KEYDOWN, key=K_DOWN)], [], []])
+        self.assertEqual(self.game._play_area._camera_offset, (0, -15))
+        # We're halfway through the second tick.
+        self.assertEqual(self.game._play_area._render_offset, (0, -10))
+
+    def test_run_slow_frames(self):
+        self._run(10000, [[test_utils.MockEvent(typ=KEYDOWN, key=K_DOWN)]])
+        ticks = state._MAX_FRAME_MS // play_area._TICK_INTERVAL_MS
+        self.assertEqual(self.game._play_area._camera_offset[1],
+                         -5 * sum(range(1, ticks + 2)))
+
+    def test_run_profiled(self):
+        profiler = profiling.Profiler()
+        self.game = state.Game(self.screen, False, None, profiler=profiler)
+        self._run(50, [[test_utils.MockEvent(typ=KEYDOWN, key=K_DOWN)], []])
+        self.assertLessEqual(
+            {'events', 'play_area._check_player_collision', 'play_area.draw',
+             'side_bar.draw', 'display.update'}, set(profiler.stats()))
+
+    def test_draw_changed_text(self):
+        update = self.mocks['pygame.display'].update
+        update.reset_mock()
+        self.game.draw()
+        update.assert_not_called()
+        self.game._side_bar.text_area.show('Hello.')
+        self.game.draw()
+        update.assert_called_once_with(
+            [self.game._side_bar.text_area.RECT.move(576, 0)])
+
+    def test_draw_scrolled(self):
+        self.game._play_area.scroll((5, 0))
+        self.game.draw()
+        self.assertIn(self.game._play_area.RECT,
+                      self.mocks['pygame.display'].update.call_args.args[0])
+
+    def test_fullscreen(self):
+        self.game.handle_fullscreen(
+            test_utils.MockEvent(typ=KEYDOWN, key=K_F11))
+        update = self.mocks['pygame.display'].update
+        self.assertEqual(len(update.call_args.args[0]), 11)
+
     def test_start_player_movement(self):
         self.assertTrue(self.game._side_bar.text_area._text)
         self.assertTrue(self.game.handle_player_movement(
@@ -99,8 +180,7 @@ class GameTest(test_utils.GameStateTestCase):
     def test_turn_minimap_red(self):
         self.assertNotEqual(
             self.game._side_bar.mini_map._square_color, color.RED)
-        for obj in self.game._play_area._objects.values():
-            obj.move((-1600, -3200))
+        self.game._play_area.scroll((-1600, -3200))
         self.game.handle_player_movement(
             test_utils.MockEvent(typ=KEYDOWN, key=K_DOWN))
         self.assertEqual(self.game._side_bar.mini_map._square_color, color.RED)
@@ -114,21 +194,21 @@ class GameTest(test_utils.GameStateTestCase):
             test_utils.MockEvent(typ=MOUSEBUTTONDOWN, button=1, pos=(0, 0))))
 
     def test_click_key(self):
-        for obj in self.game._play_area._objects.values():
-            obj.move((950, -950))
+        self.game._play_area.scroll((950, -950))
         self.game._side_bar.text_area.show(None)
         self.assertTrue(self.game.handle_click(
             test_utils.MockEvent(typ=MOUSEBUTTONDOWN, button=1,
-                                 pos=self.game._play_area.key.RECT.center)))
+                                 pos=self.game._play_area._to_screen(
+                                     self.game._play_area.key.RECT).center)))
         self.assertNotIn('key', self.game._play_area._objects)
         self.assertEqual(self.game._side_bar.item_cell0.item, 'key')
         self.assertTrue(self.game._side_bar.text_area._text)
 
     def test_use_key(self):
-        del self.game._play_area._objects['key']
+        self.game._play_area.apply_effects(
+            (interactions.Effect.remove_object('key'),))
         self.game._side_bar.add_item('key')
-        for obj in self.game._play_area._objects.values():
-            obj.move((0, 480))
+        self.game._play_area.scroll((0, 480))
         self.game._side_bar.text_area.show(None)
         self.assertTrue(self.game.handle_click(
             test_utils.MockEvent(
@@ -139,7 +219,8 @@ class GameTest(test_utils.GameStateTestCase):
         self.assertTrue(self.game._side_bar.text_area._text)
 
     def test_fail_use_key(self):
-        del self.game._play_area._objects['key']
+        self.game._play_area.apply_effects(
+            (interactions.Effect.remove_object('key'),))
         self.game._side_bar.add_item('key')
         self.game._side_bar.text_area.show(None)
         self.assertTrue(self.game.handle_click(
@@ -151,7 +232,8 @@ class GameTest(test_utils.GameStateTestCase):
         self.assertTrue(self.game._side_bar.text_area._text)
 
     def test_fail_text_multiword_object(self):
-        del self.game._play_area._objects['fishing_rod']
+        self.game._play_area.apply_effects(
+            (interactions.Effect.remove_object('fishing_rod'),))
         self.game._side_bar.add_item('fishing_rod')
         self.game._side_bar.text_area.show(None)
         self.game.handle_click(
@@ -173,18 +255,45 @@ class GameTest(test_utils.GameStateTestCase):
         self.assertIsNone(self.game._side_bar.item_cell1.item)
 
     def test_inventory_overflow(self):
-        for obj in self.game._play_area._objects.values():
-            obj.move((800, 0))
+        self.game._play_area.scroll((800, 0))
         self.game._side_bar.text_area.show(None)
         for _ in range(9):
             self.game.handle_click(
                 test_utils.MockEvent(
                     typ=MOUSEBUTTONDOWN, button=1,
-                    pos=self.game._play_area.tree_peach.RECT.center))
+                    pos=self.game._play_area._to_screen(
+                        self.game._play_area.tree_peach.RECT).center))
         text = ' '.join(
             block.value for block in self.game._side_bar.text_area._text)
         self.assertEqual(text, self.game._OBTAIN_FAIL_TEXT)
 
 
+class GameMapTest(test_utils.GameStateTestCase):
+
+    def setUp(self):
+        super().setUp()
+        surface_patch = test_utils.patch('pygame.Surface')
+        surface_patch.start()
+        self.addCleanup(surface_patch.stop)
+        wall = walls.Table().add((0, 0), walls.Side.BOTTOM)
+        game_map = play_objects.Map(
+            {'wall': wall}, {}, frozenset({'wall'}), end=(-1, 0),
+            config=(map_file.ConfigEntry('wall', all_squares=True),))
+        self.game = state.Game(self.screen, False, None, game_map=game_map)
+
+    def test_objects(self):
+        self.assertEqual(list(self.game._play_area._objects), ['wall'])
+        self.assertIs(self.game._play_area.config.get('wall', 'squares'),
+                      interactions.Squares.ALL)
+
+    def test_end(self):
+        self.game._play_area.scroll((800, 0))
+        self.game.handle_player_movement(
+            test_utils.MockEvent(typ=KEYUP, key=K_LEFT))
+        text = ' '.join(
+            block.value for block in self.game._side_bar.text_area._text)
+        self.assertEqual(text, self.game._END_TEXT)
+
+
 if __name__ == '__main__':
     unittest.main()
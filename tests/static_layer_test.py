@@ -0,0 +1,71 @@
+"""Tests for maze.static_layer."""
+
+import pygame
+import unittest
+import unittest.mock
+
+from common import test_utils
+from maze import play_map
+from maze import static_layer
+
+
+class StaticLayerTest(unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.render_chunk = unittest.mock.MagicMock()
+        self.layer = static_layer.StaticLayer(self.render_chunk)
+        self.screen = test_utils.MockScreen()
+        self.length = play_map.SQUARE_LENGTH
+
+    def _view_rect(self, x, y):
+        return pygame.Rect(play_map.START_POS[0] + x,
+                           play_map.START_POS[1] + y, 576, 576)
+
+    def test_chunk_rect(self):
+        self.assertEqual(
+            static_layer.chunk_rect((1, -1)),
+            pygame.Rect(play_map.square_to_pos((1, -1)),
+                        (self.length, self.length)))
+
+    def test_draw_one_chunk(self):
+        self.layer.draw(self.screen, self._view_rect(0, 0), (0, 0))
+        self.render_chunk.assert_called_once()
+        _, rect = self.render_chunk.call_args.args
+        self.assertEqual(rect, static_layer.chunk_rect((0, 0)))
+
+    def test_draw_four_chunks(self):
+        self.layer.draw(self.screen, self._view_rect(400, 400), (0, 0))
+        self.assertEqual(self.render_chunk.call_count, 4)
+        self.assertEqual(self.screen.blit.call_count, 4)
+
+    def test_blit_position(self):
+        view_rect = self._view_rect(100, 50)
+        self.layer.draw(self.screen, view_rect, (-view_rect.x, -view_rect.y))
+        _, pos = self.screen.blit.call_args.args
+        self.assertEqual(pos, (-100, -50))
+
+    def test_reuse_chunks(self):
+        self.layer.draw(self.screen, self._view_rect(0, 0), (0, 0))
+        self.layer.draw(self.screen, self._view_rect(10, 10), (0, 0))
+        self.render_chunk.assert_called_once()
+        self.assertEqual(self.screen.blit.call_count, 2)
+
+    def test_invalidate(self):
+        self.layer.draw(self.screen, self._view_rect(400, 0), (0, 0))
+        self.layer.invalidate(pygame.Rect(
+            play_map.START_POS[0] + self.length + 10, play_map.START_POS[1],
+            10, 10))
+        self.assertEqual(set(self.layer._chunks), {(0, 0)})
+        self.layer.draw(self.screen, self._view_rect(400, 0), (0, 0))
+        self.assertEqual(self.render_chunk.call_count, 3)
+
+    def test_memory_cap(self):
+        layer = static_layer.StaticLayer(
+            self.render_chunk, max_bytes=2 * static_layer._CHUNK_BYTES)
+        layer.draw(self.screen, self._view_rect(400, 400), (0, 0))
+        self.assertEqual(len(layer._chunks), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
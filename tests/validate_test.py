@@ -0,0 +1,90 @@
+"""Tests for maze.validate."""
+
+import json
+import os
+import tempfile
+import unittest
+
+from common import test_utils
+from maze import map_file
+from maze import solver
+from maze import validate
+
+
+def _walls(*sides):
+    return {'version': 1, 'groups': {'walls': [
+        {'name': f'wall_{side}', 'kind': 'wall', 'square': [0, 0],
+         'side': side} for side in sides]}}
+
+
+class ValidateTest(test_utils.ImgTestCase):
+
+    def test_default(self):
+        report = validate.validate(map_file.DEFAULT_PATH, self.screen)
+        self.assertTrue(report.ok)
+        self.assertEqual(report.steps, 21)
+        self.assertEqual(report.unreachable, [])
+        self.assertEqual(report.soft_locks, [])
+
+
+class SoftLocksTest(unittest.TestCase):
+
+    def test_soft_locks(self):
+        good = solver.Step(solver.Action.USE, 'key', (0, 0), 'Unlocked.')
+        bad = solver.Step(solver.Action.USE, 'fish', (0, 0), 'Eaten.')
+        graph = {'start': [(good, 'end'), (bad, 'stuck')],
+                 'stuck': [(good, 'more_stuck')], 'more_stuck': [],
+                 'end': []}
+        self.assertEqual(validate._soft_locks(graph, {'end'}), [bad])
+
+    def test_no_solution(self):
+        step = solver.Step(solver.Action.USE, 'fish', (0, 0), 'Eaten.')
+        graph = {'start': [(step, 'stuck')], 'stuck': []}
+        self.assertEqual(validate._soft_locks(graph, set()), [])
+
+
+class ReportTest(unittest.TestCase):
+
+    def test_ok(self):
+        report = validate.Report('maze.json', 21, 100, [], [], 1.5)
+        self.assertTrue(report.ok)
+        self.assertEqual(str(report),
+                         'maze.json: solved in 21 steps, 100 states (1.50s)')
+
+    def test_not_ok(self):
+        report = validate.Report(
+            'maze.json', None, 100, ['key'], ['use fish'], 1.5)
+        self.assertFalse(report.ok)
+        self.assertEqual(str(report).splitlines(), [
+            'maze.json: no solution, 100 states (1.50s)',
+            '  unreachable: key', '  soft lock: use fish'])
+
+
+class ValidateAllTest(unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.paths = []
+        for name, data in (('open', _walls('bottom')),
+                           ('boxed', _walls('left', 'right', 'top',
+                                            'bottom'))):
+            path = os.path.join(self.tempdir.name, f'{name}.json')
+            with open(path, 'w') as f:
+                json.dump(data, f)
+            self.paths.append(path)
+
+    def test_serial(self):
+        reports = list(validate.validate_all(self.paths, jobs=1))
+        self.assertEqual([report.path for report in reports], self.paths)
+        self.assertEqual([report.steps for report in reports], [0, None])
+
+    def test_parallel(self):
+        reports = list(validate.validate_all(self.paths, jobs=2))
+        self.assertEqual([report.path for report in reports], self.paths)
+        self.assertEqual([report.ok for report in reports], [True, False])
+
+
+if __name__ == '__main__':
+    unittest.main()
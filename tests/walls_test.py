@@ -4,6 +4,8 @@ import pygame
 import unittest
 
 from common import test_utils
+from maze import assets
+from maze import play_map
 from maze import walls
 
 
@@ -33,12 +35,163 @@ class SideTest(unittest.TestCase):
                          (rect.topleft, rect.topright))
 
 
+class TableTest(unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.table = walls.Table()
+        self.table.add((2, -1), walls.Side.LEFT)
+        self.table.add((0, 3), walls.Side.BOTTOM)
+
+    def test_len(self):
+        self.assertEqual(len(self.table), 2)
+
+    def test_square(self):
+        self.assertEqual(self.table.square(0), (2, -1))
+        self.assertEqual(self.table.side(1), walls.Side.BOTTOM)
+
+    def test_adjacent_squares(self):
+        self.assertEqual(self.table.adjacent_squares(0), {(2, -1), (1, -1)})
+        self.assertEqual(self.table.adjacent_squares(1), {(0, 3), (0, 4)})
+
+    def test_endpoints(self):
+        x, y = play_map.square_to_pos((0, 3))
+        length = play_map.SQUARE_LENGTH
+        self.assertEqual(self.table.endpoints(1),
+                         ((x, y + length), (x + length, y + length)))
+
+    def test_grid(self):
+        grid = self.table.grid()
+        self.assertEqual(grid.origin, (0, -1))
+        self.assertEqual((grid.width, grid.height), (3, 6))
+        self.assertTrue(grid.has_wall((1, -1), walls.Side.RIGHT))
+        self.assertTrue(grid.has_wall((0, 4), walls.Side.TOP))
+
+
+class GridTest(unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        # A 3x2 grid with one wall, between the first two squares of its top
+        # row.
+        self.grid = walls.Grid((0, 0), (3, 2))
+        self.grid.add_wall((1, 0), walls.Side.LEFT)
+
+    def test_has_wall(self):
+        self.assertTrue(self.grid.has_wall((0, 0), walls.Side.RIGHT))
+        self.assertTrue(self.grid.has_wall((1, 0), walls.Side.LEFT))
+        self.assertFalse(self.grid.has_wall((1, 0), walls.Side.RIGHT))
+        self.assertFalse(self.grid.has_wall((-5, 7), walls.Side.TOP))
+
+    def test_len(self):
+        self.assertEqual(len(self.grid), 1)
+        self.assertEqual(list(self.grid.walls()), [((0, 0), walls.Side.RIGHT)])
+
+    def test_passable(self):
+        self.assertFalse(self.grid.passable((1, 0), (0, 0)))
+        self.assertTrue(self.grid.passable((0, 0), (0, 1)))
+        self.assertFalse(self.grid.passable((0, 0), (1, 1)))
+
+    def test_neighbors(self):
+        self.assertEqual(set(self.grid.neighbors((0, 0))), {(0, 1)})
+        self.assertEqual(set(self.grid.neighbors((1, 1))),
+                         {(0, 1), (2, 1), (1, 0)})
+
+    def test_connected(self):
+        self.assertTrue(self.grid.connected((0, 0), (2, 0)))
+        self.grid.add_wall((0, 0), walls.Side.BOTTOM)
+        self.assertFalse(self.grid.connected((0, 0), (2, 0)))
+        self.grid.remove_wall((0, 0), walls.Side.BOTTOM)
+        self.assertTrue(self.grid.connected((0, 0), (2, 0)))
+        self.assertFalse(self.grid.connected((0, 0), (3, 0)))
+
+    def test_walled(self):
+        grid = walls.Grid((0, 0), (3, 2), walled=True)
+        self.assertEqual(len(grid), 12)
+        self.assertFalse(grid.connected((0, 0), (1, 0)))
+
+    def test_add_outside(self):
+        with self.assertRaises(ValueError):
+            self.grid.add_wall((0, 0), walls.Side.TOP)
+
+    def test_packed(self):
+        grid = walls.Grid.from_packed(self.grid.packed())
+        self.assertEqual(grid.origin, (0, 0))
+        self.assertEqual((grid.width, grid.height), (3, 2))
+        self.assertEqual(list(grid.walls()), list(self.grid.walls()))
+
+    def test_wall_index(self):
+        index = self.grid.wall_index((1, 0), walls.Side.LEFT)
+        self.assertEqual(self.grid.square(index), (0, 0))
+        self.assertEqual(self.grid.side(index), walls.Side.RIGHT)
+        self.assertEqual(self.grid.wall_index((1, 0), walls.Side.RIGHT), -1)
+
+    def test_default(self):
+        grid = walls.TABLE.grid()
+        self.assertEqual(len(grid), len(walls.TABLE))
+        self.assertTrue(grid.connected((0, 0), play_map.END_SQUARE))
+
+
+class GridWallsTest(test_utils.ImgTestCase):
+
+    def setUp(self):
+        super().setUp()
+        grid = walls.Grid((0, 0), (3, 2))
+        grid.add_wall((1, 0), walls.Side.LEFT)
+        grid.add_wall((2, 0), walls.Side.BOTTOM)
+        self.walls = walls.GridWalls(grid)
+
+    def test_names(self):
+        self.assertEqual(list(self.walls),
+                         ['wall_0_0_right', 'wall_2_0_bottom'])
+        self.assertEqual(len(self.walls), 2)
+
+    def test_getitem(self):
+        wall = self.walls['wall_2_0_bottom'](self.screen)
+        self.assertEqual(wall.SQUARE, (2, 0))
+        self.assertEqual(wall.SIDE, walls.Side.BOTTOM)
+        self.assertEqual(wall.adjacent_squares, {(2, 0), (2, 1)})
+
+    def test_missing(self):
+        for name in ('wall_1_0_right', 'wall_1_0_left', 'wall_00_0_right',
+                     'wall_0_0', 'wall_a_0_right', 'tree'):
+            with self.subTest(name=name):
+                self.assertNotIn(name, self.walls)
+
+
 class WallTest(test_utils.ImgTestCase):
 
+    def setUp(self):
+        super().setUp()
+        assets.CACHE.clear()
+
     def test_adjacent_squares(self):
         wall = walls.ALL['wall_sright'](self.screen)
         self.assertEqual(wall.adjacent_squares, {(0, 0), (1, 0)})
 
+    def test_square_and_side(self):
+        wall = walls.ALL['wall_1top'](self.screen)
+        self.assertEqual(wall.SQUARE, (-1, 0))
+        self.assertEqual(wall.SIDE, walls.Side.TOP)
+
+    def test_rect(self):
+        wall = walls.ALL['wall_1left'](self.screen)
+        x, y = play_map.square_to_pos((-1, 0))
+        w, h = wall._img.get_size()
+        self.assertEqual(wall.RECT, pygame.Rect(x - w / 2, y, w, h))
+
+    def test_shared_sprite(self):
+        wall1 = walls.ALL['wall_sright'](self.screen)
+        wall2 = walls.ALL['wall_1left'](self.screen)
+        wall3 = walls.ALL['wall_1top'](self.screen)
+        self.assertIs(wall1._img, wall2._img)
+        self.assertIsNot(wall1._img, wall3._img)
+
+    def test_draw(self):
+        wall = walls.ALL['wall_sright'](self.screen)
+        wall.draw()
+        self.screen.blit.assert_called_once_with(wall._img, wall.RECT.topleft)
+
 
 if __name__ == '__main__':
     unittest.main()